@@ -1,12 +1,63 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context
+import os
 import sys
-from src.agents.video_analyzer import YoutubeAnalyzeAgent
-from src.agents.researcher import ResearchAgent
-from src.agents.blogger import BloggerAgent
+import json
+import uuid
+import atexit
+from src.admission import get_admission_controller
+from src.batch import start_batch, get_batch, is_web_url, validate_concurrency
+from src.errors import error_response
 from src.exception import CustomException
+from src.http_client import close_session
+from src.jobs import get_job_manager, QueueFullError
+from src.logger import configure_logging, bind_log_context, unbind_log_context
+from src.metrics import render_prometheus
+from src.agents.blog_pipeline import PIPELINE_VERSION
+from src.pipeline import generate_blog, refresh_blog, stream_pipeline
+from src.registry import registry, startup_mode
+from src.store import get_result_store
 
 app = Flask(__name__)
 
+# Logging is set up here, at startup, not as a side effect of importing src.*
+configure_logging()
+
+# Build agents, compiled graphs and clients once per worker instead of per request.
+# In lazy mode (the default on serverless) that waits for the first generation,
+# so a cold start that only serves pages never imports the pipeline stack.
+if startup_mode() == "eager":
+    registry.start()
+atexit.register(registry.shutdown)
+
+jobs = get_job_manager()
+registry.add_shutdown_hook(jobs.stop)
+registry.add_shutdown_hook(close_session)
+
+# Caps the pipelines web requests run at once (ADMISSION_MAX_IN_FLIGHT), fairly across clients
+admission = get_admission_controller()
+# Peers (e.g. a reverse proxy or gateway) whose X-Client-ID header is believed
+TRUSTED_PROXIES = {peer.strip() for peer in os.environ.get("ADMISSION_TRUSTED_PROXIES", "").split(",") if peer.strip()}
+
+def request_id() -> str:
+    return request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+@app.before_request
+def bind_request_id():
+    """Tags every log record written while serving the request (including streamed bodies) with its ID."""
+    g.request_id = request_id()
+    g.log_token = bind_log_context(request_id=g.request_id)
+
+@app.after_request
+def add_request_id(response):
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    return response
+
+@app.teardown_request
+def unbind_request_id(error=None):
+    token = g.pop("log_token", None)
+    if token is not None:
+        unbind_log_context(token)
+
 @app.route('/')
 def index():
     """Renders the landing page."""
@@ -17,13 +68,79 @@ def product():
     """Renders the product page."""
     return render_template('product.html')
 
+def client_id() -> str:
+    """
+    Who a request counts as for admission fairness: its peer address, or the
+    X-Client-ID header when the peer is one of ADMISSION_TRUSTED_PROXIES.
+    Anyone else could send a fresh ID per request and escape the per-client caps.
+    """
+    peer = request.remote_addr or "unknown"
+    if peer in TRUSTED_PROXIES:
+        return request.headers.get('X-Client-ID') or peer
+    return peer
+
+def admission_slot():
+    """Pipeline slot for this request's client, entered by the pipeline only if it has to run."""
+    return admission.slot(client_id()) if admission is not None else None
+
+def wants_trace() -> bool:
+    """Per-request spans are returned with ?trace=1, or always with TRACE_REQUESTS=1."""
+    return request.args.get('trace') == '1' or os.environ.get('TRACE_REQUESTS') == '1'
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: stage/LLM/search latency histograms and token spend."""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/analyze', methods=['POST'])
 def analyze_video():
     """
-    Orchestrates the AI agents:
-    1. Analyzer: Video -> Transcript -> Analysis
-    2. Researcher: Analysis -> Web Queries -> Research Summary
-    3. Blogger: Analysis + Research -> Blog Post
+    Returns the blog post for a video: the stored one if this pipeline version
+    already wrote it, else the result of a run (shared with concurrent requests
+    for the same video). "force_refresh": true regenerates it. A run waits for
+    an admission slot and is answered 503 / 429 with Retry-After if none frees up.
+    """
+    data = request.json
+    video_url = data.get('video_url')
+
+    if not video_url:
+        return jsonify({"error": "No video URL provided"}), 400
+
+    try:
+
+        result = generate_blog(
+            video_url, force_refresh=bool(data.get('force_refresh')), include_trace=wants_trace(), admission=admission_slot()
+        )
+
+        if result.get("error"):
+            body, status, headers = error_response(result["error"], result.get("error_info"))
+            return jsonify(body), status, headers
+
+        body = {
+            "status": "success",
+            "blog_post": result["blog_post"],
+            "debug_analysis": result["video_analysis"],
+            "debug_research": result["research_summary"],
+            "usage": result["usage"],
+            "source": result["source"]
+        }
+        if "trace" in result:
+            body["trace"] = result["trace"]
+
+        response = jsonify(body)
+        response.headers["Server-Timing"] = ", ".join(
+            f"{name};dur={duration}" for name, duration in result["timings"].items()
+        )
+        return response
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_video_stream():
+    """
+    Server-Sent Events version of /analyze.
+    Emits a `stage` event as each LangGraph node completes, then the blog as `token` events.
     """
     data = request.json
     video_url = data.get('video_url')
@@ -31,45 +148,181 @@ def analyze_video():
     if not video_url:
         return jsonify({"error": "No video URL provided"}), 400
 
+    include_trace = wants_trace()
+    force_refresh = bool(data.get('force_refresh'))
+    slot = admission_slot()
+
+    def generate():
+        for event, payload in stream_pipeline(video_url, include_trace=include_trace, force_refresh=force_refresh, admission=slot):
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queues a blog generation and returns its job ID immediately."""
+    data = request.json
+    video_url = data.get('video_url')
+
+    if not video_url:
+        return jsonify({"error": "No video URL provided"}), 400
+
+    try:
+        job = jobs.submit(video_url, force_refresh=bool(data.get('force_refresh')))
+    except QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+
+    return jsonify({
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}",
+        "result_url": f"/jobs/{job['job_id']}/result"
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Reports the status and current stage of a queued job."""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+
+    job.pop("result", None)
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Returns the finished blog, 202 while the job is still pending."""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+
+    if job["status"] in ("queued", "running"):
+        return jsonify({"status": job["status"], "stage": job["stage"]}), 202
+
+    if job["status"] == "failed":
+        body, status, headers = error_response(job["error"], job.get("error_info"))
+        return jsonify({"status": "failed", **body}), status, headers
+
+    result = job["result"]
+    return jsonify({
+        "status": "success",
+        "blog_post": result["blog_post"],
+        "debug_analysis": result["video_analysis"],
+        "debug_research": result["research_summary"],
+        "source": result.get("source")
+    })
+
+@app.route('/blogs', methods=['GET'])
+def list_blogs():
+    """
+    Pages over stored blogs, newest first: ?limit=20&cursor=<next_cursor>.
+    Only the current pipeline version is listed unless ?version=<v> or ?version=all.
+    """
+    store = get_result_store()
+    if store is None:
+        return jsonify({"error": "Result store is disabled"}), 404
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    version = request.args.get('version', PIPELINE_VERSION)
+
+    try:
+        items, next_cursor = store.list(limit, cursor=request.args.get('cursor'), version=None if version == "all" else version)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@app.route('/blogs/<video_id>', methods=['GET'])
+def get_blog(video_id):
+    """Returns a stored blog (current pipeline version unless ?version=<v>)."""
+    store = get_result_store()
+    if store is None:
+        return jsonify({"error": "Result store is disabled"}), 404
+
+    blog = store.get(video_id, request.args.get('version', PIPELINE_VERSION))
+    if not blog:
+        return jsonify({"error": "Unknown blog"}), 404
+    return jsonify(blog)
+
+@app.route('/blogs/<video_id>/refresh', methods=['POST'])
+def refresh_stored_blog(video_id):
+    """
+    Re-runs the research for a stored blog and edits only the sections the
+    new findings affect; "source" is "unchanged" when nothing material turned
+    up. Blogs not stored yet are generated in full.
+    """
     try:
-        
-        analyzer = YoutubeAnalyzeAgent()
-        researcher = ResearchAgent()
-        blogger = BloggerAgent()
-
-        analyze_state = analyzer.run(video_url)
-        
-        if analyze_state.get("error"):
-            return jsonify({"error": f"Analyzer Error: {analyze_state['error']}"}), 500
-        
-        video_analysis = analyze_state.get("analysis")
-        if not video_analysis:
-             return jsonify({"error": "Failed to generate video analysis"}), 500
-
-        research_state = researcher.run(video_analysis)
-        
-        if research_state.get("error"):
-            
-            return jsonify({"error": f"Researcher Error: {research_state['error']}"}), 500
-
-        research_summary = research_state.get("research_summary")
-
-        blog_state = blogger.run(video_analysis, research_summary)
-        
-        if blog_state.get("error"):
-            return jsonify({"error": f"Blogger Error: {blog_state['error']}"}), 500
-
-        blog_post = blog_state.get("blog_post")
-
-        return jsonify({
+
+        result = refresh_blog(
+            f"https://www.youtube.com/watch?v={video_id}", include_trace=wants_trace(), admission=admission_slot()
+        )
+
+        if result.get("error"):
+            body, status, headers = error_response(result["error"], result.get("error_info"))
+            return jsonify(body), status, headers
+
+        body = {
             "status": "success",
-            "blog_post": blog_post,
-            "debug_analysis": video_analysis,
-            "debug_research": research_summary
-        })
+            "blog_post": result["blog_post"],
+            "debug_analysis": result["video_analysis"],
+            "debug_research": result["research_summary"],
+            "usage": result["usage"],
+            "source": result["source"]
+        }
+        if "research_changes" in result:
+            body["research_changes"] = result["research_changes"]
+        if "trace" in result:
+            body["trace"] = result["trace"]
+        return jsonify(body)
 
     except Exception as e:
         raise CustomException(e, sys)
 
+@app.route('/batches', methods=['POST'])
+def create_batch():
+    """Starts a pipelined batch over a playlist/channel URL and/or a list of video URLs."""
+    data = request.json
+    source = data.get('source')
+    video_urls = data.get('video_urls') or []
+
+    if not source and not video_urls:
+        return jsonify({"error": "Provide a playlist/channel 'source' or a list of 'video_urls'"}), 400
+    if source and not is_web_url(source):
+        return jsonify({"error": "'source' must be an http(s) playlist or channel URL"}), 400
+
+    try:
+        concurrency = validate_concurrency(data.get('concurrency'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        batch = start_batch(source=source, urls=video_urls, concurrency=concurrency)
+        return jsonify(batch.progress()), 202
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+@app.route('/batches/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Reports how many videos of a batch have been processed."""
+    batch = get_batch(batch_id)
+    if not batch:
+        return jsonify({"error": "Unknown batch"}), 404
+    return jsonify(batch.progress())
+
+@app.route('/batches/<batch_id>/results', methods=['GET'])
+def batch_results(batch_id):
+    """Downloads the JSONL results written so far."""
+    batch = get_batch(batch_id)
+    if not batch:
+        return jsonify({"error": "Unknown batch"}), 404
+    return send_file(batch.output_path, mimetype="application/x-ndjson") if os.path.exists(batch.output_path) else ("", 204)
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
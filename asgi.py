@@ -0,0 +1,111 @@
+import os
+import json
+import uuid
+import contextlib
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from app import TRUSTED_PROXIES, admission, app as flask_app
+from src.errors import error_response
+from src.http_client import aclose_async_client
+from src.logger import log_context
+from src.pipeline import agenerate_blog, astream_pipeline
+
+# Async entry point: `uvicorn asgi:app`
+# The generation endpoints run on the event loop; everything else (pages, jobs,
+# batches) is the unchanged Flask app, served through a WSGI bridge.
+
+def wants_trace(request) -> bool:
+    return request.query_params.get('trace') == '1' or os.environ.get('TRACE_REQUESTS') == '1'
+
+def request_id(request) -> str:
+    return request.headers.get('x-request-id') or uuid.uuid4().hex
+
+def client_id(request) -> str:
+    """Same identity as the Flask routes: the peer address, or X-Client-ID from a trusted proxy."""
+    peer = request.client.host if request.client else "unknown"
+    if peer in TRUSTED_PROXIES:
+        return request.headers.get('x-client-id') or peer
+    return peer
+
+def admission_slot(request):
+    """An async slot in the shared admission controller, or None when it is disabled."""
+    return admission.aslot(client_id(request)) if admission is not None else None
+
+async def analyze_video(request):
+    """Async /analyze: same request and response shape as the Flask route."""
+    data = await request.json()
+    video_url = data.get('video_url')
+
+    if not video_url:
+        return JSONResponse({"error": "No video URL provided"}, status_code=400)
+
+    rid = request_id(request)
+    with log_context(request_id=rid):
+        result = await agenerate_blog(
+            video_url, force_refresh=bool(data.get('force_refresh')), include_trace=wants_trace(request),
+            admission=admission_slot(request)
+        )
+
+    if result.get("error"):
+        body, status, headers = error_response(result["error"], result.get("error_info"))
+        return JSONResponse(body, status_code=status, headers={**headers, "X-Request-ID": rid})
+
+    body = {
+        "status": "success",
+        "blog_post": result["blog_post"],
+        "debug_analysis": result["video_analysis"],
+        "debug_research": result["research_summary"],
+        "usage": result["usage"],
+        "source": result["source"]
+    }
+    if "trace" in result:
+        body["trace"] = result["trace"]
+
+    return JSONResponse(
+        body,
+        headers={
+            "Server-Timing": ", ".join(f"{name};dur={duration}" for name, duration in result["timings"].items()),
+            "X-Request-ID": rid
+        }
+    )
+
+async def analyze_video_stream(request):
+    """Async /analyze/stream: Server-Sent Events, same event names as the Flask route."""
+    data = await request.json()
+    video_url = data.get('video_url')
+
+    if not video_url:
+        return JSONResponse({"error": "No video URL provided"}, status_code=400)
+
+    include_trace = wants_trace(request)
+    force_refresh = bool(data.get('force_refresh'))
+    rid = request_id(request)
+    slot = admission_slot(request)
+
+    async def generate():
+        # The body is produced after the handler returns, so the context is bound here
+        with log_context(request_id=rid):
+            async for event, payload in astream_pipeline(video_url, include_trace=include_trace, force_refresh=force_refresh, admission=slot):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Request-ID": rid}
+    )
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await aclose_async_client()
+
+app = Starlette(
+    routes=[
+        Route('/analyze', analyze_video, methods=['POST']),
+        Route('/analyze/stream', analyze_video_stream, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app))
+    ],
+    lifespan=lifespan
+)
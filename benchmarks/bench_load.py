@@ -0,0 +1,319 @@
+"""
+Load test for the Flask service, fully offline.
+
+Starts app.py in server processes where every external dependency is faked
+(yt-dlp extraction, the caption server, the LLM and web search, as in
+bench_pipeline), drives POST /analyze at increasing arrival rates, and reports
+per worker/thread configuration the sustained throughput, the saturation
+point and tail latency. Results go to benchmarks/results/ as JSON (--baseline
+compares against a previous file).
+
+    python -m benchmarks.bench_load --configs 1x8,1x32,2x16 --rates 1,2,4,8 --duration 20
+    python -m benchmarks.bench_load --configs 1x32 --admission 4 --clients 4 --hog 0.7
+
+A configuration WxT is W server processes with T request threads each;
+requests are spread round-robin over the processes, as a reverse proxy would.
+--admission sets ADMISSION_MAX_IN_FLIGHT per process (0 turns admission
+control off, so the thread count is the only limit).
+
+Arrivals are open-loop (Poisson, seeded): requests go out on schedule whether
+or not earlier ones have returned, so an overloaded server shows up as growing
+latency and rejections rather than as a slower client. A rate step is
+saturated when more than --tolerance of its requests fail or are rejected, or
+its median latency exceeds --latency-factor times the unloaded median
+(sequential requests after warm-up); the highest goodput before the first
+saturated step is the sustained throughput. With --hog, one client sends
+that share of the traffic and the rest is spread over --clients others, which
+shows whether admission keeps the light clients' latency down.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import http.client
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.bench_pipeline import add_fake_arguments, summarize, _change, _git_commit
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def serve(args):
+    """Child process: app.py behind a pooled WSGI server, fakes installed, port printed once ready."""
+    from werkzeug.serving import BaseWSGIServer
+    from benchmarks.bench_pipeline import configure_environment, install_fixtures, install_fakes
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """Werkzeug server with a fixed pool of request threads, like a gunicorn gthread worker."""
+
+        def __init__(self, host: str, port: int, app, threads: int):
+            super().__init__(host, port, app)
+            self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="request")
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    configure_environment(args)
+    fixture_server, _ = install_fixtures(args)
+    install_fakes(args)
+    from app import app
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, args.threads)
+    print(json.dumps({"port": server.server_port}), flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        fixture_server.stop()
+
+def start_servers(args, workers: int, threads: int) -> list:
+    env = dict(os.environ)
+    env.update({
+        "ADMISSION_MAX_IN_FLIGHT": str(args.admission),
+        "ADMISSION_MAX_QUEUED": str(args.max_queued),
+        "ADMISSION_QUEUE_TIMEOUT": str(args.queue_timeout),
+        # Every simulated client connects from loopback and is told apart by X-Client-ID
+        "ADMISSION_TRUSTED_PROXIES": "127.0.0.1",
+        "LOG_FILE": "off",
+        "LOG_CONSOLE": "off",
+        "PYTHONDONTWRITEBYTECODE": "1"
+    })
+    servers = []
+    for index in range(workers):
+        child = dict(vars(args), threads=threads, data_dir=os.path.join(args.data_dir, f"worker{index}"))
+        process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_load", "--serve", json.dumps(child)],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True
+        )
+        line = process.stdout.readline()
+        if not line:
+            stop_servers(servers + [(process, None)])
+            raise SystemExit(f"Server {index} of {workers}x{threads} failed to start")
+        servers.append((process, json.loads(line)["port"]))
+    return servers
+
+def stop_servers(servers: list):
+    for process, _ in servers:
+        process.terminate()
+    for process, _ in servers:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def post(port: int, video_url: str, client: str, timeout: float) -> tuple:
+    """(status, latency ms); status 0 when the connection failed or timed out."""
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request(
+            "POST", "/analyze", body=json.dumps({"video_url": video_url}),
+            headers={"Content-Type": "application/json", "X-Client-ID": client}
+        )
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except (OSError, http.client.HTTPException):
+        status = 0
+    finally:
+        connection.close()
+    return status, (time.perf_counter() - start) * 1000
+
+def client_names(args) -> tuple:
+    """The client IDs requests are sent as, and the weight of each."""
+    names = [f"client{index}" for index in range(args.clients)]
+    if not args.hog:
+        return names, [1.0] * len(names)
+    return ["hog"] + names, [args.hog] + [(1 - args.hog) / len(names)] * len(names)
+
+def run_step(args, ports: list, rate: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    names, weights = client_names(args)
+    schedule, at = [], 0.0
+    while at < args.duration:
+        schedule.append((at, rng.choices(names, weights)[0]))
+        at += rng.expovariate(rate)
+
+    outcomes = []
+    start = time.perf_counter()
+    # Enough threads that sending never waits on earlier requests (open loop)
+    with ThreadPoolExecutor(max_workers=args.max_connections) as executor:
+        futures = []
+        for index, (offset, client) in enumerate(schedule):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            video_url = f"https://www.youtube.com/watch?v=bench{index % args.videos:06d}"
+            futures.append((client, executor.submit(post, ports[index % len(ports)], video_url, client, args.timeout)))
+        outcomes = [(client, *future.result()) for client, future in futures]
+    wall = time.perf_counter() - start
+
+    ok = [latency for _, status, latency in outcomes if status == 200]
+    rejected = sum(1 for _, status, _ in outcomes if status in (429, 503))
+    failed = len(outcomes) - len(ok) - rejected
+    per_client = {}
+    for name in names:
+        mine = [(status, latency) for client, status, latency in outcomes if client == name]
+        if mine:
+            per_client[name] = {
+                "requests": len(mine),
+                "succeeded": sum(1 for status, _ in mine if status == 200),
+                "latency": summarize([latency for status, latency in mine if status == 200])
+            }
+
+    return {
+        "offered_rps": rate,
+        "arrival_rps": round(len(outcomes) / args.duration, 3),
+        "requests": len(outcomes),
+        "succeeded": len(ok),
+        "rejected": rejected,
+        "failed": failed,
+        # Successes per second of arrivals; the drain after the last arrival is reported separately
+        "goodput_rps": round(len(ok) / args.duration, 3),
+        "drain_s": round(max(0.0, wall - args.duration), 3),
+        "latency": summarize(ok),
+        "clients": per_client
+    }
+
+def unloaded_latency(ports: list, args) -> float:
+    """Median latency of sequential requests, the reference --latency-factor is applied to."""
+    latencies = []
+    for index in range(args.baseline_requests):
+        video_url = f"https://www.youtube.com/watch?v=bench{(args.videos - 1 - index) % args.videos:06d}"
+        status, latency = post(ports[index % len(ports)], video_url, "baseline", args.timeout)
+        if status != 200:
+            raise SystemExit(f"Unloaded request failed with HTTP {status}")
+        latencies.append(latency)
+    return summarize(latencies)["p50_ms"]
+
+def saturation(steps: list, unloaded_ms: float, args) -> dict:
+    """The first saturated rate step, and the best goodput of the steps before it."""
+    sustained = 0.0
+    for step in steps:
+        unhealthy = (step["rejected"] + step["failed"]) / step["requests"] if step["requests"] else 0.0
+        if unhealthy > args.tolerance or step["latency"]["p50_ms"] > args.latency_factor * unloaded_ms:
+            return {"sustained_rps": sustained, "saturated_at_rps": step["offered_rps"], "unloaded_p50_ms": unloaded_ms}
+        sustained = max(sustained, step["goodput_rps"])
+    return {"sustained_rps": sustained, "saturated_at_rps": None, "unloaded_p50_ms": unloaded_ms}
+
+def report(results: dict):
+    for name, config in results["configs"].items():
+        point = config["saturation"]
+        saturated = f"saturated at {point['saturated_at_rps']} rps" if point["saturated_at_rps"] else "not saturated"
+        print(f"\n{name}: sustained {point['sustained_rps']:.2f} rps, {saturated} (unloaded p50 {point['unloaded_p50_ms']:.0f} ms)")
+        print(f"  {'offered':>8} {'goodput':>8} {'ok':>5} {'rej':>5} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for step in config["steps"]:
+            print(
+                f"  {step['offered_rps']:>8.2f} {step['goodput_rps']:>8.2f} {step['succeeded']:>5} "
+                f"{step['rejected']:>5} {step['failed']:>5} {step['latency']['p50_ms']:>9.0f} "
+                f"{step['latency']['p95_ms']:>9.0f} {step['latency']['p99_ms']:>9.0f}"
+            )
+
+def compare(results: dict, baseline_path: str):
+    """Prints the sustained throughput delta per configuration."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nvs {os.path.basename(baseline_path)} ({baseline.get('meta', {}).get('commit')})")
+    for name, config in results["configs"].items():
+        before = baseline.get("configs", {}).get(name)
+        if not before:
+            continue
+        old, new = before["saturation"]["sustained_rps"], config["saturation"]["sustained_rps"]
+        print(f"  {name:8} sustained {old:.2f} -> {new:.2f} rps ({_change(old, new)})")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--serve"]:
+        return serve(argparse.Namespace(**json.loads(argv[1])))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default="1x8,1x32,2x16", help="Comma separated WORKERSxTHREADS server configurations")
+    parser.add_argument("--rates", default="1,2,4,8", help="Comma separated arrival rates (requests/s), in increasing order")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of arrivals per rate step")
+    parser.add_argument("--admission", type=int, default=8, help="ADMISSION_MAX_IN_FLIGHT per server process (0: off)")
+    parser.add_argument("--max-queued", type=int, default=32, help="ADMISSION_MAX_QUEUED per server process")
+    parser.add_argument("--queue-timeout", type=float, default=30.0, help="ADMISSION_QUEUE_TIMEOUT (s)")
+    parser.add_argument("--clients", type=int, default=4, help="Distinct X-Client-ID values")
+    parser.add_argument("--hog", type=float, default=0.0, help="Share of traffic from one extra heavy client")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Share of failed / rejected requests that counts as saturated")
+    parser.add_argument("--latency-factor", type=float, default=2.0, help="Median latency, as a multiple of unloaded, that counts as saturated")
+    parser.add_argument("--baseline-requests", type=int, default=3, help="Sequential requests measuring unloaded latency")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request (s)")
+    parser.add_argument("--max-connections", type=int, default=512, help="Upper bound on concurrent client connections")
+    parser.add_argument("--stop-after-saturation", type=int, default=1, help="Rate steps still run after the first saturated one")
+    parser.add_argument("--seed", type=int, default=7)
+    add_fake_arguments(parser, videos=64)
+    parser.add_argument("--data-dir", default="/tmp/bench-load-data")
+    parser.add_argument("--output", help="Results path (default: benchmarks/results/load-<time>.json)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    rates = [float(rate) for rate in args.rates.split(",") if rate.strip()]
+    configs = {}
+    for name in (config.strip() for config in args.configs.split(",") if config.strip()):
+        workers, _, threads = name.partition("x")
+        servers = start_servers(args, int(workers), int(threads))
+        try:
+            ports = [port for _, port in servers]
+            # Warm-up: builds graphs, pools and clients in every process outside the measurement
+            for port in ports:
+                status, _ = post(port, "https://www.youtube.com/watch?v=bench000000", "warmup", args.timeout)
+                if status != 200:
+                    raise SystemExit(f"Warm-up of {name} failed with HTTP {status}")
+            unloaded_ms = unloaded_latency(ports, args)
+
+            steps, past_saturation = [], None
+            for index, rate in enumerate(rates):
+                steps.append(run_step(args, ports, rate, args.seed + index))
+                print(f"{name} @ {rate} rps: {steps[-1]['goodput_rps']} rps goodput, p99 {steps[-1]['latency']['p99_ms']} ms", file=sys.stderr)
+                if saturation(steps, unloaded_ms, args)["saturated_at_rps"] is not None:
+                    past_saturation = 0 if past_saturation is None else past_saturation + 1
+                    if past_saturation >= args.stop_after_saturation:
+                        break
+        finally:
+            stop_servers(servers)
+
+        configs[name] = {
+            "workers": int(workers),
+            "threads": int(threads),
+            "saturation": saturation(steps, unloaded_ms, args),
+            "steps": steps
+        }
+
+    results = {
+        "meta": {
+            "benchmark": "load",
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args)
+        },
+        "configs": configs
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    report(results)
+    print(f"results written to {output}", file=sys.stderr)
+    if args.baseline:
+        compare(results, args.baseline)
+    return results
+
+if __name__ == "__main__":
+    main()
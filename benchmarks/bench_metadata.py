@@ -0,0 +1,71 @@
+"""
+Caption-metadata path: the previous per-request full extraction vs. the fast path.
+
+Network time isn't reproducible offline, so this replays recorded-shape info
+dicts (benchmarks/fixtures.py) and measures the local work each path adds on
+top of the extractor: building YoutubeDL + options per request and running
+yt-dlp's format resolution (process_ie_result with 'format': 'best'), versus a
+reused YoutubeDL and the raw process=False result.
+
+    python -m benchmarks.bench_metadata --iterations 200 --formats 80
+"""
+import copy
+import json
+import time
+import argparse
+import statistics
+import yt_dlp
+from benchmarks.fixtures import make_info_dict
+from src.youtube import base_ydl_opts, full_ydl_opts, select_subtitle_track, _get_ydl
+
+def full_path(info: dict):
+    # Previous behaviour: options and YoutubeDL rebuilt per request, full processing
+    with yt_dlp.YoutubeDL(full_ydl_opts()) as ydl:
+        processed = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    return select_subtitle_track(processed)
+
+def fast_path(info: dict):
+    _get_ydl("fast") # reused per thread after the first call
+    return select_subtitle_track(copy.deepcopy(info))
+
+def measure(path, infos: list, iterations: int) -> dict:
+    path(infos[0]) # warm-up
+
+    latencies = []
+    for index in range(iterations):
+        start = time.perf_counter()
+        path(infos[index % len(infos)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--formats", type=int, default=80, help="Formats per fixture info dict")
+    parser.add_argument("--videos", type=int, default=10, help="Distinct fixture videos to cycle through")
+    args = parser.parse_args(argv)
+
+    base_ydl_opts() # resolve cookies once, as the app does
+    infos = [
+        make_info_dict(f"fixture{index:04d}", "http://127.0.0.1:9/subs", formats=args.formats, seed=index)
+        for index in range(args.videos)
+    ]
+
+    assert full_path(infos[0])[0] == fast_path(infos[0])[0], "paths chose different caption tracks"
+    results = {
+        "formats_per_video": args.formats,
+        "full_extraction": measure(full_path, infos, args.iterations),
+        "fast_captions_only": measure(fast_path, infos, args.iterations)
+    }
+
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+End-to-end blog pipeline benchmark, fully offline.
+
+Runs the agents, the composed pipeline or the /analyze route against fixture
+videos (generated, or recorded with `python -m benchmarks.fixtures`), a fake
+LLM with configurable latency / token rate and a fake search tool, at several
+concurrency levels. Reports throughput, p50/p95/p99 latency, a per-stage
+breakdown and memory, and writes everything to benchmarks/results/ as JSON so
+runs can be compared across commits (--baseline).
+
+    python -m benchmarks.bench_pipeline --target pipeline --concurrency 1,4,16 --requests 32
+    python -m benchmarks.bench_pipeline --target route --baseline benchmarks/results/<previous>.json
+
+Targets: agents (the three agents' run() back to back), pipeline (run_pipeline),
+async (arun_pipeline on one event loop), route (POST /analyze via the Flask test client).
+
+Each pipeline stage gets a fake of the model it is routed to, so per-stage
+latency reflects the routing: --model-profile sets a model's speed, and
+--routing single pins every stage to the large model for comparison.
+
+    python -m benchmarks.bench_pipeline --routing single --output /tmp/single.json
+    python -m benchmarks.bench_pipeline --baseline /tmp/single.json
+"""
+import gc
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+TARGETS = ("agents", "pipeline", "async", "route")
+
+# Fake model speeds as (time to first token s, tokens/s); other models use --llm-latency / --llm-tokens-per-second.
+# Ratios follow Groq's published throughput for the two default models.
+DEFAULT_MODEL_PROFILES = {"llama-3.1-8b-instant": (0.08, 1000.0)}
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+def summarize(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "mean_ms": round(statistics.mean(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0
+    }
+
+def configure_environment(args):
+    # Must run before the app and agents are imported: caches and limits read the environment
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ["DATA_DIR"] = args.data_dir
+    os.environ.setdefault("LOG_FILE", "off") # the route target imports the app, which sets up logging
+    os.environ["TRANSCRIPT_CACHE"] = "memory" if args.warm_caches else "off"
+    os.environ["LLM_CACHE"] = "on" if args.warm_caches else "off"
+    os.environ["SEARCH_CACHE"] = "on" if args.warm_caches else "off"
+    os.environ["RESULT_STORE"] = "sqlite" if args.warm_caches else "off"
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = "0" # no client-side throttling of the fake model
+    os.environ["LLM_TOKENS_PER_MINUTE"] = "0"
+    if args.routing == "single":
+        from src.llm_routing import LARGE_MODEL
+        os.environ["LLM_MODEL"] = LARGE_MODEL
+
+def install_fixtures(args):
+    """Starts the caption server and routes caption extraction to the fixture info dicts."""
+    from benchmarks.fixtures import FixtureServer, make_json3, make_info_dict, load_recorded, point_tracks_at
+    from src.telemetry import call_span
+    from src.utils import extract_video_id
+    import src.agents.video_analyzer as video_analyzer
+
+    if args.fixtures:
+        recorded, bodies = load_recorded(args.fixtures)
+        if not recorded:
+            raise SystemExit(f"No *.info.json fixtures in {args.fixtures}")
+        server = FixtureServer(bodies, latency=args.subtitle_latency)
+        base_url = server.start()
+        infos = {video_id: point_tracks_at(info, base_url, set(bodies)) for video_id, info in recorded.items()}
+    else:
+        video_ids = [f"bench{index:06d}" for index in range(args.videos)] # 11 chars, like real IDs
+        server = FixtureServer(
+            {f"/{video_id}.en.json3": make_json3(args.minutes, seed=index) for index, video_id in enumerate(video_ids)},
+            latency=args.subtitle_latency
+        )
+        base_url = server.start()
+        infos = {video_id: make_info_dict(video_id, base_url, seed=index) for index, video_id in enumerate(video_ids)}
+
+    def extract_caption_info(video_url: str) -> dict:
+        with call_span("ytdlp_extract", path="fixture"):
+            time.sleep(args.ytdlp_latency)
+            return infos[extract_video_id(video_url)]
+
+    video_analyzer.extract_caption_info = extract_caption_info
+    urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in infos]
+    return server, urls
+
+def model_profiles(args) -> dict:
+    profiles = dict(DEFAULT_MODEL_PROFILES)
+    for item in args.model_profile or []:
+        model, _, speed = item.partition("=")
+        latency, _, tokens_per_second = speed.partition("/")
+        profiles[model.strip()] = (float(latency), float(tokens_per_second))
+    return profiles
+
+def install_fakes(args) -> tuple:
+    """
+    Puts a fake of each stage's routed model (behind the real gateway / cache)
+    and the fake search tool into the shared registry. Returns (registry, {stage: model}).
+    """
+    from benchmarks.fakes import FakeChatModel, FakeSearchTool
+    from src.cache.llm import CachedLLM
+    from src.llm_gateway import LLMGateway
+    from src.llm_routing import DEFAULT_ROUTES, model_route
+    from src.registry import registry
+    from src.utils import get_rate_limits, get_response_cache
+
+    profiles = model_profiles(args)
+    routes = {}
+    for stage in DEFAULT_ROUTES:
+        model = model_route(stage)["model"]
+        latency, tokens_per_second = profiles.get(model, (args.llm_latency, args.llm_tokens_per_second))
+        llm = LLMGateway(
+            FakeChatModel(
+                model_name=model,
+                latency=latency,
+                tokens_per_second=tokens_per_second,
+                completion_tokens=args.llm_completion_tokens
+            ),
+            get_rate_limits(model)
+        )
+        registry._llms[stage] = CachedLLM(llm, get_response_cache()) if args.warm_caches else llm
+        routes[stage] = model
+
+    registry.researcher().search_tool = FakeSearchTool(latency=args.search_latency)
+    return registry, routes
+
+def make_target(name: str, registry):
+    """Returns a callable url -> {stage: ms} that raises if the run reported an error."""
+    if name == "agents":
+        def run(url):
+            timings = {}
+            start = time.perf_counter()
+            analyzed = registry.analyzer().run(url)
+            timings["analyzer"] = (time.perf_counter() - start) * 1000
+            if analyzed.get("error"):
+                raise RuntimeError(analyzed["error"])
+
+            start = time.perf_counter()
+            researched = registry.researcher().run(analyzed["analysis"])
+            timings["researcher"] = (time.perf_counter() - start) * 1000
+            if researched.get("error"):
+                raise RuntimeError(researched["error"])
+
+            start = time.perf_counter()
+            registry.blogger().run(analyzed["analysis"], researched["research_summary"])
+            timings["blogger"] = (time.perf_counter() - start) * 1000
+            return timings
+        return run
+
+    if name in ("pipeline", "async"):
+        from src.pipeline import run_pipeline, arun_pipeline
+
+        def result_timings(result):
+            if result.get("error"):
+                raise RuntimeError(result["error"])
+            return result["timings"]
+
+        if name == "async":
+            async def arun(url):
+                return result_timings(await arun_pipeline(url))
+            return arun
+
+        return lambda url: result_timings(run_pipeline(url))
+
+    from app import app
+    client = app.test_client()
+
+    def post(url):
+        response = client.post("/analyze", json={"video_url": url})
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json().get("error"))
+        timings = {}
+        for item in response.headers.get("Server-Timing", "").split(","):
+            stage, _, duration = item.strip().partition(";dur=")
+            if duration:
+                timings[stage] = float(duration)
+        return timings
+    return post
+
+def run_level(target, urls: list, concurrency: int, requests: int, trace_memory: bool) -> dict:
+    latencies, stages, errors = [], {}, []
+
+    def one(index):
+        start = time.perf_counter()
+        try:
+            timings = target(urls[index % len(urls)])
+        except Exception as e:
+            errors.append(str(e)[:200])
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+        for stage, ms in timings.items():
+            stages.setdefault(stage, []).append(ms)
+
+    async def one_async(index, semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                timings = await target(urls[index % len(urls)])
+            except Exception as e:
+                errors.append(str(e)[:200])
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+            for stage, ms in timings.items():
+                stages.setdefault(stage, []).append(ms)
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one_async(index, semaphore) for index in range(requests)))
+
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    if asyncio.iscoroutinefunction(target):
+        asyncio.run(run_async())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - start
+
+    memory = {"rss_mb": _rss_mb(), "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if trace_memory:
+        memory["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        tracemalloc.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency": summarize(latencies),
+        "stages": {stage: summarize(values) for stage, values in sorted(stages.items())},
+        "memory": memory
+    }
+
+def compare(results: dict, baseline_path: str):
+    """Prints throughput / p95 deltas against a previous results file, then per-stage p50 deltas, level by level."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+
+    print(f"vs {os.path.basename(baseline_path)} ({baseline.get('meta', {}).get('commit')})", file=sys.stderr)
+    for level in results["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        print(
+            f"  c={level['concurrency']:<4} "
+            f"throughput {before['throughput_rps']:.2f} -> {level['throughput_rps']:.2f} rps "
+            f"({_change(before['throughput_rps'], level['throughput_rps'])}), "
+            f"p95 {before['latency']['p95_ms']:.0f} -> {level['latency']['p95_ms']:.0f} ms "
+            f"({_change(before['latency']['p95_ms'], level['latency']['p95_ms'])})",
+            file=sys.stderr
+        )
+        for stage, after in level["stages"].items():
+            previous_stage = before.get("stages", {}).get(stage)
+            if previous_stage:
+                print(
+                    f"      {stage:<20} p50 {previous_stage['p50_ms']:.0f} -> {after['p50_ms']:.0f} ms "
+                    f"({_change(previous_stage['p50_ms'], after['p50_ms'])})",
+                    file=sys.stderr
+                )
+
+def add_fake_arguments(parser, videos: int):
+    """Options for the fixture videos and fake models / search, shared with bench_load."""
+    parser.add_argument("--videos", type=int, default=videos, help="Distinct generated fixture videos")
+    parser.add_argument("--minutes", type=int, default=20, help="Length of each generated fixture video")
+    parser.add_argument("--fixtures", help="Directory of recorded fixtures to replay instead of generated ones")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--llm-completion-tokens", type=int, default=150)
+    parser.add_argument("--model-profile", action="append", metavar="MODEL=LATENCY/TPS",
+                        help="Speed of one fake model, e.g. llama-3.1-8b-instant=0.08/1000 (repeatable)")
+    parser.add_argument("--routing", choices=("stages", "single"), default="stages",
+                        help="Per-stage model routing, or every stage on the large model")
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--ytdlp-latency", type=float, default=0.5, help="Simulated metadata extraction time (s)")
+    parser.add_argument("--subtitle-latency", type=float, default=0.05, help="Caption server latency per request (s)")
+    parser.add_argument("--warm-caches", action="store_true", help="Keep the transcript, LLM response and search caches and the result store on")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=TARGETS, default="pipeline")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    add_fake_arguments(parser, videos=8)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap peak (slower)")
+    parser.add_argument("--data-dir", default="/tmp/bench-pipeline-data")
+    parser.add_argument("--output", help="Results path (default: benchmarks/results/pipeline-<target>-<time>.json)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    configure_environment(args)
+    server, urls = install_fixtures(args)
+    try:
+        registry, routes = install_fakes(args)
+        target = make_target(args.target, registry)
+
+        # Warm-up: builds graphs, pools and clients outside the measurement
+        warm = run_level(target, urls, 1, 1, False)
+        if warm["errors"]:
+            raise SystemExit(f"Warm-up failed: {warm['error_samples']}")
+
+        levels = [
+            run_level(target, urls, int(level), args.requests, args.tracemalloc)
+            for level in args.concurrency.split(",") if level.strip()
+        ]
+    finally:
+        server.stop()
+
+    results = {
+        "meta": {
+            "benchmark": "pipeline",
+            "target": args.target,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "routes": routes
+        },
+        "levels": levels
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"pipeline-{args.target}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results["levels"], indent=2))
+    print(f"results written to {output}", file=sys.stderr)
+    if args.baseline:
+        compare(results, args.baseline)
+    return results
+
+def _change(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+    except (OSError, ValueError):
+        return None
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    main()
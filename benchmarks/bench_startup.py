@@ -0,0 +1,197 @@
+"""
+Cold start benchmark: how long a fresh worker takes to import the app and
+answer its first page requests, with agents built at startup (STARTUP_MODE=eager)
+vs on first use (lazy, the serverless default).
+
+Each trial is a new interpreter, timed from spawn to the first response for /
+and /product, then to a built pipeline (the cost lazy mode moves to the first
+generation). One extra run per mode under `python -X importtime` is summarized
+per top-level package, so the heavy imports on the startup path are visible.
+
+    python -m benchmarks.bench_startup --trials 5
+    python -m benchmarks.bench_startup --baseline benchmarks/results/<previous>.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("eager", "lazy")
+PAGES = ("/", "/product")
+
+# Runs in the child: wall-clock marks (comparable with the parent's spawn time) after each step
+CHILD = """
+import json, time
+marks = {}
+import app
+marks["import"] = time.time()
+client = app.app.test_client()
+for path in %r:
+    response = client.get(path)
+    assert response.status_code == 200, (path, response.status_code)
+    marks[path] = time.time()
+from src.registry import registry
+registry.pipeline()
+marks["pipeline"] = time.time()
+print(json.dumps(marks))
+"""
+
+def child_env(mode: str, data_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "STARTUP_MODE": mode,
+        "DATA_DIR": data_dir,
+        "LOG_FILE": "off",
+        "LOG_CONSOLE": "off",
+        "PYTHONDONTWRITEBYTECODE": "1"
+    })
+    # Clients are only constructed, never called
+    env.setdefault("GROQ_API_KEY", "bench-placeholder")
+    return env
+
+def run_trial(mode: str, data_dir: str) -> dict:
+    spawned = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD % (PAGES,)], cwd=ROOT, env=child_env(mode, data_dir),
+        capture_output=True, text=True, check=False
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"{mode} trial failed:\n{completed.stderr[-2000:]}")
+
+    marks = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "import_ms": round((marks["import"] - spawned) * 1000, 1),
+        "first_response_ms": {path: round((marks[path] - spawned) * 1000, 1) for path in PAGES},
+        "pipeline_ready_ms": round((marks["pipeline"] - spawned) * 1000, 1)
+    }
+
+def import_profile(mode: str, data_dir: str, top: int) -> dict:
+    """`python -X importtime -c "import app"`, with self time summed per top-level package."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=child_env(mode, data_dir),
+        capture_output=True, text=True, check=False
+    )
+
+    packages = defaultdict(int)
+    total_us = 0
+    modules = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        packages[name.split(".")[0]] += int(self_us)
+        modules += 1
+        if name == "app":
+            total_us = int(cumulative_us)
+
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": modules,
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in ranked}
+    }
+
+def summarize(trials: list) -> dict:
+    def stats(values):
+        values = sorted(values)
+        return {"median": round(statistics.median(values), 1), "min": values[0], "max": values[-1]}
+
+    return {
+        "import_ms": stats([trial["import_ms"] for trial in trials]),
+        "first_response_ms": {path: stats([trial["first_response_ms"][path] for trial in trials]) for path in PAGES},
+        "pipeline_ready_ms": stats([trial["pipeline_ready_ms"] for trial in trials])
+    }
+
+def report(results: dict):
+    modes = results["modes"]
+    print(f"{'':24}" + "".join(f"{mode:>12}" for mode in modes))
+    rows = [("import app", lambda m: m["summary"]["import_ms"]["median"])]
+    rows += [(f"first response {path}", lambda m, p=path: m["summary"]["first_response_ms"][p]["median"]) for path in PAGES]
+    rows += [("pipeline ready", lambda m: m["summary"]["pipeline_ready_ms"]["median"])]
+    rows += [("importtime total", lambda m: m["imports"]["total_ms"])]
+    for label, value in rows:
+        print(f"{label:24}" + "".join(f"{value(modes[mode]):>10.1f}ms" for mode in modes))
+
+    for mode in modes:
+        top = ", ".join(f"{name} {ms}" for name, ms in modes[mode]["imports"]["top_packages_ms"].items())
+        print(f"\n{mode} import self time by package (ms): {top}")
+
+def compare(results: dict, baseline_path: str):
+    """Prints median first-response deltas per mode against a previous results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')})")
+    for mode, current in results["modes"].items():
+        before = baseline["modes"].get(mode)
+        if not before:
+            continue
+        for path in PAGES:
+            old = before["summary"]["first_response_ms"][path]["median"]
+            new = current["summary"]["first_response_ms"][path]["median"]
+            print(f"  {mode:6} {path:10} {old:8.1f}ms -> {new:8.1f}ms ({(new - old) / old * 100:+.1f}%)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5, help="Fresh interpreters per mode")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma separated STARTUP_MODE values")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed in the import profile")
+    parser.add_argument("--output", help="Results path (default: benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    modes = {}
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as data_dir:
+        for mode in (mode.strip() for mode in args.modes.split(",") if mode.strip()):
+            run_trial(mode, data_dir) # warm the OS page cache, not the interpreter
+            trials = [run_trial(mode, data_dir) for _ in range(args.trials)]
+            modes[mode] = {
+                "summary": summarize(trials),
+                "imports": import_profile(mode, data_dir, args.top),
+                "trials": trials
+            }
+
+    results = {
+        "meta": {
+            "benchmark": "startup",
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args)
+        },
+        "modes": modes
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    report(results)
+    print(f"results written to {output}", file=sys.stderr)
+    if args.baseline:
+        compare(results, args.baseline)
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Subtitle download + parse: fresh session and response.json() (the previous
+implementation) vs. the pooled keep-alive session with the streaming json3 parser.
+
+    python -m benchmarks.bench_subtitles --minutes 120 --iterations 20
+"""
+import gc
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+import requests
+from benchmarks.fixtures import FixtureServer, make_json3
+from src.http_client import get_session, get_timeout, USER_AGENT
+from src.transcript import Transcript, iter_json3_events
+
+def fetch_legacy(url: str) -> str:
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    response = session.get(url)
+    data = response.json()
+    full_text = []
+    for event in data.get("events", []):
+        for seg in event.get("segs", []):
+            txt = seg.get("utf8", "").strip()
+            if txt:
+                full_text.append(txt)
+    return " ".join(full_text)
+
+def fetch_streaming(url: str) -> str:
+    with get_session().get(url, timeout=get_timeout(), stream=True) as response:
+        transcript = Transcript.from_json3(iter_json3_events(response.iter_content(chunk_size=64 * 1024)))
+    return transcript.text
+
+def measure(fetch, url: str, iterations: int) -> dict:
+    fetch(url) # warm-up
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fetch(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    fetch(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        "peak_alloc_mb": round(peak / 1024 / 1024, 2)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=120, help="Length of the fixture video")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial server latency per request (s)")
+    args = parser.parse_args(argv)
+
+    server = FixtureServer({"/captions.json3": make_json3(args.minutes)}, latency=args.latency)
+    base_url = server.start()
+    url = f"{base_url}/captions.json3"
+
+    try:
+        assert fetch_legacy(url) == fetch_streaming(url), "parsers disagree"
+        results = {
+            "fixture_minutes": args.minutes,
+            "body_bytes": len(server.bodies["/captions.json3"]),
+            "legacy": measure(fetch_legacy, url, args.iterations),
+            "pooled_streaming": measure(fetch_streaming, url, args.iterations)
+        }
+    finally:
+        server.stop()
+
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Offline stand-ins for the pipeline's remote dependencies: a chat model with
+configurable latency and token rate, and a web search tool.
+Both are deterministic in their inputs, so runs are repeatable.
+"""
+import time
+import asyncio
+import hashlib
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.transcript import estimate_tokens
+
+_VOCABULARY = (
+    "caching batching latency throughput transcript analysis research outline "
+    "model prompt token stream pipeline graph node agent search result summary"
+).split()
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that sleeps like a hosted LLM: `latency` seconds to the first
+    token, then `tokens_per_second` for `completion_tokens` tokens. Streams
+    token by token when LangGraph asks it to, and reports usage metadata.
+    Query-planning prompts get the JSON object the researcher's JSON mode produces.
+    """
+
+    model_name: str = "fake-llm"
+    temperature: float = 0.2
+    latency: float = 0.05
+    tokens_per_second: float = 500.0
+    completion_tokens: int = 100
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _reply(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+
+        if "search queries" in prompt:
+            topics = [_VOCABULARY[byte % len(_VOCABULARY)] for byte in digest[:3]]
+            return [f'{{"queries": ["latest {topics[0]} news", "{topics[1]} verified facts", "{topics[2]} updates 2024"]}}']
+
+        if "section edits" in prompt:
+            topic = _VOCABULARY[digest[0] % len(_VOCABULARY)]
+            return [f'{{"edits": [{{"section": 1, "content": "# Updated: {topic}\\n\\nLatest {topic} developments."}}], "new_sections": []}}']
+
+        return [
+            _VOCABULARY[digest[index % len(digest)] % len(_VOCABULARY)] + " "
+            for index in range(self.completion_tokens)
+        ]
+
+    def _usage(self, messages: List[BaseMessage], tokens: int) -> dict:
+        prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        return {"input_tokens": prompt_tokens, "output_tokens": tokens, "total_tokens": prompt_tokens + tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply(messages)
+        time.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply(messages)
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any):
+        tokens = self._reply(messages)
+        time.sleep(self.latency)
+        for index, token in enumerate(tokens):
+            time.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, len(tokens)) if index == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any):
+        tokens = self._reply(messages)
+        await asyncio.sleep(self.latency)
+        for index, token in enumerate(tokens):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, len(tokens)) if index == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+class FakeSearchTool:
+    """
+    Search tool with a fixed per-query latency, returning results shaped like
+    DuckDuckGoSearchResults(output_format="list"): [{title, link, snippet}].
+    Every query draws its `max_results` pages from one pool of `pages`, so
+    overlapping queries return some of the same links, as a real engine does.
+    """
+
+    def __init__(self, latency: float = 0.3, max_results: int = 5, pages: int = 12, snippet_chars: int = 300):
+
+        self.latency = latency
+        self.max_results = max_results
+        self.pages = pages
+        self.snippet_chars = snippet_chars
+
+    def _page(self, index: int) -> dict:
+        digest = hashlib.sha256(f"page-{index}".encode("utf-8")).digest()
+        words = [_VOCABULARY[byte % len(_VOCABULARY)] for byte in digest]
+        sentence = " ".join(words) + ". "
+        return {
+            "title": f"{words[0].title()} and {words[1]}: what changed",
+            "link": f"https://example.com/{words[0]}-{words[1]}-{index}",
+            "snippet": (sentence * (self.snippet_chars // len(sentence) + 1))[:self.snippet_chars]
+        }
+
+    def _results(self, query: str) -> list:
+        ranked = sorted(
+            range(self.pages),
+            key=lambda index: hashlib.sha256(f"{query}|{index}".encode("utf-8")).digest()
+        )
+        return [self._page(index) for index in ranked[:self.max_results]]
+
+    def invoke(self, query: str, config=None, **kwargs) -> list:
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def ainvoke(self, query: str, config=None, **kwargs) -> list:
+        await asyncio.sleep(self.latency)
+        return self._results(query)
@@ -0,0 +1,183 @@
+"""
+Deterministic stand-ins for the recorded inputs the pipeline consumes:
+json3 caption bodies, yt-dlp info dicts, and a local HTTP server to serve them.
+
+Real inputs can be recorded once and replayed instead of the generated ones:
+
+    python -m benchmarks.fixtures --out benchmarks/recorded https://www.youtube.com/watch?v=...
+
+writes <video_id>.info.json and <video_id>.<lang>.json3 per video (network required).
+"""
+import os
+import copy
+import gzip
+import glob
+import json
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "the model we trained on this data shows that latency drops when you cache "
+    "results and reuse connections instead of paying setup on every single request"
+).split()
+
+def make_json3(minutes: int, seed: int = 7) -> dict:
+    """A json3 auto-caption document shaped like YouTube's: one event per ~2s, one seg per word."""
+    rng = random.Random(seed)
+    events = [{"tStartMs": 0, "dDurationMs": minutes * 60000, "id": 1, "wpWinPosId": 1, "wsWinStyleId": 1}]
+    for index in range(minutes * 30):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(4, 9))]
+        events.append({
+            "tStartMs": index * 2000,
+            "dDurationMs": 2000,
+            "wWinId": 1,
+            "segs": [{"utf8": ("" if i == 0 else " ") + word, "tOffsetMs": i * 200, "acAsrConf": 0} for i, word in enumerate(words)]
+        })
+        events.append({"tStartMs": index * 2000 + 1900, "dDurationMs": 100, "wWinId": 1, "aAppend": 1, "segs": [{"utf8": "\n"}]})
+
+    return {"wireMagic": "pb3", "pens": [{}], "wsWinStyles": [{}], "wpWinPositions": [{}], "events": events}
+
+def make_info_dict(video_id: str, subtitle_base_url: str, formats: int = 60, seed: int = 7) -> dict:
+    """A yt-dlp info dict with the format/thumbnail bulk of a real watch page and json3 caption tracks."""
+    rng = random.Random(seed)
+
+    def tracks(lang):
+        return [
+            {"ext": ext, "url": f"{subtitle_base_url}/{video_id}.{lang}.{ext}", "name": lang}
+            for ext in ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")
+        ]
+
+    return {
+        "id": video_id,
+        "title": f"Fixture video {video_id}",
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "extractor": "youtube",
+        "extractor_key": "Youtube",
+        "duration": 1800,
+        "formats": [
+            {
+                "format_id": str(100 + index),
+                "url": f"https://rr1---sn-fixture.googlevideo.com/videoplayback?itag={100 + index}&id={video_id}",
+                "ext": rng.choice(["mp4", "webm", "m4a"]),
+                "width": rng.choice([None, 640, 1280, 1920]),
+                "height": rng.choice([None, 360, 720, 1080]),
+                "tbr": rng.uniform(50, 5000),
+                "vcodec": rng.choice(["avc1.64001F", "vp9", "none"]),
+                "acodec": rng.choice(["mp4a.40.2", "opus", "none"]),
+                "protocol": "https",
+            }
+            for index in range(formats)
+        ],
+        "thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id}/{index}.jpg", "id": str(index)} for index in range(40)],
+        "subtitles": {},
+        "automatic_captions": {lang: tracks(lang) for lang in ("en", "es", "de", "fr", "hi", "ja")},
+    }
+
+class FixtureServer:
+    """Serves json3 bodies (gzip when asked) from a background thread on localhost."""
+
+    def __init__(self, bodies: dict, latency: float = 0.0):
+
+        self.bodies = {path: json.dumps(body).encode("utf-8") for path, body in bodies.items()}
+        self.gzipped = {path: gzip.compress(body) for path, body in self.bodies.items()}
+        self.latency = latency
+        self.requests = 0
+        self._server = None
+
+    def start(self) -> str:
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fixture.requests += 1
+                path = self.path.split("?")[0]
+                if path not in fixture.bodies:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if fixture.latency:
+                    threading.Event().wait(fixture.latency)
+
+                use_gzip = "gzip" in (self.headers.get("Accept-Encoding") or "")
+                body = fixture.gzipped[path] if use_gzip else fixture.bodies[path]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if use_gzip:
+                    self.send_header("Content-Encoding", "gzip")
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+def load_recorded(directory: str):
+    """Reads recorded fixtures: returns ({video_id: info dict}, {"/<video_id>.<lang>.json3": json3 body})."""
+    infos, bodies = {}, {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.info.json"))):
+        with open(path, encoding="utf-8") as f:
+            info = json.load(f)
+        infos[info["id"]] = info
+
+    for path in sorted(glob.glob(os.path.join(directory, "*.json3"))):
+        with open(path, encoding="utf-8") as f:
+            bodies["/" + os.path.basename(path)] = json.load(f)
+
+    return infos, bodies
+
+def point_tracks_at(info: dict, base_url: str, available: set) -> dict:
+    """Copy of a recorded info dict whose json3 tracks point at the fixture server."""
+    info = copy.deepcopy(info)
+    for key in ("subtitles", "automatic_captions"):
+        for lang, tracks in (info.get(key) or {}).items():
+            path = f"/{info['id']}.{lang}.json3"
+            for track in tracks:
+                if track.get("ext") == "json3" and path in available:
+                    track["url"] = base_url + path
+    return info
+
+def record(urls: list, directory: str):
+    """Captures the info dict and chosen json3 track of each video for later offline replay."""
+    from src.http_client import get_session, get_timeout
+    from src.youtube import extract_caption_info, select_subtitle_track
+
+    os.makedirs(directory, exist_ok=True)
+    for url in urls:
+        info = extract_caption_info(url)
+        lang, track_url = select_subtitle_track(info)
+        if not track_url:
+            print(f"skipped {url}: no captions")
+            continue
+
+        response = get_session().get(track_url, timeout=get_timeout())
+        response.raise_for_status()
+
+        with open(os.path.join(directory, f"{info['id']}.info.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, default=str)
+        with open(os.path.join(directory, f"{info['id']}.{lang}.json3"), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"recorded {info['id']} ({lang})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record yt-dlp info dicts and json3 captions for offline benchmarks.")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(__file__), "recorded"))
+    args = parser.parse_args()
+    record(args.urls, args.out)
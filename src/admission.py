@@ -0,0 +1,242 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+from src.errors import DEFAULT_RETRY_AFTER, PipelineError
+from src.exception import CustomException
+from src.metrics import counter, histogram
+from src.utils import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_REQUESTS = counter(
+    "admission_requests_total",
+    "Pipeline runs by admission outcome: admitted, queue_full, client_limit or timeout.",
+    labelnames=("outcome",)
+)
+ADMISSION_WAIT = histogram("admission_wait_seconds", "Time admitted runs waited for a pipeline slot.")
+
+class AdmissionRejected(PipelineError):
+    """A run turned away by the admission controller; "overloaded" (503) or "client_limit" (429)."""
+
+class _Ticket:
+    __slots__ = ("client", "granted", "evicted", "wake")
+
+    def __init__(self, client: str, wake=None):
+        self.client = client
+        self.granted = False
+        self.evicted = False
+        # Called (under the lock) when the ticket is granted or evicted; async waiters only
+        self.wake = wake
+
+class AdmissionController:
+    """
+    Caps the pipelines running at once in this process at max_in_flight.
+    Runs past the cap wait in per-client FIFO queues served round-robin, so a
+    client sending many requests can't starve the others: each free slot goes
+    to the next client in turn, skipping clients already running
+    max_per_client (0: no cap). When max_queued are already waiting, the
+    client with the most waiting gives up its newest place to a lighter one;
+    a run that still finds no place, that would wait with
+    max_queued_per_client of its own, or that waits longer than
+    queue_timeout is rejected with a Retry-After instead of holding a worker
+    thread.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float,
+                 max_per_client: int = 0, max_queued_per_client: int = 0, retry_after: float = DEFAULT_RETRY_AFTER):
+
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_per_client = max_per_client
+        self.max_queued_per_client = max_queued_per_client
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._running = {}
+        # client -> waiting tickets; dict order is the round-robin order
+        self._waiting = OrderedDict()
+        self._queued = 0
+
+    @contextmanager
+    def slot(self, client: str):
+        """Holds a pipeline slot for `client` around the block; raises AdmissionRejected if none is granted."""
+        self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release(client)
+
+    @asynccontextmanager
+    async def aslot(self, client: str):
+        """slot() for coroutines: waits for the slot without blocking the event loop."""
+        await self.aacquire(client)
+        try:
+            yield
+        finally:
+            self.release(client)
+
+    def acquire(self, client: str):
+        start = time.perf_counter()
+        ticket = _Ticket(client)
+        with self._cond:
+            self._enqueue(ticket)
+            deadline = start + self.queue_timeout
+            while not self._check(ticket, deadline):
+                self._cond.wait(deadline - time.perf_counter())
+
+        ADMISSION_REQUESTS.labels("admitted").inc()
+        ADMISSION_WAIT.observe(time.perf_counter() - start)
+
+    async def aacquire(self, client: str):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+        ticket = _Ticket(client, wake=lambda: loop.call_soon_threadsafe(woken.set))
+        with self._cond:
+            self._enqueue(ticket)
+
+        deadline = start + self.queue_timeout
+        try:
+            while True:
+                with self._cond:
+                    if self._check(ticket, deadline):
+                        break
+                    woken.clear()
+                try:
+                    await asyncio.wait_for(woken.wait(), deadline - time.perf_counter())
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # The request went away while waiting; give back its place or its slot
+            with self._cond:
+                granted = ticket.granted
+                self._withdraw(ticket)
+            if granted:
+                self.release(client)
+            raise
+
+        ADMISSION_REQUESTS.labels("admitted").inc()
+        ADMISSION_WAIT.observe(time.perf_counter() - start)
+
+    def _enqueue(self, ticket: _Ticket):
+        """Queues a ticket and grants it at once if a slot is free; raises AdmissionRejected if it can't wait."""
+        client = ticket.client
+        self._waiting.setdefault(client, deque()).append(ticket)
+        self._queued += 1
+        self._dispatch()
+
+        if not ticket.granted:
+            if self.max_queued_per_client and len(self._waiting[client]) > self.max_queued_per_client:
+                self._withdraw(ticket)
+                self._reject("client_limit", "Too many requests from this client are waiting", "client_limit")
+            if self._queued > self.max_queued:
+                heaviest = max(self._waiting, key=lambda name: len(self._waiting[name]))
+                if len(self._waiting[heaviest]) > len(self._waiting[client]):
+                    self._evict(self._waiting[heaviest][-1])
+                else:
+                    self._withdraw(ticket)
+                    self._reject("queue_full", "Server is at capacity, try again later", "overloaded")
+
+    def _check(self, ticket: _Ticket, deadline: float) -> bool:
+        """True once the ticket holds a slot; raises AdmissionRejected if it was evicted or timed out."""
+        if ticket.granted:
+            return True
+        if ticket.evicted:
+            self._reject("queue_full", "Server is at capacity, try again later", "overloaded")
+        if deadline - time.perf_counter() <= 0:
+            self._withdraw(ticket)
+            self._reject("timeout", "Timed out waiting for a pipeline slot", "overloaded")
+        return False
+
+    def release(self, client: str):
+        with self._cond:
+            self._in_flight -= 1
+            running = self._running.get(client, 0) - 1
+            if running > 0:
+                self._running[client] = running
+            else:
+                self._running.pop(client, None)
+            self._dispatch()
+
+    def _has_room(self, client: str) -> bool:
+        return not self.max_per_client or self._running.get(client, 0) < self.max_per_client
+
+    def _dispatch(self):
+        """Hands free slots to waiting tickets, one client at a time in round-robin order."""
+        granted = False
+        while self._in_flight < self.max_in_flight:
+            client = next((client for client in self._waiting if self._has_room(client)), None)
+            if client is None:
+                break
+
+            tickets = self._waiting.pop(client)
+            ticket = tickets.popleft()
+            if tickets:
+                # Back of the rotation
+                self._waiting[client] = tickets
+            self._queued -= 1
+            self._in_flight += 1
+            self._running[client] = self._running.get(client, 0) + 1
+            ticket.granted = True
+            granted = True
+            if ticket.wake:
+                ticket.wake()
+
+        if granted:
+            self._cond.notify_all()
+
+    def _withdraw(self, ticket: _Ticket):
+        tickets = self._waiting.get(ticket.client)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            self._queued -= 1
+            if not tickets:
+                del self._waiting[ticket.client]
+
+    def _evict(self, ticket: _Ticket):
+        self._withdraw(ticket)
+        ticket.evicted = True
+        if ticket.wake:
+            ticket.wake()
+        self._cond.notify_all()
+
+    def _reject(self, outcome: str, message: str, code: str):
+        ADMISSION_REQUESTS.labels(outcome).inc()
+        logger.warning("Admission rejected (%s): %d running, %d waiting", outcome, self._in_flight, self._queued)
+        raise AdmissionRejected(message, code, stage="admission", retry_after=self.retry_after)
+
+_controller = None
+_controller_lock = threading.Lock()
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Process-wide controller for the web routes that run pipelines; None when
+    ADMISSION_MAX_IN_FLIGHT=0. The per-client caps (ADMISSION_MAX_PER_CLIENT,
+    ADMISSION_MAX_QUEUED_PER_CLIENT) are off unless set. Job workers and
+    batches bound their own concurrency and don't go through it.
+    """
+    global _controller
+    if os.environ.get("ADMISSION_MAX_IN_FLIGHT") == "0":
+        return None
+
+    with _controller_lock:
+        if _controller is None:
+            try:
+                _controller = AdmissionController(
+                    max_in_flight=env_int("ADMISSION_MAX_IN_FLIGHT", 8),
+                    max_queued=env_int("ADMISSION_MAX_QUEUED", 32),
+                    queue_timeout=env_float("ADMISSION_QUEUE_TIMEOUT", 30.0),
+                    max_per_client=env_int("ADMISSION_MAX_PER_CLIENT", 0),
+                    max_queued_per_client=env_int("ADMISSION_MAX_QUEUED_PER_CLIENT", 0),
+                    retry_after=env_float("ADMISSION_RETRY_AFTER", DEFAULT_RETRY_AFTER)
+                )
+            except Exception as e:
+                raise CustomException(e, sys)
+        return _controller
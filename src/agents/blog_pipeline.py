@@ -0,0 +1,386 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Annotated, TypedDict, Optional, List
+from src.errors import PipelineError, classify, failure, log_failure, with_stage
+from src.exception import CustomException
+from src.logger import log_context
+from src.telemetry import stage_span
+from src.transcript import Transcript, CHARS_PER_TOKEN
+from src.utils import env_int, env_float
+
+logger = logging.getLogger(__name__)
+
+# Stored blogs are keyed by video and this version: bump it when prompts or the
+# graph change so results produced by the old pipeline are regenerated.
+PIPELINE_VERSION = os.environ.get("PIPELINE_VERSION") or "2026.10.1"
+
+def keep_first_error(current: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    """Reducer: parallel branches may both fail; the first error wins."""
+    return current or new
+
+class PipelineState(TypedDict):
+
+    video_url: str
+    transcript: Optional[Transcript]
+    partial_analyses: Optional[List[str]]
+    video_analysis: Optional[str]
+    search_queries: Optional[List[str]]
+    search_results: Optional[List[dict]]
+    research_summary: Optional[str]
+    outline: Optional[str]
+    blog_post: Optional[str]
+    error: Annotated[Optional[dict], keep_first_error]  # PipelineError.to_dict()
+
+# Node -> owning agent, in topological order
+NODE_AGENTS = {
+    "fetch_transcript": "analyzer",
+    "analyze_transcript": "analyzer",
+    "reduce_analysis": "analyzer",
+    "generate_queries": "researcher",
+    "perform_research": "researcher",
+    "draft_outline": "blogger",
+    "compact_research": "researcher",
+    "write_blog": "blogger"
+}
+
+def label_error(info: dict) -> dict:
+    """Prefixes an error's message with the agent that owns its stage, as run_pipeline always reported it."""
+    agent = NODE_AGENTS.get(info.get("stage"))
+    if not agent:
+        return info
+    return {**info, "message": f"{agent.capitalize()} Error: {info['message']}"}
+
+class RunHooks:
+    """Per-run callbacks for the sync path: agent-start notifications, per-agent limits and node timings."""
+
+    def __init__(self, on_agent=None, limits=None, timings=None):
+
+        self.on_agent = on_agent
+        self.limits = limits or {}
+        self.timings = timings if timings is not None else {}
+
+    def limit(self, agent: str):
+        return self.limits.get(agent) or nullcontext()
+
+_run_hooks: ContextVar[Optional[RunHooks]] = ContextVar("pipeline_run_hooks", default=None)
+
+class BlogPipelineAgent:
+    """
+    One StateGraph over the analyzer, researcher and blogger nodes, wired by
+    data dependency instead of agent boundaries:
+
+        fetch_transcript -> analyze_transcript (map) -+-> reduce_analysis -> draft_outline -+-> compact_research -> write_blog
+                                                      +-> generate_queries -> perform_research -+
+
+    Query generation starts from the per-chunk notes while they are still being
+    merged, and the outline is drafted while the searches are in flight. The
+    search results are then cut down to the snippets relevant to the analysis
+    and outline, so the blogger prompt stays within a fixed research budget.
+    Every superstep is checkpointed, so a stage that fails transiently (rate
+    limit, timeout, provider outage) is resumed from its checkpoint instead of
+    repeating the LLM calls upstream of it. Permanent failures, and transient
+    ones that outlast the retries, end the run with a typed `error` in the
+    returned state; nothing is raised to the caller.
+    """
+
+    def __init__(self, analyzer, researcher, blogger, checkpointer=None):
+
+        self.analyzer = analyzer
+        self.researcher = researcher
+        self.blogger = blogger
+        self.resume_attempts = env_int("PIPELINE_RESUME_ATTEMPTS", 1)
+        self.resume_delay = env_float("PIPELINE_RESUME_DELAY", 0.5)
+        self.query_context_chars = analyzer.chunk_tokens * CHARS_PER_TOKEN
+        # Transcripts are kept as objects in the state; pickle them in checkpoints
+        self.checkpointer = checkpointer or self._memory_checkpointer()
+        self.graph = self._build_graph()
+
+    def _memory_checkpointer(self):
+        from langgraph.checkpoint.memory import MemorySaver
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+        return MemorySaver(serde=JsonPlusSerializer(pickle_fallback=True))
+
+    def _build_graph(self):
+        try:
+            # LangGraph is imported when the graph is built, not when the module is:
+            # app.py and pipeline.py need only PIPELINE_VERSION / NODE_AGENTS at startup
+            from langgraph.graph import StateGraph, END, START
+
+            graph = StateGraph(PipelineState)
+
+            graph.add_node("fetch_transcript", self._node(
+                "fetch_transcript", self.analyzer._fetch_transcript, self.analyzer._afetch_transcript))
+            graph.add_node("analyze_transcript", self._node(
+                "analyze_transcript", self._map_analysis, self._amap_analysis))
+            graph.add_node("reduce_analysis", self._node(
+                "reduce_analysis", self._reduce_analysis, self._areduce_analysis))
+            graph.add_node("generate_queries", self._node(
+                "generate_queries", self._generate_queries, self._agenerate_queries))
+            graph.add_node("perform_research", self._node(
+                "perform_research", self.researcher._perform_research, self.researcher._aperform_research))
+            graph.add_node("draft_outline", self._node(
+                "draft_outline", self.blogger._draft_outline, self.blogger._adraft_outline))
+            graph.add_node("compact_research", self._node(
+                "compact_research", self.researcher._compact_research, self.researcher._acompact_research))
+            graph.add_node("write_blog", self._node(
+                "write_blog", self._write_blog, self._awrite_blog))
+
+            graph.add_edge(START, "fetch_transcript")
+            graph.add_edge("fetch_transcript", "analyze_transcript")
+
+            # Fan out: both branches only need the chunk notes
+            graph.add_edge("analyze_transcript", "reduce_analysis")
+            graph.add_edge("analyze_transcript", "generate_queries")
+            graph.add_edge("reduce_analysis", "draft_outline")
+            graph.add_edge("generate_queries", "perform_research")
+
+            # Join: compaction ranks the research against the analysis and outline
+            graph.add_edge(["perform_research", "draft_outline"], "compact_research")
+            graph.add_edge("compact_research", "write_blog")
+            graph.add_edge("write_blog", END)
+
+            return graph.compile(checkpointer=self.checkpointer)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _node(self, name: str, func, afunc):
+        """
+        Wraps an agent method as a node: skipped once an upstream stage has
+        failed, timed (into pipeline_stage_seconds and the request trace), throttled by the caller's per-agent limit.
+        A permanent failure is written to the state as a typed error; a
+        transient one is raised as a PipelineError so run() resumes the stage
+        from its checkpoint.
+        """
+        agent = NODE_AGENTS[name]
+
+        def settle(update):
+            update = with_stage(update, name)
+            error = update.get("error")
+            if not error:
+                return update
+
+            if error.get("kind") == "transient":
+                raise PipelineError.from_dict(error)
+            return {**update, "error": label_error(error)}
+
+        def fail(e: Exception):
+            error = log_failure(classify(e, name), e)
+            return settle({"error": error.to_dict()})
+
+        def run(state: PipelineState):
+            if state.get("error"):
+                return {}
+
+            hooks = _run_hooks.get() or RunHooks()
+            if hooks.on_agent:
+                hooks.on_agent(agent)
+            with hooks.limit(agent), stage_span(name) as attrs, log_context(stage=name):
+                attrs["agent"] = agent
+                start = time.perf_counter()
+                try:
+                    update = func(state)
+                except Exception as e:
+                    return fail(e)
+                hooks.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+                return settle(update)
+
+        async def arun(state: PipelineState):
+            if state.get("error"):
+                return {}
+
+            hooks = _run_hooks.get() or RunHooks()
+            with stage_span(name) as attrs, log_context(stage=name):
+                attrs["agent"] = agent
+                start = time.perf_counter()
+                try:
+                    update = await afunc(state)
+                except Exception as e:
+                    return fail(e)
+                hooks.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+                return settle(update)
+
+        from langchain_core.runnables import RunnableLambda
+        return RunnableLambda(run, afunc=arun, name=name)
+
+    def _map_analysis(self, state: PipelineState):
+        transcript = state.get("transcript")
+        if not transcript:
+            return failure("No transcript available for analysis.", "no_transcript")
+        return {"partial_analyses": self.analyzer.map_chunks(transcript)}
+
+    async def _amap_analysis(self, state: PipelineState):
+        transcript = state.get("transcript")
+        if not transcript:
+            return failure("No transcript available for analysis.", "no_transcript")
+        return {"partial_analyses": await self.analyzer.amap_chunks(transcript)}
+
+    def _reduce_analysis(self, state: PipelineState):
+        return {"video_analysis": self.analyzer.reduce_partials(state["partial_analyses"])}
+
+    async def _areduce_analysis(self, state: PipelineState):
+        return {"video_analysis": await self.analyzer.areduce_partials(state["partial_analyses"])}
+
+    def _generate_queries(self, state: PipelineState):
+        return self.researcher._generate_queries({"video_analysis": self._query_context(state)})
+
+    async def _agenerate_queries(self, state: PipelineState):
+        return await self.researcher._agenerate_queries({"video_analysis": self._query_context(state)})
+
+    def _query_context(self, state: PipelineState) -> str:
+        # Search planning only needs the topics, so the un-merged notes (clipped to one window) are enough
+        return "\n\n".join(state["partial_analyses"])[:self.query_context_chars]
+
+    def _write_blog(self, state: PipelineState):
+        if not state.get("research_summary"):
+            return {}
+        return self.blogger._write_blog({**state, "research_findings": state["research_summary"]})
+
+    async def _awrite_blog(self, state: PipelineState):
+        if not state.get("research_summary"):
+            return {}
+        return await self.blogger._awrite_blog({**state, "research_findings": state["research_summary"]})
+
+    def run(self, video_url: str, on_agent=None, limits=None, timings=None):
+        """
+        Entry point. A stage failing transiently is retried PIPELINE_RESUME_ATTEMPTS
+        times from the last checkpoint; the checkpoint is dropped once the run
+        ends either way. Failures are returned in the state's `error`, never raised.
+
+        `on_agent(name)` is called as each agent's nodes start, `limits` maps an
+        agent name to a context manager held around its nodes, and `timings`
+        (if given) is filled with per-node durations in ms.
+        """
+        hooks = RunHooks(on_agent, limits, timings)
+        token = _run_hooks.set(hooks)
+        config = self._config()
+        try:
+            payload = self._initial_state(video_url)
+            for attempt in range(self.resume_attempts + 1):
+                try:
+                    state = self.graph.invoke(payload, config)
+                    break
+                except Exception as e:
+                    error = classify(e)
+                    if not self._should_resume(config, attempt, error):
+                        return self._give_up(config, error)
+                    time.sleep(self._resume_delay(error, attempt))
+                    payload = None # resume from the checkpoint
+
+            self._forget(config)
+            return state
+
+        finally:
+            _run_hooks.reset(token)
+
+    async def arun(self, video_url: str, timings=None):
+        """Async entry point with the same resume behaviour as run()."""
+        hooks = RunHooks(timings=timings)
+        token = _run_hooks.set(hooks)
+        config = self._config()
+        try:
+            payload = self._initial_state(video_url)
+            for attempt in range(self.resume_attempts + 1):
+                try:
+                    state = await self.graph.ainvoke(payload, config)
+                    break
+                except Exception as e:
+                    error = classify(e)
+                    if not self._should_resume(config, attempt, error):
+                        return self._give_up(config, error)
+                    await asyncio.sleep(self._resume_delay(error, attempt))
+                    payload = None
+
+            self._forget(config)
+            return state
+
+        finally:
+            _run_hooks.reset(token)
+
+    def stream(self, video_url: str, stream_mode="updates"):
+        """
+        Streaming entry point: LangGraph events from every node, resuming failed
+        stages like run(). A final failure is yielded as an update from its stage.
+        """
+        config = self._config()
+        payload = self._initial_state(video_url)
+        for attempt in range(self.resume_attempts + 1):
+            try:
+                yield from self.graph.stream(payload, config, stream_mode=stream_mode)
+                break
+            except Exception as e:
+                error = classify(e)
+                if not self._should_resume(config, attempt, error):
+                    yield self._error_event(self._give_up(config, error)["error"], stream_mode)
+                    return
+                time.sleep(self._resume_delay(error, attempt))
+                payload = None
+        self._forget(config)
+
+    async def astream(self, video_url: str, stream_mode="updates"):
+        config = self._config()
+        payload = self._initial_state(video_url)
+        for attempt in range(self.resume_attempts + 1):
+            try:
+                async for event in self.graph.astream(payload, config, stream_mode=stream_mode):
+                    yield event
+                break
+            except Exception as e:
+                error = classify(e)
+                if not self._should_resume(config, attempt, error):
+                    yield self._error_event(self._give_up(config, error)["error"], stream_mode)
+                    return
+                await asyncio.sleep(self._resume_delay(error, attempt))
+                payload = None
+        self._forget(config)
+
+    def _config(self) -> dict:
+        return {"configurable": {"thread_id": uuid.uuid4().hex}}
+
+    def _should_resume(self, config: dict, attempt: int, error: PipelineError) -> bool:
+        if not error.transient or attempt >= self.resume_attempts:
+            return False
+
+        logger.warning("Pipeline run %s failed at %s (%s), resuming from the last checkpoint",
+                       config["configurable"]["thread_id"], error.stage, error.code)
+        return True
+
+    def _resume_delay(self, error: PipelineError, attempt: int) -> float:
+        return min(error.retry_after or self.resume_delay * (2 ** attempt), 30.0)
+
+    def _give_up(self, config: dict, error: PipelineError) -> dict:
+        """Ends a failed run: returns its last checkpointed state with the error and drops the checkpoint."""
+        try:
+            values = dict(self.graph.get_state(config).values)
+        except Exception:
+            values = {}
+
+        self._forget(config)
+        return {**values, "error": label_error(error.to_dict())}
+
+    def _error_event(self, error: dict, stream_mode):
+        update = {error.get("stage") or "pipeline": {"error": error}}
+        return ("updates", update) if isinstance(stream_mode, list) else update
+
+    def _forget(self, config: dict):
+        self.checkpointer.delete_thread(config["configurable"]["thread_id"])
+
+    def _initial_state(self, video_url: str):
+        return {
+            "video_url": video_url,
+            "transcript": None,
+            "partial_analyses": None,
+            "video_analysis": None,
+            "search_queries": [],
+            "search_results": None,
+            "research_summary": None,
+            "outline": None,
+            "blog_post": None,
+            "error": None
+        }
@@ -3,20 +3,27 @@ from typing import TypedDict, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, END, START
 from src.exception import CustomException
+from src.revision import split_sections, number_sections, parse_section_edits, apply_section_edits
+from src.telemetry import traced_node
 from src.utils import get_llm
 
 class AgentState(TypedDict):
 
     video_analysis: str
     research_findings: str
+    outline: Optional[str]
     blog_post: Optional[str]
-    error: Optional[str]
+    error: Optional[dict]
 
 class BloggerAgent:
 
-    def __init__(self, llm = get_llm()):
+    def __init__(self, llm=None, outline_llm=None, revise_llm=None):
         
-        self.llm = llm
+        self.llm = llm if llm else get_llm("blog")
+        # Planning is a short, structured task: it gets its own (fast) route
+        self.outline_llm = outline_llm if outline_llm else (llm if llm else get_llm("outline"))
+        # Section edits come back as JSON (see revise())
+        self.revise_llm = revise_llm if revise_llm else (llm if llm else get_llm("revise"))
         self.graph = self._build_graph()
 
     def _build_graph(self):
@@ -24,7 +31,7 @@ class BloggerAgent:
 
             graph = StateGraph(AgentState)
 
-            graph.add_node("write_blog", self._write_blog)
+            graph.add_node("write_blog", traced_node("write_blog", self._write_blog, self._awrite_blog))
 
             graph.add_conditional_edges(
                 START,
@@ -43,74 +50,181 @@ class BloggerAgent:
 
     def _write_blog(self, state: AgentState):
         """Node: Generates the blog post using the LLM."""
-        try:
-            
-            video_analysis = state.get("video_analysis")
-            research_findings = state.get("research_findings")
+        response = self.llm.invoke(self._blog_messages(state))
+        content = response.content if hasattr(response, 'content') else str(response)
+
+        return {"blog_post": content}
+
+    async def _awrite_blog(self, state: AgentState):
+        response = await self.llm.ainvoke(self._blog_messages(state))
+        content = response.content if hasattr(response, 'content') else str(response)
+
+        return {"blog_post": content}
+
+    def _draft_outline(self, state: AgentState):
+        """
+        Node (composed pipeline only): plans the post from the video analysis
+        alone, so it can run while the web searches are still in flight.
+        """
+        response = self.outline_llm.invoke(self._outline_messages(state))
+        return {"outline": response.content if hasattr(response, 'content') else str(response)}
+
+    async def _adraft_outline(self, state: AgentState):
+        response = await self.outline_llm.ainvoke(self._outline_messages(state))
+        return {"outline": response.content if hasattr(response, 'content') else str(response)}
+
+    def write_blog(self, video_analysis: str, research_findings: str) -> dict:
+        """Writes a post outside the graph, without an outline: {"blog_post": ...}."""
+        return self._write_blog(self._initial_state(video_analysis, research_findings))
+
+    def revise(self, blog_post: str, new_findings: str) -> dict:
+        """
+        Incremental refresh: the model rewrites only the sections the new research
+        affects (or adds one), and the edits are applied to the stored post.
+        Returns {"blog_post", "edited_sections"}; raises ValueError if the edits can't be applied.
+        """
+        sections = split_sections(blog_post)
+        response = self.revise_llm.invoke(self._revise_messages(sections, new_findings))
+        content = response.content if hasattr(response, 'content') else str(response)
+
+        edits, inserts = parse_section_edits(content, len(sections))
+        return {
+            "blog_post": apply_section_edits(sections, edits, inserts),
+            "edited_sections": len(edits) + len(inserts)
+        }
 
-            prompt = f"""
-            Create a high-quality blog post based on the following information.
+    def _revise_messages(self, sections: list, new_findings: str):
+        prompt = f"""
+        A published blog post needs updating with research findings that came out since it was written.
+
+        The post, split into numbered sections:
+        {number_sections(sections)}
+
+        New findings:
+        {new_findings}
+
+        Return section edits as JSON. Change only the sections the new findings affect,
+        keep the tone and formatting, and add a new section only if no existing one fits.
+
+        OUTPUT FORMAT:
+        Return ONLY a JSON object. Each edit's content is the full updated section in Markdown, heading included.
+        {{"edits": [{{"section": 2, "content": "..."}}], "new_sections": [{{"after": 3, "content": "..."}}]}}
+        Use empty lists when nothing needs to change.
+        """
+
+        return [
+            SystemMessage(content="You are a professional blog editor. You make precise, minimal updates to published articles."),
+            HumanMessage(content=prompt)
+        ]
+
+    def _outline_messages(self, state: AgentState):
+        prompt = f"""
+        Plan a blog post about the following video.
+
+        Video Analysis:
+        {state.get("video_analysis")}
+
+        Output ONLY an outline in Markdown:
+        - A working title
+        - The hook for the introduction
+        - 3 to 6 section headers, each with 2-3 bullet points of what it covers
+        - The call to action for the conclusion
+        """
+
+        return [
+            SystemMessage(content="You are a professional blog editor. You plan clear, well-structured articles."),
+            HumanMessage(content=prompt)
+        ]
+
+    def _blog_messages(self, state: AgentState):
+        video_analysis = state.get("video_analysis")
+        research_findings = state.get("research_findings")
+        outline = state.get("outline")
+
+        prompt = f"""
+        Create a high-quality blog post based on the following information.
+    
+        SOURCE 1: Video Analysis (Core Content)
+        {video_analysis}
+        
+        SOURCE 2: External Research (Latest Context)
+        {research_findings}
         
-            SOURCE 1: Video Analysis (Core Content)
-            {video_analysis}
-            
-            SOURCE 2: External Research (Latest Context)
-            {research_findings}
-            
-            Requirements:
-            - Catchy Title (Make it click-worthy)
-            - Engaging Introduction (Hook the reader immediately)
-            - Well-structured body with clear headers
-            - Integrate the external research naturally to add value
-            - Conclusion with a call to action
-            - Use Markdown formatting
-            - Tone: Fun, informative, and accessible to general readers
-            """
-
-            messages = [
-                SystemMessage(content="You are a professional blog writer. You write engaging, viral-ready, and SEO-optimized articles."),
-                HumanMessage(content=prompt)
-            ]
-
-            response = self.llm.invoke(messages)
-            content = response.content if hasattr(response, 'content') else str(response)
-
-            return {"blog_post": content}
+        Requirements:
+        - Catchy Title (Make it click-worthy)
+        - Engaging Introduction (Hook the reader immediately)
+        - Well-structured body with clear headers
+        - Integrate the external research naturally to add value
+        - Conclusion with a call to action
+        - Use Markdown formatting
+        - Tone: Fun, informative, and accessible to general readers
+        """
 
-        except Exception as e:
-            raise CustomException(e, sys)
+        if outline:
+            prompt += f"""
+        Follow this outline, adjusting it where the research adds something new:
+        {outline}
+        """
+
+        return [
+            SystemMessage(content="You are a professional blog writer. You write engaging, viral-ready, and SEO-optimized articles."),
+            HumanMessage(content=prompt)
+        ]
 
     def _check_context(self, state: AgentState):
         """
         Router: Checks if necessary inputs exist before attempting to write.
         CRITICAL: Must ALWAYS return 'generate' or 'end'.
         """
-        try:
-            
-            if state.get("error"):
-                return "end"
-            v_analysis = state.get("video_analysis")
-            r_findings = state.get("research_findings")
-
-            if not v_analysis or not r_findings:
-                return "end"
-            
-            return "generate"
+        if state.get("error"):
+            return "end"
+        v_analysis = state.get("video_analysis")
+        r_findings = state.get("research_findings")
 
-        except Exception as e:
-            raise CustomException(e, sys)
+        if not v_analysis or not r_findings:
+            return "end"
+        
+        return "generate"
 
     def run(self, video_analysis: str, research_findings: str):
         """Entry point for the agent."""
         try:
-            initial_state = {
-                "video_analysis": video_analysis,
-                "research_findings": research_findings,
-                "blog_post": None,
-                "error": None
-            }
+            initial_state = self._initial_state(video_analysis, research_findings)
             final_state = self.graph.invoke(initial_state)
             return final_state
         
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    async def arun(self, video_analysis: str, research_findings: str):
+        """Async entry point for the agent."""
+        try:
+            return await self.graph.ainvoke(self._initial_state(video_analysis, research_findings))
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stream(self, video_analysis: str, research_findings: str, stream_mode="updates"):
+        """Streaming entry point: yields LangGraph events as each node completes."""
+        try:
+            return self.graph.stream(self._initial_state(video_analysis, research_findings), stream_mode=stream_mode)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def astream(self, video_analysis: str, research_findings: str, stream_mode="updates"):
+        """Async streaming entry point: an async iterator of LangGraph events."""
+        try:
+            return self.graph.astream(self._initial_state(video_analysis, research_findings), stream_mode=stream_mode)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _initial_state(self, video_analysis: str, research_findings: str):
+        return {
+            "video_analysis": video_analysis,
+            "research_findings": research_findings,
+            "outline": None,
+            "blog_post": None,
+            "error": None
+        }
@@ -1,35 +1,64 @@
 import sys
 import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import TypedDict, Optional, List
-from langchain_community.tools import DuckDuckGoSearchRun
+from langchain_community.tools import DuckDuckGoSearchResults
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import StateGraph, END, START
+from src.cache.search import as_results, collapse_queries, dedupe_results
+from src.compaction import compact_research, select_research
+from src.errors import failure
 from src.exception import CustomException
-from src.utils import get_llm
+from src.telemetry import traced_node, call_span, with_current_context
+from src.utils import get_llm, get_search_cache, env_int, env_float
+
+logger = logging.getLogger(__name__)
 
 class AgentState(TypedDict):
 
     video_analysis: str
     search_queries: Optional[List[str]]
+    search_results: Optional[List[dict]]
     research_summary: Optional[str]
-    error: Optional[str]
+    error: Optional[dict]
 
 class ResearchAgent:
 
     def __init__(self, llm=None):
         
-        self.llm = llm if llm else get_llm()
-        self.search_tool = DuckDuckGoSearchRun()
+        self.llm = llm if llm else get_llm("queries")
+        self.search_tool = DuckDuckGoSearchResults(
+            output_format="list",
+            max_results=env_int("SEARCH_MAX_RESULTS", 5)
+        )
+        self.search_cache = get_search_cache()
+        self.query_similarity = env_float("SEARCH_QUERY_SIMILARITY", 0.8)
+        self.research_token_budget = env_int("RESEARCH_TOKEN_BUDGET", 1200)
+        self.snippet_tokens = env_int("RESEARCH_SNIPPET_MAX_TOKENS", 160)
+        self.snippet_redundancy = env_float("RESEARCH_SNIPPET_REDUNDANCY", 0.6)
+        self.search_timeout = env_float("SEARCH_TIMEOUT", 10.0)
+        self.search_workers = env_int("SEARCH_MAX_WORKERS", 4)
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=self.search_workers,
+            thread_name_prefix="web-search"
+        )
         self.graph = self._build_graph()
 
+    def close(self):
+        self.search_executor.shutdown(wait=False, cancel_futures=True)
+
     def _build_graph(self):
 
         try:
 
             graph = StateGraph(AgentState)
 
-            graph.add_node("generate_queries", self._generate_queries)
-            graph.add_node("perform_research", self._perform_research)
+            graph.add_node("generate_queries", traced_node("generate_queries", self._generate_queries, self._agenerate_queries))
+            graph.add_node("perform_research", traced_node("perform_research", self._perform_research, self._aperform_research))
+            graph.add_node("compact_research", traced_node("compact_research", self._compact_research, self._acompact_research))
 
             graph.add_edge(START, "generate_queries")
             graph.add_conditional_edges(
@@ -40,120 +69,283 @@ class ResearchAgent:
                     "end": END
                 }
             )
-            graph.add_edge("perform_research", END)
+            graph.add_edge("perform_research", "compact_research")
+            graph.add_edge("compact_research", END)
 
             return graph.compile()
 
         except Exception as e:
             raise CustomException(e, sys)
 
-    def _search_web(self, query: str) -> str:
-        """Helper method to perform the search using LangChain's tool."""
-        try:
-            
-            result = self.search_tool.invoke(query)
-            return result
-        
-        except Exception as e:
-            raise CustomException(e, sys)
+    def _search_web(self, query: str) -> list:
+        """Helper method to perform the search using LangChain's tool, through the search cache."""
+        cached = self._cached_results(query)
+        if cached is not None:
+            return cached
+
+        with call_span("search", query=query):
+            results = as_results(self.search_tool.invoke(query))
+
+        self._cache_results(query, results)
+        return results
+
+    async def _asearch_web(self, query: str) -> list:
+        cached = self._cached_results(query)
+        if cached is not None:
+            return cached
+
+        with call_span("search", query=query):
+            results = as_results(await self.search_tool.ainvoke(query))
+
+        self._cache_results(query, results)
+        return results
+
+    def _cached_results(self, query: str):
+        return self.search_cache.get(query) if self.search_cache else None
+
+    def _cache_results(self, query: str, results: list):
+        if self.search_cache:
+            self.search_cache.put(query, results)
 
     def _generate_queries(self, state: AgentState):
         """Node 1: LLM generates search queries based on the video analysis."""
-        try:
-            video_analysis = state.get("video_analysis")
+        video_analysis = state.get("video_analysis")
+        
+        if not video_analysis:
+            return failure("No video analysis provided for research context.", "internal")
+
+        response = self.llm.invoke(self._query_messages(video_analysis))
+        return self._parse_queries(response)
+
+    async def _agenerate_queries(self, state: AgentState):
+        video_analysis = state.get("video_analysis")
+
+        if not video_analysis:
+            return failure("No video analysis provided for research context.", "internal")
+
+        response = await self.llm.ainvoke(self._query_messages(video_analysis))
+        return self._parse_queries(response)
+
+    def _query_messages(self, video_analysis: str):
+        search_plan_prompt = f"""
+            Based on the following video analysis, generate 3 specific, high-quality search queries to find the latest updates, confirmed news, or verified facts.
             
-            if not video_analysis:
-                return {"error": "No video analysis provided for research context."}
-
-            search_plan_prompt = f"""
-                Based on the following video analysis, generate 3 specific, high-quality search queries to find the latest updates, confirmed news, or verified facts.
-                
-                Video Analysis:
-                {video_analysis}
-                
-                OUTPUT FORMAT:
-                Return ONLY a raw JSON list of strings. Do not use Markdown code blocks.
-                Example: ["query 1", "query 2", "query 3"]
-            """
-
-            messages = [
-                SystemMessage(content="You are a senior web researcher. Generate precise search queries."),
-                HumanMessage(content=search_plan_prompt)
-            ]
-
-            response = self.llm.invoke(messages)
-            content = response.content if hasattr(response, 'content') else str(response)
-
-            queries = []
-            try:
-                
-                clean_raw = content.replace('```json', '').replace('```', '').strip()
-                queries = json.loads(clean_raw)
+            Video Analysis:
+            {video_analysis}
+            
+            OUTPUT FORMAT:
+            Return ONLY a JSON object with a "queries" list of strings. Do not use Markdown code blocks.
+            Example: {{"queries": ["query 1", "query 2", "query 3"]}}
+        """
 
-            except json.JSONDecodeError:
-                
-                queries = [
-                    line.strip().lstrip('1234567890. -"') 
-                    for line in content.split('\n') 
-                    if line.strip() and len(line) > 5
-                ]
+        return [
+            SystemMessage(content="You are a senior web researcher. Generate precise search queries."),
+            HumanMessage(content=search_plan_prompt)
+        ]
 
-            if not queries or not isinstance(queries, list):
-                return {"error": "Could not parse valid search queries from LLM response."}
+    def _parse_queries(self, response):
+        """
+        The queries route runs in JSON mode, so the reply is a JSON object;
+        a bare list is accepted from models routed without it.
+        """
+        content = response.content if hasattr(response, 'content') else str(response)
 
-            return {"search_queries": queries}
+        try:
 
-        except Exception as e:
-            raise CustomException(e, sys)
+            clean_raw = content.replace('```json', '').replace('```', '').strip()
+            parsed = json.loads(clean_raw)
+
+        except json.JSONDecodeError:
+            return failure("Could not parse valid search queries from LLM response.", "bad_llm_output")
+
+        queries = parsed.get("queries") if isinstance(parsed, dict) else parsed
+        if not queries or not isinstance(queries, list):
+            return failure("Could not parse valid search queries from LLM response.", "bad_llm_output")
+
+        return {"search_queries": queries}
 
     def _perform_research(self, state: AgentState):
-        """Node 2: Executes the search queries and aggregates results."""
-        try:
+        """
+        Node 2: Executes the search queries concurrently and aggregates results.
+        A query that fails or runs longer than SEARCH_TIMEOUT is dropped from the
+        summary instead of failing the whole pipeline; order of the queries is
+        preserved. The pool is shared by every request, so a query's timeout
+        starts when it begins running, not while it waits behind other requests.
+        """
+        queries = state.get("search_queries", [])
+        if not queries:
+            return failure("No queries to search.", "bad_llm_output")
 
-            queries = state.get("search_queries", [])
-            if not queries:
-                return {"error": "No queries to search."}
-            
-            full_research_summary = "External Research Findings:\n\n"
-            
-            for query in queries:
-                if isinstance(query, str) and len(query) > 2:
-                    full_research_summary += f"--- Results for: {query} ---\n"
-                    full_research_summary += self._search_web(query)
-                    full_research_summary += "\n\n"
+        queries = self._valid_queries(queries)
+        if not queries:
+            return failure("No valid search queries.", "bad_llm_output")
+        search = with_current_context(self._search_web)
+        started = [None] * len(queries)
 
-            return {"research_summary": full_research_summary}
+        def run(index, query):
+            started[index] = time.monotonic()
+            return search(query)
 
-        except Exception as e:
-            raise CustomException(e, sys)
+        futures = [self.search_executor.submit(run, index, query) for index, query in enumerate(queries)]
+
+        results = []
+        for index, (query, future) in enumerate(zip(queries, futures)):
+            try:
+                results.append(self._search_result(future, lambda: started[index]))
+            except Exception as e:
+                future.cancel()
+                logger.warning("Search failed for %r: %r", query, e)
+                results.append(None)
+
+        return self._summarize(queries, results)
+
+    def _search_result(self, future, started_at):
+        """Waits for a search until SEARCH_TIMEOUT after it started running; raises TimeoutError past that."""
+        while not future.done():
+            start = started_at()
+            remaining = self.search_timeout if start is None else start + self.search_timeout - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Search ran longer than {self.search_timeout}s")
+            wait([future], timeout=remaining)
+        return future.result()
+
+    async def _aperform_research(self, state: AgentState):
+        """Async node: same contract, with searches gathered under one SEARCH_TIMEOUT deadline."""
+        queries = state.get("search_queries", [])
+        if not queries:
+            return failure("No queries to search.", "bad_llm_output")
+
+        queries = self._valid_queries(queries)
+        if not queries:
+            return failure("No valid search queries.", "bad_llm_output")
+        semaphore = asyncio.Semaphore(self.search_workers)
+
+        async def search(query):
+            async with semaphore:
+                return await self._asearch_web(query)
+
+        tasks = [asyncio.ensure_future(search(query)) for query in queries]
+        done, pending = await asyncio.wait(tasks, timeout=self.search_timeout) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for query, task in zip(queries, tasks):
+            if task in done and task.exception() is None:
+                results.append(task.result())
+            else:
+                logger.warning("Search failed for %r: %r", query, None if task in pending else task.exception())
+                results.append(None)
+
+        return self._summarize(queries, results)
+
+    def _valid_queries(self, queries: list) -> list:
+        """Drops malformed queries and collapses near-duplicates (SEARCH_QUERY_SIMILARITY)."""
+        queries = [query for query in queries if isinstance(query, str) and len(query) > 2]
+        return collapse_queries(queries, self.query_similarity)
+
+    def _summarize(self, queries: list, results: list):
+        """
+        Flattens results in query order, tagged with their query; failed
+        searches (None) are left out and a page already returned for an
+        earlier query is not repeated.
+        """
+        if all(result is None for result in results):
+            return failure("All web searches failed or timed out.", "upstream_unavailable")
+
+        search_results = [
+            {**item, "query": query}
+            for query, items in zip(queries, dedupe_results(results))
+            for item in items or []
+        ]
+        return {"search_results": search_results}
+
+    def _compact_research(self, state: AgentState):
+        """
+        Node 3: Turns the search results into the research summary, keeping the
+        snippets most relevant to the video analysis within RESEARCH_TOKEN_BUDGET.
+        """
+        reference = "\n".join(filter(None, [state.get("video_analysis"), state.get("outline")]))
+        summary = compact_research(
+            state.get("search_results") or [],
+            reference,
+            token_budget=self.research_token_budget,
+            snippet_tokens=self.snippet_tokens,
+            redundancy=self.snippet_redundancy
+        )
+        return {"research_summary": summary}
+
+    def plan_queries(self, video_analysis: str) -> dict:
+        """Search queries for an analysis outside the graph: {"search_queries": [...]} or an `error`."""
+        return self._generate_queries({"video_analysis": video_analysis})
+
+    def search(self, search_queries: list) -> dict:
+        """Runs the queries outside the graph: {"search_results": [...]} or an `error`."""
+        return self._perform_research({"search_queries": search_queries})
+
+    def select_findings(self, search_results: list, reference: str) -> list:
+        """The results compaction keeps for `reference` (clipped), without rendering them."""
+        return select_research(
+            search_results,
+            reference,
+            token_budget=self.research_token_budget,
+            snippet_tokens=self.snippet_tokens,
+            redundancy=self.snippet_redundancy
+        )
+
+    async def _acompact_research(self, state: AgentState):
+        # CPU-only and a few milliseconds; no need to leave the loop
+        return self._compact_research(state)
 
     def _check_queries(self, state: AgentState):
+        if state.get("error"):
+            return "end"
         
-        try:
-            
-            if state.get("error"):
-                return "end"
-            
-            queries = state.get("search_queries")
-            if not queries or not isinstance(queries, list) or len(queries) == 0:
-                return "end"
-            
-            return "research"
-
-        except Exception as e:
-            raise CustomException(e, sys)
+        queries = state.get("search_queries")
+        if not queries or not isinstance(queries, list) or len(queries) == 0:
+            return "end"
+        
+        return "research"
 
     def run(self, video_analysis: str):
         """Entry point for the agent."""
         try:
-            initial_state = {
-                "video_analysis": video_analysis,
-                "search_queries": [],
-                "research_summary": None,
-                "error": None
-            }
+            initial_state = self._initial_state(video_analysis)
             final_state = self.graph.invoke(initial_state)
             return final_state
         
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    async def arun(self, video_analysis: str):
+        """Async entry point for the agent."""
+        try:
+            return await self.graph.ainvoke(self._initial_state(video_analysis))
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stream(self, video_analysis: str, stream_mode="updates"):
+        """Streaming entry point: yields LangGraph events as each node completes."""
+        try:
+            return self.graph.stream(self._initial_state(video_analysis), stream_mode=stream_mode)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def astream(self, video_analysis: str, stream_mode="updates"):
+        """Async streaming entry point: an async iterator of LangGraph events."""
+        try:
+            return self.graph.astream(self._initial_state(video_analysis), stream_mode=stream_mode)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _initial_state(self, video_analysis: str):
+        return {
+            "video_analysis": video_analysis,
+            "search_queries": [],
+            "search_results": None,
+            "research_summary": None,
+            "error": None
+        }
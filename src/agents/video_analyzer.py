@@ -1,33 +1,110 @@
-import yt_dlp
-import requests
 import sys
-import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, Optional
+from src.cache.transcript import get_transcript_cache
+from src.errors import failure, capture
 from src.exception import CustomException
-from src.utils import get_llm
+from src.telemetry import traced_node, call_span, with_current_context
+from src.http_client import get_session, get_timeout, get_async_client
+from src.transcript import (
+    Transcript, TranscriptBuilder, Json3EventParser, CHARS_PER_TOKEN, format_timestamp, iter_json3_events
+)
+from src.utils import get_llm, extract_video_id, env_int
+from src.youtube import SUBTITLE_LANGS, extract_caption_info, select_subtitle_track
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END, START
 
 class AgentState(TypedDict):
     video_url: str
-    transcript: Optional[str]
+    transcript: Optional[Transcript]
     analysis: Optional[str]
-    error: Optional[str]
+    error: Optional[dict]
+
+ANALYSIS_SYSTEM_PROMPT = (
+    "You are an expert video content analyst. "
+    "Your goal is to extract the core topics, key takeaways, and tone from video transcripts."
+)
+
+ANALYSIS_PROMPT = """
+    Analyze the following YouTube Video Transcript.
+    
+    NOTE: The transcript might be in a foreign language. 
+    You MUST translate the concepts and Output the final analysis in ENGLISH.
+
+    Transcript:
+    {transcript} 
+
+    Output a structured summary containing:
+    1. Main Topic
+    2. Key Points (Bullet points)
+    3. The tone of the video
+    4. Important keywords
+"""
+
+CHUNK_PROMPT = """
+    The following is part {index} of {total} ({start} - {end}) of a YouTube Video Transcript.
+
+    NOTE: The transcript might be in a foreign language. 
+    You MUST translate the concepts and write your notes in ENGLISH.
+
+    Transcript Part:
+    {transcript}
+
+    Output concise notes for this part only:
+    1. Topics covered
+    2. Key Points (Bullet points, keep facts, names and numbers, cite the part's time range)
+    3. The tone of this part
+    4. Important keywords
+"""
+
+REDUCE_PARTIAL_PROMPT = """
+    Merge the following consecutive notes taken on parts of one YouTube video into a single set of notes.
+    Keep every distinct fact, name and number; drop repetition. Write in ENGLISH.
+
+    {partials}
+"""
+
+REDUCE_PROMPT = """
+    The following are notes taken on consecutive parts of one YouTube Video Transcript.
+    Combine them into one analysis of the whole video, in ENGLISH.
+
+    {partials}
+
+    Output a structured summary containing:
+    1. Main Topic
+    2. Key Points (Bullet points)
+    3. The tone of the video
+    4. Important keywords
+"""
 
 class YoutubeAnalyzeAgent:
 
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, transcript_cache=None):
         # Use provided LLM or fetch default if None
-        self.llm = llm if llm else get_llm()
+        self.llm = llm if llm else get_llm("analysis")
+        self.transcript_cache = transcript_cache if transcript_cache else get_transcript_cache()
+
+        # Map-reduce settings for long transcripts
+        self.chunk_tokens = env_int("ANALYSIS_CHUNK_TOKENS", 3500)
+        self.chunk_overlap_tokens = env_int("ANALYSIS_CHUNK_OVERLAP_TOKENS", 100)
+        self.analysis_parallelism = env_int("ANALYSIS_PARALLELISM", 3)
+        self.analysis_executor = ThreadPoolExecutor(
+            max_workers=self.analysis_parallelism,
+            thread_name_prefix="chunk-analysis"
+        )
         self.graph = self._build_graph()
 
+    def close(self):
+        self.analysis_executor.shutdown(wait=False, cancel_futures=True)
+
     def _build_graph(self):
         try:
             graph = StateGraph(AgentState)
 
-            # 1. Add Processing Nodes
-            graph.add_node("fetch_transcript", self._fetch_transcript)
-            graph.add_node("analyze_transcript", self._analyze_transcript)
+            # 1. Add Processing Nodes (sync implementation for invoke(), async for ainvoke())
+            graph.add_node("fetch_transcript", traced_node("fetch_transcript", self._fetch_transcript, self._afetch_transcript))
+            graph.add_node("analyze_transcript", traced_node("analyze_transcript", self._analyze_transcript, self._aanalyze_transcript))
             
             # NOTE: "check_extraction" is NOT added as a node because it is a routing function.
 
@@ -54,175 +131,263 @@ class YoutubeAnalyzeAgent:
             raise CustomException(e, sys)
 
     def _fetch_transcript(self, state: AgentState):
+        track = self._resolve_track(state["video_url"])
+        if "video_id" not in track:
+            return track
+
+        # Pooled keep-alive session; the body is parsed as it streams in
+        with call_span("subtitle_download") as attrs, \
+                get_session().get(track["url"], timeout=get_timeout(), stream=True) as response:
+            attrs["status"] = response.status_code
+            if response.status_code != 200:
+                return self._download_failure(response.status_code)
+
+            events = iter_json3_events(response.iter_content(chunk_size=64 * 1024))
+            transcript = Transcript.from_json3(events, track["lang"])
+            attrs["segments"] = len(transcript)
+
+        return self._store_transcript(track, transcript)
+
+    async def _afetch_transcript(self, state: AgentState):
+        """Async node: yt-dlp (blocking) runs in a worker thread, the subtitle body streams over httpx."""
+        track = await asyncio.to_thread(self._resolve_track, state["video_url"])
+        if "video_id" not in track:
+            return track
+
+        with call_span("subtitle_download") as attrs:
+            async with get_async_client().stream("GET", track["url"]) as response:
+                attrs["status"] = response.status_code
+                if response.status_code != 200:
+                    return self._download_failure(response.status_code)
+
+                builder = TranscriptBuilder(track["lang"])
+                parser = Json3EventParser()
+                async for chunk in response.aiter_bytes(64 * 1024):
+                    for event in parser.feed(chunk):
+                        builder.append_json3_event(event)
+                    if parser.done:
+                        break
+                transcript = builder.build()
+                attrs["segments"] = len(transcript)
+
+        return await asyncio.to_thread(self._store_transcript, track, transcript)
+
+    def _resolve_track(self, video_url: str) -> dict:
+        """
+        Everything before the subtitle download: a cached transcript, an error,
+        or the chosen caption track as {video_id, lang, url}.
+        """
+        # Repeat submissions of the same video skip yt-dlp entirely
+        video_id = extract_video_id(video_url)
+        cached = self.transcript_cache.get(video_id, SUBTITLE_LANGS)
+        if cached:
+            return {"transcript": Transcript.from_dict(cached[1])}
+
+        info = extract_caption_info(video_url)
+
+        if not info:
+            return failure("yt-dlp returned no information.", "video_unavailable")
+
+        if not (info.get("subtitles") or info.get("automatic_captions")):
+            return failure("No subtitles found in video metadata.", "no_transcript")
+
+        chosen_lang, json3_url = select_subtitle_track(info)
+
+        if not json3_url:
+            return failure("Could not find a valid subtitle URL.", "no_transcript")
+
+        return {"video_id": video_id, "lang": chosen_lang, "url": json3_url}
+
+    def _download_failure(self, status: int) -> dict:
+        code = "rate_limited" if status == 429 else "upstream_unavailable" if status >= 500 else "upstream"
+        return failure(f"Failed to download subs. Status: {status}", code)
+
+    def _store_transcript(self, track: dict, transcript: Transcript) -> dict:
+        self.transcript_cache.put(track["video_id"], track["lang"], transcript.to_dict(), SUBTITLE_LANGS)
+        return {"transcript": transcript}
+
+    def _analyze_transcript(self, state: AgentState):
+        """
+        Node: Summarizes the transcript.
+        Short transcripts go through one prompt. Long ones are map-reduced: each
+        window is analyzed in parallel, then the partial analyses are merged, so
+        nothing past the first few minutes of a long video is thrown away.
+        """
+        transcript = state.get("transcript")
+
+        if not transcript:
+            return failure("No transcript available for analysis.", "no_transcript")
+
+        return {"analysis": self.reduce_partials(self.map_chunks(transcript))}
+
+    async def _aanalyze_transcript(self, state: AgentState):
+        """Async node: same map-reduce, with chunk calls gathered under ANALYSIS_PARALLELISM."""
+        transcript = state.get("transcript")
+
+        if not transcript:
+            return failure("No transcript available for analysis.", "no_transcript")
+
+        return {"analysis": await self.areduce_partials(await self.amap_chunks(transcript))}
+
+    def map_chunks(self, transcript: Transcript) -> list:
+        """Map step: one analysis per transcript window (a single full analysis for short videos)."""
+        # Each chunk prompt is deterministic, so chunk results are served by the LLM response cache on reruns
+        return list(self.analysis_executor.map(with_current_context(self._invoke), self._chunk_prompts(transcript)))
+
+    async def amap_chunks(self, transcript: Transcript) -> list:
+        return await self._agather(self._chunk_prompts(transcript))
+
+    def reduce_partials(self, partials: list) -> str:
+        """Reduce step: merges partial analyses, in several rounds if they don't fit one prompt."""
+        while len(partials) > 1:
+            prompts, final_round = self._reduce_prompts(partials)
+            partials = list(self.analysis_executor.map(with_current_context(self._invoke), prompts))
+            if final_round:
+                break
+        return partials[0]
+
+    async def areduce_partials(self, partials: list) -> str:
+        while len(partials) > 1:
+            prompts, final_round = self._reduce_prompts(partials)
+            partials = await self._agather(prompts)
+            if final_round:
+                break
+        return partials[0]
+
+    async def _agather(self, prompts: list) -> list:
+        semaphore = asyncio.Semaphore(self.analysis_parallelism)
+
+        async def invoke(prompt):
+            async with semaphore:
+                return await self._ainvoke(prompt)
+
+        return await asyncio.gather(*(invoke(prompt) for prompt in prompts))
+
+    def _chunk_prompts(self, transcript: Transcript) -> list:
+        chunks = transcript.chunks(self.chunk_tokens, self.chunk_overlap_tokens)
+        if len(chunks) == 1:
+            return [ANALYSIS_PROMPT.format(transcript=transcript.text)]
+
+        return [
+            CHUNK_PROMPT.format(
+                index=index + 1,
+                total=len(chunks),
+                start=format_timestamp(chunk.start_ms),
+                end=format_timestamp(chunk.end_ms),
+                transcript=chunk.text
+            )
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def _reduce_prompts(self, partials: list):
+        """Groups partial analyses into merge prompts that fit the window; returns (prompts, is_final_round)."""
+        budget_chars = self.chunk_tokens * CHARS_PER_TOKEN
+
+        groups, current, size = [], [], 0
+        for partial in partials:
+            if current and size + len(partial) > budget_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(partial)
+            size += len(partial)
+        groups.append(current)
+        if len(groups) == len(partials):
+            # Every partial fills a window on its own, so grouping can't shrink
+            # them; merge everything in one over-budget prompt instead of looping
+            groups = [partials]
+
+        final_round = len(groups) == 1
+        prompt = REDUCE_PROMPT if final_round else REDUCE_PARTIAL_PROMPT
+        prompts = [
+            prompt.format(partials="\n\n".join(
+                f"--- Part {index + 1} ---\n{partial}" for index, partial in enumerate(group)
+            ))
+            for group in groups
+        ]
+        return prompts, final_round
+
+    def _messages(self, user_prompt: str):
+        return [
+            SystemMessage(content=ANALYSIS_SYSTEM_PROMPT),
+            HumanMessage(content=user_prompt)
+        ]
+
+    def _invoke(self, user_prompt: str) -> str:
+        response = self.llm.invoke(self._messages(user_prompt))
+        return response.content # Ensure we return content, not just the object if using certain LLMs
+
+    async def _ainvoke(self, user_prompt: str) -> str:
+        response = await self.llm.ainvoke(self._messages(user_prompt))
+        return response.content
+    
+    def _check_extraction(self, state: AgentState):
+        # Check for errors or missing transcript to decide path
+        if state.get("error"):
+            return "end"
+        
+        if not state.get("transcript"):
+            return "end"
+        
+        return "analyze"
+
+    def run(self, video_url: str):
         try:
-            video_url = state["video_url"]
-            is_vercel = os.environ.get('VERCEL') or os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
-            cookies_arg = None
-
-            env_cookies = os.environ.get("YOUTUBE_COOKIES")
-            if env_cookies:
-                try:
-                    temp_cookies_path = "/tmp/cookies.txt"
-                    with open(temp_cookies_path, "w") as f:
-                        f.write(env_cookies)
-                    cookies_arg = temp_cookies_path
-                except Exception as e:
-                    raise CustomException(e, sys)
-            
-            elif os.path.exists("cookies.txt"):
-                cookies_arg = "cookies.txt"
-
-            ydl_opts = {
-                'skip_download': True,
-                'format': 'best',
-                'writesubtitles': True,
-                'writeautomaticsub': True,
-                'subtitleslangs': ['en', 'hi', 'ja', 'es'],
-                'cookiefile': cookies_arg,
-                'quiet': True,
-                'no_warnings': True,
-                'cache_dir': '/tmp/yt-dlp-cache' if is_vercel else None,
-                'nocheckcertificate': True,
-                'ignoreerrors': False,
-                'no_call_home': True,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    try:
-                        info = ydl.extract_info(video_url, download=False)
-                    except Exception as e:
-                        raise CustomException(e, sys)
-
-                    if not info:
-                        return {"error": "yt-dlp returned no information."}
-                    
-                    subtitles = info.get("subtitles", {})
-                    auto_captions = info.get("automatic_captions", {})
-                    all_subs = {**auto_captions, **subtitles}
-
-                    if not all_subs:
-                        return {"error": "No subtitles found in video metadata."}
-                    
-                    chosen_lang = None
-                    for lang in ["en", "hi", "ja", "es"]:
-                        if lang in all_subs:
-                            chosen_lang = lang
-                            break
-                    
-                    if not chosen_lang:
-                        chosen_lang = list(all_subs.keys())[0]
-
-                    subs_list = all_subs.get(chosen_lang, [])
-                    json3_url = next((sub.get('url') for sub in subs_list if sub.get('ext') == 'json3'), None)
-
-                    if not json3_url:
-                        json3_url = subs_list[0].get("url")
-
-                    if not json3_url:
-                        return {"error": "Could not find a valid subtitle URL."}
-                    
-                    session = requests.Session()
-                    session.headers.update({
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    })
-                    response = session.get(json3_url)
-
-                    final_transcript = ""
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            events = data.get("events", [])
-                            full_text = []
-                            for event in events:
-                                segs = event.get("segs", [])
-                                for seg in segs:
-                                    txt = seg.get("utf8", "").strip()
-                                    if txt:
-                                        full_text.append(txt)
-                            final_transcript = " ".join(full_text)
-                        except Exception as e:
-                            raise CustomException(e, sys)
-                    else:
-                        return {"error": f"Failed to download subs. Status: {response.status_code}"}
-
-                    return {"transcript": final_transcript}
-                
-            except Exception as e:
-                raise CustomException(e, sys)
+            initial_state = self._initial_state(video_url)
+            final_state = self.graph.invoke(initial_state)
+            return final_state
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    async def arun(self, video_url: str):
+        """Async entry point: same graph, driven by the async node implementations."""
+        try:
+            return await self.graph.ainvoke(self._initial_state(video_url))
 
         except Exception as e:
             raise CustomException(e, sys)
 
-    def _analyze_transcript(self, state: AgentState):
+    def fetch(self, video_url: str):
+        """Runs only the transcript stage, so batch mode can fetch ahead of analysis."""
         try:
-            transcript = state.get("transcript")
+            state = self._initial_state(video_url)
+            state.update(capture("fetch_transcript", self._fetch_transcript, state))
+            return state
 
-            if not transcript:
-                return {"error": "No transcript available for analysis."}
-            
-            truncated_transcript = transcript[:15000]
-            system_prompt = (
-                "You are an expert video content analyst. "
-                "Your goal is to extract the core topics, key takeaways, and tone from video transcripts."
-            )
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            user_prompt = f"""
-                Analyze the following YouTube Video Transcript.
-                
-                NOTE: The transcript might be in a foreign language. 
-                You MUST translate the concepts and Output the final analysis in ENGLISH.
-
-                Transcript (Truncated):
-                {truncated_transcript} 
-
-                Output a structured summary containing:
-                1. Main Topic
-                2. Key Points (Bullet points)
-                3. The tone of the video
-                4. Important keywords
-            """
-
-            try:
-                messages = [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=user_prompt)
-                ]
-
-                response = self.llm.invoke(messages)
-                return {"analysis": response.content} # Ensure we return content, not just the object if using certain LLMs
-            
-            except Exception as e:
-                raise CustomException(e, sys)
+    def analyze(self, state: AgentState):
+        """Runs the analysis stage on a state produced by fetch()."""
+        try:
+            state = dict(state)
+            if self._check_extraction(state) == "analyze":
+                state.update(capture("analyze_transcript", self._analyze_transcript, state))
+            return state
 
         except Exception as e:
             raise CustomException(e, sys)
-    
-    def _check_extraction(self, state: AgentState):
+
+    def stream(self, video_url: str, stream_mode="updates"):
+        """Streaming entry point: yields LangGraph events as each node completes."""
         try:
-            # Check for errors or missing transcript to decide path
-            if state.get("error"):
-                return "end"
-            
-            if not state.get("transcript"):
-                return "end"
-            
-            return "analyze"
+            return self.graph.stream(self._initial_state(video_url), stream_mode=stream_mode)
 
         except Exception as e:
             raise CustomException(e, sys)
 
-    def run(self, video_url: str):
+    def astream(self, video_url: str, stream_mode="updates"):
+        """Async streaming entry point: an async iterator of LangGraph events."""
         try:
-            initial_state = {
-                "video_url": video_url,
-                "transcript": None,
-                "analysis": None,
-                "error": None
-            }
-            final_state = self.graph.invoke(initial_state)
-            return final_state
-        
+            return self.graph.astream(self._initial_state(video_url), stream_mode=stream_mode)
+
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    def _initial_state(self, video_url: str):
+        return {
+            "video_url": video_url,
+            "transcript": None,
+            "analysis": None,
+            "error": None
+        }
@@ -0,0 +1,331 @@
+"""
+Batch mode: generate blogs for a playlist, a channel or a file of URLs.
+
+    python -m src.batch "https://www.youtube.com/playlist?list=..." -o blogs.jsonl
+    python -m src.batch urls.txt -o blogs.jsonl --fetch 8 --analyze 4 --research 4 --write 2
+
+Videos flow through four stages (fetch -> analyze -> research -> write), each
+with its own worker pool, so the transcript of video N+1 is downloaded while
+video N is being analyzed and video N-1 researched. Every finished video is
+appended to the JSONL output; re-running with the same output skips videos
+that already succeeded.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.errors import error_message
+from src.exception import CustomException
+from src.logger import configure_logging, log_context
+from src.registry import registry
+from src.utils import extract_video_id, get_data_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = {"fetch": 4, "analyze": 2, "research": 2, "write": 2}
+MAX_STAGE_CONCURRENCY = 32
+
+def validate_concurrency(concurrency) -> dict:
+    """Checks per-stage pool sizes ({stage: 1..MAX_STAGE_CONCURRENCY}); raises ValueError naming the problem."""
+    if concurrency is None:
+        return {}
+    if not isinstance(concurrency, dict):
+        raise ValueError("'concurrency' must map stage names to worker counts")
+
+    unknown = sorted(set(concurrency) - set(DEFAULT_CONCURRENCY))
+    if unknown:
+        raise ValueError(f"Unknown batch stages {unknown}; expected {list(DEFAULT_CONCURRENCY)}")
+    for stage, limit in concurrency.items():
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_STAGE_CONCURRENCY:
+            raise ValueError(f"Concurrency for '{stage}' must be an integer from 1 to {MAX_STAGE_CONCURRENCY}")
+    return concurrency
+
+def is_web_url(source) -> bool:
+    return isinstance(source, str) and source.lower().startswith(("http://", "https://"))
+
+def expand_file(path: str) -> list:
+    """Expands a text file of playlist/channel/video URLs, one per line (# comments), into video URLs. CLI only."""
+    try:
+
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        urls = []
+        for line in lines:
+            if line and not line.startswith("#"):
+                urls.extend(expand_source(line))
+        return _dedupe(urls)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def expand_source(source: str) -> list:
+    """
+    Expands a playlist/channel URL (one flat yt-dlp extraction, no per-video
+    metadata) or a single video URL into video URLs. Only http(s) URLs are
+    accepted, so a web client can't point yt-dlp at local files or search
+    prefixes.
+    """
+    try:
+
+        if not is_web_url(source):
+            raise ValueError(f"Not an http(s) URL: {source!r}")
+
+        video_id = extract_video_id(source)
+        if video_id and "list=" not in source:
+            return [f"https://www.youtube.com/watch?v={video_id}"]
+
+        import yt_dlp
+
+        ydl_opts = {'extract_flat': 'in_playlist', 'skip_download': True, 'quiet': True, 'no_warnings': True}
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(source, download=False) or {}
+
+        urls = []
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            # Channels nest their uploads/shorts tabs as playlists
+            if entry.get("_type") == "playlist" or entry.get("ie_key") == "YoutubeTab":
+                if not entry.get("url"):
+                    continue
+                urls.extend(expand_source(entry.get("url")))
+            elif entry.get("id"):
+                urls.append(f"https://www.youtube.com/watch?v={entry['id']}")
+        return _dedupe(urls)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def completed_video_ids(output_path: str) -> set:
+    """Video IDs that already have a successful line in an earlier (possibly crashed) run."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line from a crash
+            if record.get("status") == "success" and record.get("video_id"):
+                done.add(record["video_id"])
+    return done
+
+class BatchRun:
+    """One pipelined batch over a list of video URLs, writing results to JSONL."""
+
+    def __init__(self, urls: list, output_path: str, concurrency: dict = None):
+
+        self.batch_id = uuid.uuid4().hex
+        self.urls = urls
+        self.output_path = output_path
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.counts = {"total": len(urls), "skipped": 0, "succeeded": 0, "failed": 0}
+        self.status = "pending"
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._done = threading.Event()
+
+    def progress(self) -> dict:
+        with self._lock:
+            return {"batch_id": self.batch_id, "status": self.status, "output_path": self.output_path, **self.counts}
+
+    def run(self) -> dict:
+        try:
+
+            self.status = "running"
+            analyzer, researcher, blogger = registry.acquire()
+            done = completed_video_ids(self.output_path)
+
+            # Held by the submit loop so early finishers can't signal completion
+            self._pending = 1
+
+            pools = {
+                stage: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"batch-{stage}")
+                for stage, limit in self.concurrency.items()
+            }
+
+            def write(state):
+                blog_state = blogger.run(state["analysis"], state["research_summary"])
+                if blog_state.get("error"):
+                    return self._finish(state, error=f"Blogger Error: {error_message(blog_state['error'])}")
+                state["blog_post"] = blog_state.get("blog_post")
+                self._finish(state)
+
+            def research(state):
+                research_state = researcher.run(state["analysis"])
+                if research_state.get("error"):
+                    return self._finish(state, error=f"Researcher Error: {error_message(research_state['error'])}")
+                state["research_summary"] = research_state.get("research_summary")
+                self._next(pools["write"], write, state)
+
+            def analyze(state):
+                state = analyzer.analyze(state)
+                if state.get("error") or not state.get("analysis"):
+                    return self._finish(state, error=f"Analyzer Error: {error_message(state.get('error')) or 'no analysis'}")
+                self._next(pools["research"], research, state)
+
+            def fetch(state):
+                state.update(analyzer.fetch(state["video_url"]))
+                if state.get("error") or not state.get("transcript"):
+                    return self._finish(state, error=f"Analyzer Error: {error_message(state.get('error')) or 'no transcript'}")
+                self._next(pools["analyze"], analyze, state)
+
+            for url in self.urls:
+                video_id = extract_video_id(url)
+                if not video_id:
+                    # Reported as a failed line rather than looked up in (or resumed from) the output
+                    with self._lock:
+                        self._pending += 1
+                    self._finish({"video_url": url, "video_id": None, "started_at": time.time()},
+                                 error="Not a YouTube video URL")
+                    continue
+                if video_id in done:
+                    with self._lock:
+                        self.counts["skipped"] += 1
+                    continue
+                state = {"video_url": url, "video_id": video_id, "started_at": time.time()}
+                self._next(pools["fetch"], fetch, state)
+
+            with self._lock:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._done.set()
+            self._done.wait()
+
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+            self.status = "completed"
+            return self.progress()
+
+        except Exception as e:
+            self.status = "failed"
+            raise CustomException(e, sys)
+
+    def _next(self, pool, stage, state):
+        """Hands a video to the next stage's pool; the first stage increments the in-flight count."""
+        if "_in_flight" not in state:
+            state["_in_flight"] = True
+            with self._lock:
+                self._pending += 1
+
+        def guarded():
+            try:
+                with log_context(batch_id=self.batch_id, video_id=state.get("video_id"), stage=stage.__name__):
+                    stage(state)
+            except Exception as e:
+                logger.exception("Batch stage %s failed for %s", stage.__name__, state["video_url"])
+                try:
+                    self._finish(state, error=str(e))
+                except Exception:
+                    logger.exception("Could not record the result for %s", state["video_url"])
+
+        pool.submit(guarded)
+
+    def _finish(self, state, error=None):
+        """Writes the video's result line and releases its in-flight count, once per video even if writing fails."""
+        if state.get("_finished"):
+            return
+        state["_finished"] = True
+
+        record = {
+            "video_id": state.get("video_id"),
+            "video_url": state["video_url"],
+            "status": "failed" if error else "success",
+            "error": error,
+            "blog_post": state.get("blog_post"),
+            "video_analysis": state.get("analysis"),
+            "research_summary": state.get("research_summary"),
+            "elapsed_s": round(time.time() - state["started_at"], 3),
+            "completed_at": time.time()
+        }
+
+        written = False
+        try:
+            with self._lock:
+                with open(self.output_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                written = True
+        finally:
+            with self._lock:
+                self.counts["succeeded" if written and not error else "failed"] += 1
+                self._pending -= 1
+                if self._pending == 0:
+                    self._done.set()
+
+_batches = {}
+_batches_lock = threading.Lock()
+
+def start_batch(source: str = None, urls: list = None, concurrency: dict = None) -> BatchRun:
+    """Starts a batch in a background thread (used by the /batches API)."""
+    try:
+
+        urls = list(urls or [])
+        if source:
+            urls.extend(expand_source(source))
+
+        batch = BatchRun(_dedupe(urls), output_path=None, concurrency=concurrency)
+        batch.output_path = os.path.join(get_data_dir("batches"), f"{batch.batch_id}.jsonl")
+
+        with _batches_lock:
+            _batches[batch.batch_id] = batch
+
+        def run_batch():
+            try:
+                batch.run()
+            except Exception:
+                logger.exception("Batch %s failed", batch.batch_id)
+
+        threading.Thread(target=run_batch, name=f"batch-{batch.batch_id[:8]}", daemon=True).start()
+        return batch
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def get_batch(batch_id: str):
+    with _batches_lock:
+        return _batches.get(batch_id)
+
+def _dedupe(urls: list) -> list:
+    seen = set()
+    unique = []
+    for url in urls:
+        key = extract_video_id(url) or url
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate blogs for a playlist, channel or file of YouTube URLs.")
+    parser.add_argument("source", help="Playlist/channel/video URL, or a text file with one URL per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL results file (resumable)")
+    for stage, limit in DEFAULT_CONCURRENCY.items():
+        parser.add_argument(f"--{stage}", type=int, default=limit, help=f"Concurrent {stage} workers (default {limit})")
+    args = parser.parse_args(argv)
+
+    try:
+        validate_concurrency({stage: getattr(args, stage) for stage in DEFAULT_CONCURRENCY})
+    except ValueError as e:
+        parser.error(str(e))
+
+    configure_logging()
+    urls = expand_file(args.source) if os.path.isfile(args.source) else expand_source(args.source)
+    batch = BatchRun(urls, args.output, {stage: getattr(args, stage) for stage in DEFAULT_CONCURRENCY})
+    print(f"Processing {len(urls)} videos -> {args.output}")
+
+    summary = batch.run()
+    print(json.dumps(summary, indent=2))
+    registry.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import hashlib
+from langchain_core.messages import AIMessage
+from src.cache.memory import LRUCache, reads_bypassed
+from src.metrics import counter
+
+LLM_CACHE_HITS = counter("llm_cache_hits_total", "LLM calls answered from the response cache.")
+LLM_CACHE_MISSES = counter("llm_cache_misses_total", "LLM calls that had to reach the provider.")
+
+def message_key(model_name: str, temperature, messages) -> str:
+    """Stable hash of (model, temperature, message list) used as the response cache key."""
+    if isinstance(messages, str):
+        normalized = [["human", messages]]
+    else:
+        normalized = [[getattr(m, "type", type(m).__name__), getattr(m, "content", str(m))] for m in messages]
+
+    raw = json.dumps([model_name, temperature, normalized], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class CachedLLM:
+    """
+    Memoizing wrapper around a chat model.
+    Prompts in this pipeline are deterministic, so identical (model, temperature,
+    messages) triples are answered from memory instead of re-billing the provider.
+    Anything other than invoke()/ainvoke() is delegated to the wrapped model.
+    """
+
+    def __init__(self, llm, cache: LRUCache):
+
+        self.llm = llm
+        self.cache = cache
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.llm, "model_name", None) or getattr(self.llm, "model", "")
+
+    @property
+    def temperature(self):
+        return getattr(self.llm, "temperature", None)
+
+    def invoke(self, messages, config=None, **kwargs):
+
+        # Extra call-time kwargs (stop words, tools...) change the output; don't cache them.
+        if kwargs:
+            return self.llm.invoke(messages, config=config, **kwargs)
+
+        key, cached = self._lookup(messages)
+        if cached is not None:
+            return cached
+
+        response = self.llm.invoke(messages, config=config)
+        self._store(key, response)
+        return response
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+
+        if kwargs:
+            return await self.llm.ainvoke(messages, config=config, **kwargs)
+
+        key, cached = self._lookup(messages)
+        if cached is not None:
+            return cached
+
+        response = await self.llm.ainvoke(messages, config=config)
+        self._store(key, response)
+        return response
+
+    def _lookup(self, messages):
+        key = message_key(self.model_name, self.temperature, messages)
+        content = None if reads_bypassed() else self.cache.get(key)
+        if content is None:
+            LLM_CACHE_MISSES.inc()
+            return key, None
+
+        LLM_CACHE_HITS.inc()
+        return key, AIMessage(content=content, response_metadata={"cache_hit": True})
+
+    def _store(self, key: str, response):
+        content = response.content if hasattr(response, 'content') else str(response)
+        self.cache.put(key, content, size=len(content.encode("utf-8")))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
@@ -0,0 +1,83 @@
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_bypass_reads: ContextVar[bool] = ContextVar("cache_bypass_reads", default=False)
+
+@contextmanager
+def bypass_reads():
+    """Response caches consulted inside the block miss (but are still written), e.g. for a forced refresh."""
+    token = _bypass_reads.set(True)
+    try:
+        yield
+    finally:
+        try:
+            _bypass_reads.reset(token)
+        except ValueError:
+            # A streaming generator closed from another context
+            _bypass_reads.set(False)
+
+def reads_bypassed() -> bool:
+    return _bypass_reads.get()
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU with per-entry TTL.
+    Bounded both by entry count and by the summed `size` reported on put().
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl: float = 0):
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at, _ = entry
+            if expires_at and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, size: int = 1):
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
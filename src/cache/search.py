@@ -0,0 +1,123 @@
+import re
+import json
+from typing import List, Optional
+from src.cache.memory import LRUCache, reads_bypassed
+from src.metrics import counter
+
+SEARCH_CACHE_HITS = counter("search_cache_hits_total", "Web searches answered from the search cache.")
+SEARCH_CACHE_MISSES = counter("search_cache_misses_total", "Web searches that had to reach the search provider.")
+SEARCH_QUERIES_COLLAPSED = counter("search_queries_collapsed_total", "Generated queries dropped as near-duplicates of another.")
+SEARCH_RESULTS_DEDUPED = counter("search_results_deduplicated_total", "Search results dropped because an earlier query returned them.")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Words that don't change what a search engine returns for these queries
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or the to vs what when where which who why with".split()
+)
+
+def query_tokens(query: str) -> List[str]:
+    return _TOKEN.findall(query.lower())
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a query: case, punctuation and spacing don't matter, word
+    order does ("X vs Y" isn't "Y vs X"). "" for a query with no words, which isn't cached.
+    """
+    return " ".join(query_tokens(query))
+
+def content_tokens(text: str) -> List[str]:
+    return [token for token in query_tokens(text) if token not in _STOPWORDS]
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / len(a | b)
+
+def query_similarity(left: str, right: str) -> float:
+    """Jaccard similarity of the queries' content-word sets."""
+    return jaccard(set(content_tokens(left)), set(content_tokens(right)))
+
+def collapse_queries(queries: List[str], threshold: float) -> List[str]:
+    """
+    Drops queries whose similarity to an earlier kept query is at least
+    `threshold`, keeping the first of each group. A threshold above 1 disables it.
+    Queries without content words can't be compared and are always kept.
+    """
+    kept = []
+    for query in queries:
+        if content_tokens(query) and any(query_similarity(query, other) >= threshold for other in kept):
+            SEARCH_QUERIES_COLLAPSED.inc()
+            continue
+        kept.append(query)
+    return kept
+
+def as_results(raw) -> List[dict]:
+    """Normalizes a search tool's output (list of dicts or a text blob) into result dicts."""
+    if isinstance(raw, list):
+        return [item if isinstance(item, dict) else {"snippet": str(item)} for item in raw]
+    if isinstance(raw, str):
+        return [{"snippet": raw}] if raw.strip() else []
+    return [{"snippet": str(raw)}]
+
+def result_key(result: dict) -> Optional[str]:
+    """Identity of a search result: its normalized link, else its snippet words; None if it has neither."""
+    link = (result.get("link") or "").strip().lower()
+    if link:
+        link = re.sub(r"^https?://(www\.)?", "", link)
+        return "link:" + link.split("#", 1)[0].rstrip("/")
+    text = " ".join(query_tokens(result.get("snippet") or ""))
+    return "text:" + text if text else None
+
+def dedupe_results(result_lists: List[Optional[List[dict]]]) -> List[Optional[List[dict]]]:
+    """
+    Removes results already returned for an earlier query, so overlapping
+    queries don't repeat the same page in the research summary. Failed
+    searches (None) stay None.
+    """
+    seen = set()
+    deduped = []
+    for results in result_lists:
+        if results is None:
+            deduped.append(None)
+            continue
+
+        unique = []
+        for result in results:
+            key = result_key(result)
+            if key is not None and key in seen:
+                SEARCH_RESULTS_DEDUPED.inc()
+                continue
+            seen.add(key)
+            unique.append(result)
+        deduped.append(unique)
+    return deduped
+
+class SearchCache:
+    """
+    TTL cache of search results keyed by normalized query text, shared across
+    requests so popular topics don't hit the search provider on every run.
+    """
+
+    def __init__(self, cache: LRUCache):
+        self.cache = cache
+
+    def get(self, query: str) -> Optional[List[dict]]:
+        key = normalize_query(query)
+        results = None if reads_bypassed() or not key else self.cache.get(key)
+        if results is None:
+            SEARCH_CACHE_MISSES.inc()
+            return None
+
+        SEARCH_CACHE_HITS.inc()
+        return results
+
+    def put(self, query: str, results: List[dict]):
+        key = normalize_query(query)
+        if not results or not key:
+            return
+        size = len(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+        self.cache.put(key, results, size=size)
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from src.cache.memory import LRUCache
+from src.exception import CustomException
+from src.utils import env_int, env_float, get_data_dir
+
+# Stored when the chosen subtitle track was not in the caller's preferred
+# languages, so later lookups with the same preferences still hit.
+ANY_LANG = "*"
+
+class MemoryTranscriptTier:
+    """Hot tier: per-process LRU keyed by (video_id, lang)."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self._lru = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+    def get(self, video_id: str, langs: List[str]) -> Optional[Tuple[str, str]]:
+        for lang in list(langs) + [ANY_LANG]:
+            hit = self._lru.get((video_id, lang))
+            if hit is not None:
+                return hit
+        return None
+
+    def put(self, video_id: str, lang: str, payload: str, chosen_lang: Optional[str] = None):
+        self._lru.put((video_id, lang), (chosen_lang or lang, payload), size=len(payload))
+
+    def clear(self):
+        self._lru.clear()
+
+class SQLiteTranscriptTier:
+    """Warm tier: survives restarts and is shared by every worker on the host."""
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transcripts (
+                video_id TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                chosen_lang TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (video_id, lang)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_accessed ON transcripts (accessed_at)")
+        self._conn.commit()
+
+    def get(self, video_id: str, langs: List[str]) -> Optional[Tuple[str, str]]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lang, chosen_lang, payload, created_at FROM transcripts WHERE video_id = ?",
+                (video_id,)
+            ).fetchall()
+
+            by_lang = {row[0]: row for row in rows if not self.ttl or row[3] + self.ttl >= now}
+            for lang in list(langs) + [ANY_LANG]:
+                row = by_lang.get(lang)
+                if row:
+                    self._conn.execute(
+                        "UPDATE transcripts SET accessed_at = ? WHERE video_id = ? AND lang = ?",
+                        (now, video_id, lang)
+                    )
+                    self._conn.commit()
+                    return row[1], row[2]
+        return None
+
+    def put(self, video_id: str, lang: str, payload: str, chosen_lang: Optional[str] = None):
+        now = time.time()
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, lang, chosen_lang or lang, payload, size, now, now)
+            )
+            if self.ttl:
+                self._conn.execute("DELETE FROM transcripts WHERE created_at < ?", (now - self.ttl,))
+            self._evict_to_size()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM transcripts")
+            self._conn.commit()
+
+    def _evict_to_size(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT video_id, lang, size FROM transcripts ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM transcripts WHERE video_id = ? AND lang = ?", (row[0], row[1]))
+            total -= row[2]
+
+class TranscriptCache:
+    """
+    Read-through transcript cache keyed by normalized video ID + subtitle language.
+    Tiers are consulted in order; a hit in a slower tier is promoted to the faster ones.
+    """
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+
+    def get(self, video_id: str, langs: List[str]) -> Optional[Tuple[str, str]]:
+        """Returns (lang, transcript) for the first preferred language cached, else None."""
+        if not video_id:
+            return None
+
+        for index, tier in enumerate(self.tiers):
+            hit = tier.get(video_id, langs)
+            if hit is None:
+                continue
+
+            lang, payload = hit
+            for faster in self.tiers[:index]:
+                self._put_tier(faster, video_id, lang, payload, langs)
+            return lang, json.loads(payload)
+        return None
+
+    def put(self, video_id: str, lang: str, transcript, langs: List[str]):
+        if not video_id or not transcript:
+            return
+
+        payload = json.dumps(transcript)
+        for tier in self.tiers:
+            self._put_tier(tier, video_id, lang, payload, langs)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def _put_tier(self, tier, video_id, lang, payload, langs):
+        tier.put(video_id, lang, payload)
+        if lang not in langs:
+            tier.put(video_id, ANY_LANG, payload, chosen_lang=lang)
+
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Builds the transcript cache from the environment.
+    TRANSCRIPT_CACHE is a comma separated list of tiers ("memory", "sqlite") or "off".
+    """
+    try:
+
+        ttl = env_float("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600)
+        tier_names = os.environ.get("TRANSCRIPT_CACHE", "memory,sqlite")
+
+        tiers = []
+        for name in [n.strip() for n in tier_names.split(",") if n.strip()]:
+            if name == "memory":
+                tiers.append(MemoryTranscriptTier(
+                    max_entries=env_int("TRANSCRIPT_CACHE_MAX_ENTRIES", 512),
+                    max_bytes=env_int("TRANSCRIPT_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                    ttl=ttl
+                ))
+            elif name == "sqlite":
+                path = os.environ.get("TRANSCRIPT_CACHE_PATH") or os.path.join(get_data_dir("cache"), "transcripts.sqlite3")
+                tiers.append(SQLiteTranscriptTier(
+                    path=path,
+                    max_bytes=env_int("TRANSCRIPT_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024),
+                    ttl=ttl
+                ))
+
+        return TranscriptCache(tiers)
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,168 @@
+import re
+import math
+from collections import Counter
+from typing import List
+from src.cache.search import content_tokens, jaccard, query_tokens, result_key
+from src.metrics import counter, histogram, TOKEN_BUCKETS
+from src.transcript import estimate_tokens, CHARS_PER_TOKEN
+
+RESEARCH_TOKENS = histogram(
+    "research_summary_tokens", "Estimated tokens of the research summary handed to the blogger.", TOKEN_BUCKETS
+)
+SNIPPETS_DROPPED = counter(
+    "research_snippets_dropped_total", "Search snippets left out of the research summary.", labelnames=("reason",)
+)
+
+SUMMARY_HEADER = "External Research Findings:\n\n"
+
+_SUMMARY_LINK = re.compile(r"\((\S+)\)\s*$")
+
+def format_result(item: dict) -> str:
+    text = item.get("snippet", "")
+    if item.get("title"):
+        text = f"{item['title']}: {text}"
+    if item.get("link"):
+        text = f"{text} ({item['link']})"
+    return f"- {text}"
+
+def section_header(query: str) -> str:
+    return f"--- Results for: {query} ---\n"
+
+def render_summary(results: List[dict]) -> str:
+    """Research summary grouped under the query that found each result, in search order."""
+    sections = [SUMMARY_HEADER]
+    for query in dict.fromkeys(item["query"] for item in results):
+        lines = [format_result(item) for item in results if item["query"] == query]
+        if lines:
+            sections.append(section_header(query) + "\n".join(lines) + "\n\n")
+    return "".join(sections)
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """Cuts `text` to about `max_tokens`, at the last sentence (or word) boundary that fits."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    clipped = text[:max_chars]
+    sentence_end = clipped.rfind(". ")
+    if sentence_end > max_chars // 2:
+        return clipped[:sentence_end + 1]
+    return clipped.rsplit(" ", 1)[0] + " ..."
+
+class BM25:
+    """Okapi BM25 over a small in-memory corpus of token lists."""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0.0
+
+        document_frequency = Counter(token for document in documents for token in set(document))
+        count = len(documents)
+        self.idf = {
+            token: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for token, frequency in document_frequency.items()
+        }
+
+    def score(self, index: int, query_weights: dict) -> float:
+        frequencies = self.frequencies[index]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.average_length or 1))
+
+        total = 0.0
+        for token, weight in query_weights.items():
+            tf = frequencies.get(token)
+            if tf:
+                total += weight * self.idf[token] * tf * (self.k1 + 1) / (tf + norm)
+        return total
+
+def compact_research(results: List[dict], reference: str,
+                     token_budget: int, snippet_tokens: int, redundancy: float) -> str:
+    """
+    Builds the research summary within `token_budget` (estimated tokens):
+    snippets are clipped to `snippet_tokens`, ranked by BM25 relevance to the
+    `reference` text (the video analysis), and added best-first, skipping any
+    whose word overlap (Jaccard) with an already chosen one reaches
+    `redundancy`. The chosen snippets are rendered in their original order.
+    A budget of 0 keeps everything, unranked.
+    """
+    summary = render_summary(select_research(results, reference, token_budget, snippet_tokens, redundancy))
+    RESEARCH_TOKENS.observe(estimate_tokens(summary))
+    return summary
+
+def select_research(results: List[dict], reference: str,
+                    token_budget: int, snippet_tokens: int, redundancy: float) -> List[dict]:
+    """The (clipped) results compact_research keeps, in their original order."""
+    if token_budget <= 0:
+        return list(results)
+
+    candidates = [{**item, "snippet": clip_text(item.get("snippet", ""), snippet_tokens)} for item in results]
+    documents = [content_tokens(f"{item.get('title', '')} {item['snippet']}") for item in candidates]
+
+    index = BM25(documents)
+    query_weights = {token: 1 + math.log(count) for token, count in Counter(content_tokens(reference)).items()}
+    ranked = sorted(range(len(candidates)), key=lambda i: (-index.score(i, query_weights), i))
+
+    chosen = []
+    chosen_words = []
+    headers = set()
+    used = estimate_tokens(SUMMARY_HEADER)
+    for i in ranked:
+        words = set(documents[i])
+        if any(jaccard(words, other) >= redundancy for other in chosen_words):
+            SNIPPETS_DROPPED.labels("redundant").inc()
+            continue
+
+        query = candidates[i]["query"]
+        cost = estimate_tokens(format_result(candidates[i]) + "\n")
+        if query not in headers:
+            cost += estimate_tokens(section_header(query) + "\n")
+        if used + cost > token_budget:
+            SNIPPETS_DROPPED.labels("budget").inc()
+            continue
+
+        used += cost
+        headers.add(query)
+        chosen.append(i)
+        chosen_words.append(words)
+
+    return [candidates[i] for i in sorted(chosen)]
+
+def diff_research(previous_summary: str, findings: List[dict]) -> dict:
+    """
+    Compares freshly selected findings with a previously rendered research
+    summary: {"added": [findings not in it], "kept": n, "removed": n}.
+    Results are matched by normalized link, or by snippet text when they have none.
+    """
+    previous_links = set()
+    previous_count = 0
+    for line in (previous_summary or "").splitlines():
+        if line.startswith("- "):
+            previous_count += 1
+            match = _SUMMARY_LINK.search(line)
+            if match:
+                previous_links.add(result_key({"link": match.group(1)}))
+    previous_text = " ".join(query_tokens(previous_summary or ""))
+
+    added, kept = [], 0
+    for item in findings:
+        key = result_key(item)
+        if key is None:
+            seen = False
+        elif item.get("link"):
+            seen = key in previous_links
+        else:
+            seen = key[len("text:"):] in previous_text
+        if seen:
+            kept += 1
+        else:
+            added.append(item)
+
+    return {"added": added, "kept": kept, "removed": max(0, previous_count - kept)}
+
+def is_material_change(diff: dict, threshold: float) -> bool:
+    """True when new findings make up at least `threshold` of the current selection."""
+    total = len(diff["added"]) + diff["kept"]
+    return bool(diff["added"]) and len(diff["added"]) / total >= threshold
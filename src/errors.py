@@ -0,0 +1,178 @@
+import logging
+from typing import Optional, Tuple
+from src.exception import CustomException
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# Error code -> (kind, HTTP status). Transient errors may succeed if retried
+# as is; permanent ones won't until the input or the code changes.
+ERROR_CODES = {
+    "invalid_input": (PERMANENT, 400),
+    "video_unavailable": (PERMANENT, 404),
+    "no_transcript": (PERMANENT, 422),
+    "bad_llm_output": (PERMANENT, 502),
+    "upstream": (PERMANENT, 502),
+    "internal": (PERMANENT, 500),
+    "rate_limited": (TRANSIENT, 503),
+    "upstream_unavailable": (TRANSIENT, 503),
+    "timeout": (TRANSIENT, 504),
+    "overloaded": (TRANSIENT, 503),
+    "client_limit": (TRANSIENT, 429),
+}
+
+# Seconds clients are told to wait before retrying a transient failure with no Retry-After of its own
+DEFAULT_RETRY_AFTER = 5
+
+_UNAVAILABLE_MARKERS = ("private video", "video unavailable", "not available", "has been removed", "members-only")
+_INVALID_MARKERS = ("unsupported url", "is not a valid url", "incomplete youtube id")
+
+class PipelineError(Exception):
+    """
+    A failed pipeline stage: what went wrong (code, message), where (stage),
+    why (the underlying exception, as text) and whether retrying can help
+    (kind). Nodes put it in the graph state as to_dict() instead of raising.
+    """
+
+    def __init__(self, message: str, code: str = "internal", stage: Optional[str] = None,
+                 cause: Optional[str] = None, retry_after: Optional[float] = None, kind: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code if code in ERROR_CODES else "internal"
+        self.kind = kind or ERROR_CODES[self.code][0]
+        self.stage = stage
+        self.cause = cause
+        self.retry_after = retry_after
+
+    @property
+    def transient(self) -> bool:
+        return self.kind == TRANSIENT
+
+    def to_dict(self) -> dict:
+        return {
+            "message": self.message,
+            "code": self.code,
+            "kind": self.kind,
+            "stage": self.stage,
+            "cause": self.cause,
+            "retry_after": self.retry_after
+        }
+
+    @classmethod
+    def from_dict(cls, info: dict) -> "PipelineError":
+        return cls(
+            info.get("message") or "Unknown error",
+            info.get("code", "internal"),
+            stage=info.get("stage"),
+            cause=info.get("cause"),
+            retry_after=info.get("retry_after"),
+            kind=info.get("kind")
+        )
+
+    def __str__(self):
+        return self.message
+
+def failure(message: str, code: str, stage: Optional[str] = None) -> dict:
+    """State update for an expected failure, e.g. failure("No subtitles found.", "no_transcript")."""
+    return {"error": PipelineError(message, code, stage=stage).to_dict()}
+
+def classify(error: BaseException, stage: Optional[str] = None) -> PipelineError:
+    """Maps an exception raised inside a stage to a PipelineError, unwrapping CustomException."""
+    if isinstance(error, PipelineError):
+        if error.stage is None:
+            error.stage = stage
+        return error
+
+    if isinstance(error, CustomException) and error.cause is not None:
+        error = error.cause
+
+    name = type(error).__name__
+    text = str(error) or name
+    lowered = text.lower()
+    status = _status_code(error)
+
+    if status == 429 or "RateLimit" in name:
+        code = "rate_limited"
+    elif isinstance(error, TimeoutError) or "Timeout" in name or status in (408, 504):
+        code = "timeout"
+    elif "Connection" in name or (status is not None and status >= 500):
+        code = "upstream_unavailable"
+    elif status is not None:
+        code = "upstream"
+    elif name == "DownloadError":
+        # yt-dlp reports everything as DownloadError; the message says which kind
+        if any(marker in lowered for marker in _INVALID_MARKERS):
+            code = "invalid_input"
+        elif any(marker in lowered for marker in _UNAVAILABLE_MARKERS):
+            code = "video_unavailable"
+        else:
+            code = "upstream_unavailable"
+    else:
+        code = "internal"
+
+    return PipelineError(text, code, stage=stage, cause=f"{name}: {text}", retry_after=retry_after_seconds(error))
+
+def capture(stage: str, func, state) -> dict:
+    """Runs a sync node, returning an exception it raises as an `error` state update."""
+    try:
+        return with_stage(func(state), stage)
+    except Exception as e:
+        return {"error": log_failure(classify(e, stage), e).to_dict()}
+
+async def acapture(stage: str, afunc, state) -> dict:
+    try:
+        return with_stage(await afunc(state), stage)
+    except Exception as e:
+        return {"error": log_failure(classify(e, stage), e).to_dict()}
+
+def with_stage(update: Optional[dict], stage: str) -> dict:
+    """Fills in the stage of an error a node returned (nodes don't know their graph name)."""
+    error = update.get("error") if update else None
+    if isinstance(error, dict) and not error.get("stage"):
+        return {**update, "error": {**error, "stage": stage}}
+    return update or {}
+
+def log_failure(error: PipelineError, exc: BaseException) -> PipelineError:
+    """Logs a stage failure; the traceback is only formatted for unexpected (internal) errors."""
+    if error.code == "internal":
+        logger.error("Stage %s failed", error.stage, exc_info=exc)
+    else:
+        logger.warning("Stage %s failed (%s): %s", error.stage, error.code, error.cause)
+    return error
+
+def error_message(error) -> Optional[str]:
+    """The human-readable message of an `error` from graph state or a result (dict or plain string)."""
+    if isinstance(error, dict):
+        return error.get("message")
+    return str(error) if error else None
+
+def error_response(message: str, info: Optional[dict]) -> Tuple[dict, int, dict]:
+    """JSON body, HTTP status and extra headers for a failed run; transient failures carry Retry-After."""
+    info = info or {}
+    code = info.get("code") or "internal"
+    kind = info.get("kind") or ERROR_CODES.get(code, (PERMANENT,))[0]
+    status = ERROR_CODES[code][1] if code in ERROR_CODES else (503 if kind == TRANSIENT else 500)
+    body = {"error": message, "code": code, "stage": info.get("stage"), "retryable": kind == TRANSIENT}
+    if kind != TRANSIENT:
+        return body, status, {}
+
+    retry_after = info.get("retry_after") or DEFAULT_RETRY_AFTER
+    return body, status, {"Retry-After": str(max(1, round(retry_after)))}
+
+def retry_after_seconds(error) -> Optional[float]:
+    """The Retry-After header of a provider error's response, in seconds."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _status_code(error) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
@@ -11,8 +11,17 @@ def error_message_detail(error, error_detail:sys):
 class CustomException(Exception):
 
     def __init__(self, error_message, error_detail:sys):
+        if isinstance(error_message, CustomException):
+            # Re-wrapping keeps the innermost location and cause instead of stacking messages
+            super().__init__(*error_message.args)
+            self.error_message = error_message.error_message
+            self.cause = error_message.cause
+            return
+
         super().__init__(error_message)
         self.error_message = error_message_detail(error_message, error_detail = error_detail)
+        # The original exception, for callers that classify failures (see src.errors.classify)
+        self.cause = error_message if isinstance(error_message, BaseException) else None
 
     def __str__(self):
-        return self.error_message
\ No newline at end of file
+        return self.error_message
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING
+from src.utils import env_int, env_float
+
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+_async_client_loop = None
+
+def get_session() -> "requests.Session":
+    """
+    Process-wide keep-alive session for subtitle downloads.
+    Connections to the caption hosts are pooled and reused across requests;
+    idempotent GETs are retried with backoff on connection errors and 429/5xx.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported on first use: nothing on the page-serving path needs them
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=env_int("HTTP_RETRIES", 3),
+                backoff_factor=env_float("HTTP_RETRY_BACKOFF", 0.5),
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+            pool_size = env_int("HTTP_POOL_SIZE", 16)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept-Encoding': 'gzip, deflate'
+            })
+            _session = session
+        return _session
+
+def get_timeout():
+    """(connect, read) timeout in seconds for subtitle requests."""
+    return env_float("HTTP_CONNECT_TIMEOUT", 5.0), env_float("HTTP_READ_TIMEOUT", 20.0)
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def get_async_client() -> "httpx.AsyncClient":
+    """
+    Keep-alive client for the async pipeline, with the same pool size, timeouts
+    and gzip handling as get_session(). Connection failures are retried by the
+    transport; status-based retries are left to the caller.
+    A client is bound to the event loop that created it, so one is kept per loop.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        import httpx
+
+        connect_timeout, read_timeout = get_timeout()
+        pool_size = env_int("HTTP_POOL_SIZE", 16)
+        _async_client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=httpx.AsyncHTTPTransport(retries=env_int("HTTP_RETRIES", 3)),
+            follow_redirects=True
+        )
+        _async_client_loop = loop
+    return _async_client
+
+async def aclose_async_client():
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+from typing import TypedDict, Optional
+from src.errors import classify
+from src.exception import CustomException
+from src.logger import log_context
+from src.pipeline import generate_blog
+from src.utils import env_int, env_float
+
+logger = logging.getLogger(__name__)
+
+class JobRecord(TypedDict):
+
+    job_id: str
+    video_url: str
+    force_refresh: bool
+    status: str          # queued | running | succeeded | failed
+    stage: Optional[str]  # agent currently running
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    error: Optional[str]
+    error_info: Optional[dict]  # typed error (code, kind, stage) when failed
+    result: Optional[dict]
+
+class QueueFullError(Exception):
+    """Raised by submit() when the backlog is at capacity; surfaced as HTTP 429."""
+
+class InMemoryJobBackend:
+    """Default backend: a bounded in-process queue plus a dict of job records."""
+
+    def __init__(self, max_queued: int, ttl: float):
+
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, job: JobRecord):
+        with self._lock:
+            self._prune()
+            self._jobs[job["job_id"]] = job
+        try:
+            self._queue.put_nowait(job["job_id"])
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job["job_id"], None)
+            raise QueueFullError("Job queue is full")
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def save(self, job: JobRecord):
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+
+    def load(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.get("finished_at") and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+class RedisJobBackend:
+    """
+    Shares the queue and job records between processes through any
+    Redis-protocol server (redis, valkey, a local stand-in such as fakeredis).
+    """
+
+    def __init__(self, url: str, max_queued: int, ttl: float, prefix: str = "tube2blog:jobs"):
+
+        try:
+            import redis
+        except ImportError as e:
+            raise CustomException(e, sys)
+
+        self.max_queued = max_queued
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def enqueue(self, job: JobRecord):
+        queue_key = f"{self.prefix}:queue"
+        if self._client.llen(queue_key) >= self.max_queued:
+            raise QueueFullError("Job queue is full")
+
+        self.save(job)
+        self._client.lpush(queue_key, job["job_id"])
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        item = self._client.brpop(f"{self.prefix}:queue", timeout=max(1, int(timeout)))
+        return item[1].decode("utf-8") if item else None
+
+    def save(self, job: JobRecord):
+        self._client.set(f"{self.prefix}:{job['job_id']}", json.dumps(job), ex=self.ttl)
+
+    def load(self, job_id: str) -> Optional[JobRecord]:
+        raw = self._client.get(f"{self.prefix}:{job_id}")
+        return json.loads(raw) if raw else None
+
+    def depth(self) -> int:
+        return self._client.llen(f"{self.prefix}:queue")
+
+class JobManager:
+    """
+    Runs blog generations off the request thread.
+    A fixed pool of worker threads drains the backend queue; each agent stage is
+    additionally capped by its own semaphore so e.g. LLM-heavy blogging can be
+    throttled independently of transcript fetching.
+    """
+
+    def __init__(self, backend, workers: int, stage_limits: dict):
+
+        self.backend = backend
+        self.workers = workers
+        self.limits = {name: threading.BoundedSemaphore(limit) for name, limit in stage_limits.items()}
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def submit(self, video_url: str, force_refresh: bool = False) -> JobRecord:
+        """Queues a generation and returns its record. Raises QueueFullError under backpressure."""
+        self._ensure_started()
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "video_url": video_url,
+            "force_refresh": force_refresh,
+            "status": "queued",
+            "stage": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "error_info": None,
+            "result": None
+        }
+        self.backend.enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        return self.backend.load(job_id)
+
+    def stop(self):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job_id = self.backend.dequeue(timeout=1.0)
+            if not job_id:
+                continue
+
+            job = self.backend.load(job_id)
+            if not job:
+                continue
+
+            try:
+                with log_context(job_id=job_id):
+                    self._run(job)
+            except Exception as e:
+                logger.exception("Job %s crashed", job_id)
+                error = classify(e)
+                job.update({"status": "failed", "error": error.message, "error_info": error.to_dict(),
+                            "finished_at": time.time()})
+                self.backend.save(job)
+
+    def _run(self, job: JobRecord):
+        job.update({"status": "running", "started_at": time.time()})
+        self.backend.save(job)
+
+        def on_agent(name):
+            job["stage"] = name
+            self.backend.save(job)
+
+        result = generate_blog(
+            job["video_url"],
+            force_refresh=job.get("force_refresh", False),
+            on_agent=on_agent,
+            limits=self.limits
+        )
+
+        if result.get("error"):
+            job.update({"status": "failed", "error": result["error"], "error_info": result.get("error_info")})
+        else:
+            job.update({"status": "succeeded", "stage": None, "result": result})
+
+        job["finished_at"] = time.time()
+        self.backend.save(job)
+
+def _parse_stage_limits(raw: str) -> dict:
+    limits = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            limits[name.strip()] = int(value)
+    return limits
+
+def get_job_manager() -> JobManager:
+    """
+    Builds the job manager from the environment.
+    JOB_BACKEND_URL switches from the in-process queue to a Redis-protocol server.
+    """
+    try:
+
+        max_queued = env_int("JOB_QUEUE_SIZE", 64)
+        ttl = env_float("JOB_TTL", 3600)
+        backend_url = os.environ.get("JOB_BACKEND_URL")
+
+        if backend_url:
+            backend = RedisJobBackend(backend_url, max_queued=max_queued, ttl=ttl)
+        else:
+            backend = InMemoryJobBackend(max_queued=max_queued, ttl=ttl)
+
+        return JobManager(
+            backend,
+            workers=env_int("JOB_WORKERS", 4),
+            stage_limits=_parse_stage_limits(os.environ.get("JOB_STAGE_LIMITS", "analyzer=4,researcher=4,blogger=2"))
+        )
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,290 @@
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import Future
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import ensure_config, merge_configs
+from src.cache.llm import message_key
+from src.errors import retry_after_seconds
+from src.metrics import counter, histogram
+from src.telemetry import call_span, record_llm_usage, LLM_TTFT_SECONDS
+from src.transcript import estimate_tokens
+
+LLM_QUEUE_WAIT_SECONDS = histogram("llm_queue_wait_seconds", "Time LLM calls waited on the rate limiter.")
+LLM_RETRIES = counter("llm_retries_total", "LLM calls retried after a rate limit or transient failure.")
+LLM_COALESCED = counter("llm_coalesced_total", "LLM calls that joined an identical in-flight call.")
+LLM_FALLBACKS = counter(
+    "llm_fallbacks_total",
+    "LLM calls sent to the fallback model: the primary was rate limited (429) or its local queue was too long.",
+    labelnames=("model", "reason")
+)
+
+# Status codes worth retrying: rate limits and transient upstream failures
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`.
+    reserve() never blocks; it books capacity (possibly going into debt) and
+    returns how long the caller must wait before using it, so the same bucket
+    serves both sync (time.sleep) and async (asyncio.sleep) callers.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Requests larger than the bucket are clamped so they can't wait forever
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def release(self, amount: float):
+        """Returns a reservation that will not be used."""
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+class RateLimits:
+    """Provider-wide request/minute and token/minute budgets shared by every gateway."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def reserve(self, estimated_tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def release(self, estimated_tokens: int):
+        self.requests.release(1)
+        self.tokens.release(estimated_tokens)
+
+class LLMGateway:
+    """
+    Rate-limited, retrying, coalescing front for a chat model.
+
+    - Every call first books capacity in the shared RateLimits and waits if needed.
+    - 429 / 5xx / timeouts are retried with exponential backoff and full jitter,
+      honouring a Retry-After header when the provider sends one.
+    - Concurrent identical prompts share a single upstream call.
+    - With a `fallback` gateway (another model), a call is handed over instead
+      of waiting when the provider answers 429 or the local limiter would
+      hold it for more than `fallback_after` seconds.
+
+    Point GROQ_API_BASE at a local fake server to exercise it end to end.
+    """
+
+    def __init__(self, llm, limits: RateLimits, max_retries: int = 4, base_delay: float = 1.0,
+                 max_delay: float = 30.0, completion_tokens: int = 1024, fallback=None,
+                 fallback_after: float = 5.0):
+
+        self.llm = llm
+        self.limits = limits
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.completion_tokens = completion_tokens
+        self.fallback = fallback
+        self.fallback_after = fallback_after
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._ainflight = {}
+
+    def invoke(self, messages, config=None, **kwargs):
+
+        key = None if kwargs else self._key(messages)
+        if key is None:
+            return self._call(messages, config, **kwargs)
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            LLM_COALESCED.inc()
+            return future.result()
+
+        try:
+            result = self._call(messages, config)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+
+        key = None if kwargs else self._key(messages)
+        if key is None:
+            return await self._acall(messages, config, **kwargs)
+
+        # Event-loop side of coalescing: no lock needed, the loop is single-threaded
+        future = self._ainflight.get(key)
+        if future is not None:
+            LLM_COALESCED.inc()
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._ainflight[key] = future
+        try:
+            result = await self._acall(messages, config)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    def _call(self, messages, config=None, **kwargs):
+        estimated = self._estimate_tokens(messages)
+
+        attempt = 0
+        while True:
+            wait = self.limits.reserve(estimated)
+            if self._should_fall_back(wait, estimated):
+                return self.fallback._call(messages, config, **kwargs)
+            LLM_QUEUE_WAIT_SECONDS.observe(wait)
+            if wait:
+                time.sleep(wait)
+
+            try:
+                with self._span(attempt) as attrs:
+                    timer = FirstTokenTimer(attrs["model"])
+                    response = self.llm.invoke(messages, config=self._with_timer(config, timer), **kwargs)
+                    self._record(response, timer, attrs)
+                    return response
+            except Exception as e:
+                if self.fallback is not None and is_rate_limited(e):
+                    LLM_FALLBACKS.labels(self._model, "rate_limited").inc()
+                    return self.fallback._call(messages, config, **kwargs)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                LLM_RETRIES.inc()
+                time.sleep(self.retry_delay(e, attempt))
+                attempt += 1
+
+    async def _acall(self, messages, config=None, **kwargs):
+        estimated = self._estimate_tokens(messages)
+
+        attempt = 0
+        while True:
+            wait = self.limits.reserve(estimated)
+            if self._should_fall_back(wait, estimated):
+                return await self.fallback._acall(messages, config, **kwargs)
+            LLM_QUEUE_WAIT_SECONDS.observe(wait)
+            if wait:
+                await asyncio.sleep(wait)
+
+            try:
+                with self._span(attempt) as attrs:
+                    timer = FirstTokenTimer(attrs["model"])
+                    response = await self.llm.ainvoke(messages, config=self._with_timer(config, timer), **kwargs)
+                    self._record(response, timer, attrs)
+                    return response
+            except Exception as e:
+                if self.fallback is not None and is_rate_limited(e):
+                    LLM_FALLBACKS.labels(self._model, "rate_limited").inc()
+                    return await self.fallback._acall(messages, config, **kwargs)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                LLM_RETRIES.inc()
+                await asyncio.sleep(self.retry_delay(e, attempt))
+                attempt += 1
+
+    @property
+    def _model(self) -> str:
+        return getattr(self.llm, "model_name", "")
+
+    def _should_fall_back(self, wait: float, estimated: int) -> bool:
+        if self.fallback is None or wait <= self.fallback_after:
+            return False
+
+        self.limits.release(estimated)
+        LLM_FALLBACKS.labels(self._model, "queue").inc()
+        return True
+
+    def _span(self, attempt: int):
+        return call_span("llm", model=self._model, attempt=attempt)
+
+    def _with_timer(self, config, timer):
+        # Keep the caller's callbacks (LangGraph's token streaming) and add the TTFT timer
+        return merge_configs(ensure_config(config), {"callbacks": [timer]})
+
+    def _record(self, response, timer, attrs: dict):
+        if timer.ttft is not None:
+            attrs["ttft_ms"] = round(timer.ttft * 1000, 2)
+        record_llm_usage(attrs["model"], response, attrs)
+
+    def retry_delay(self, error, attempt: int) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _key(self, messages) -> str:
+        return message_key(getattr(self.llm, "model_name", ""), getattr(self.llm, "temperature", None), messages)
+
+    def _estimate_tokens(self, messages) -> int:
+        if isinstance(messages, str):
+            return estimate_tokens(messages) + self.completion_tokens
+        return sum(estimate_tokens(str(getattr(m, "content", m))) for m in messages) + self.completion_tokens
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+def is_retryable(error) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+
+    name = type(error).__name__
+    return "RateLimit" in name or "Timeout" in name or "Connection" in name
+
+def is_rate_limited(error) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429
+    return "RateLimit" in type(error).__name__
+
+class FirstTokenTimer(BaseCallbackHandler):
+    """Callback that records time to first token when the model streams (e.g. under SSE)."""
+
+    def __init__(self, model: str):
+
+        self.model = model
+        self.start = time.perf_counter()
+        self.ttft = None
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.start
+            LLM_TTFT_SECONDS.labels(self.model).observe(self.ttft)
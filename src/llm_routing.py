@@ -0,0 +1,53 @@
+import os
+from typing import Optional
+
+LARGE_MODEL = "llama-3.3-70b-versatile"
+FAST_MODEL = "llama-3.1-8b-instant"
+
+# Pipeline stage -> model and call parameters. Only the published post (and edits
+# to it) needs the large model; chunk notes, query planning and the outline run
+# on the fast one. "revise" returns section edits as JSON on incremental refreshes.
+# Override per stage with LLM_<STAGE>_MODEL / _TEMPERATURE / _MAX_TOKENS /
+# _FALLBACK ("none" to disable) / _JSON_MODE, or pin every stage with LLM_MODEL.
+DEFAULT_ROUTES = {
+    "analysis": {"model": FAST_MODEL, "temperature": 0.2, "max_tokens": None, "json_mode": False, "fallback": LARGE_MODEL},
+    "queries": {"model": FAST_MODEL, "temperature": 0.0, "max_tokens": 256, "json_mode": True, "fallback": LARGE_MODEL},
+    "outline": {"model": FAST_MODEL, "temperature": 0.2, "max_tokens": 1024, "json_mode": False, "fallback": LARGE_MODEL},
+    "blog": {"model": LARGE_MODEL, "temperature": 0.2, "max_tokens": None, "json_mode": False, "fallback": FAST_MODEL},
+    "revise": {"model": LARGE_MODEL, "temperature": 0.2, "max_tokens": 1536, "json_mode": True, "fallback": FAST_MODEL},
+}
+
+# Provider budgets per model as (requests/minute, tokens/minute); Groq limits each model separately.
+MODEL_RATE_LIMITS = {
+    LARGE_MODEL: (30, 12000),
+    FAST_MODEL: (30, 6000),
+}
+
+def model_route(stage: str) -> dict:
+    """The model and parameters for a pipeline stage, after environment overrides."""
+    if stage not in DEFAULT_ROUTES:
+        raise ValueError(f"Unknown LLM stage {stage!r}; expected one of {sorted(DEFAULT_ROUTES)}")
+
+    route = dict(DEFAULT_ROUTES[stage])
+    prefix = f"LLM_{stage.upper()}_"
+
+    pinned = os.environ.get("LLM_MODEL")
+    if pinned:
+        route["model"] = pinned
+    route["model"] = os.environ.get(prefix + "MODEL") or route["model"]
+
+    if os.environ.get(prefix + "TEMPERATURE"):
+        route["temperature"] = float(os.environ[prefix + "TEMPERATURE"])
+    if os.environ.get(prefix + "MAX_TOKENS"):
+        route["max_tokens"] = int(os.environ[prefix + "MAX_TOKENS"]) or None
+    if os.environ.get(prefix + "JSON_MODE"):
+        route["json_mode"] = os.environ[prefix + "JSON_MODE"].lower() in ("1", "true", "on")
+
+    fallback = os.environ.get(prefix + "FALLBACK", os.environ.get("LLM_FALLBACK_MODEL", route["fallback"]))
+    route["fallback"] = _fallback(fallback, route["model"])
+    return route
+
+def _fallback(model: Optional[str], primary: str) -> Optional[str]:
+    if not model or model.lower() in ("none", "off") or model == primary:
+        return None
+    return model
@@ -1,30 +1,183 @@
-import logging
 import os
-from datetime import datetime
-
-# Define log file name
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-
-# Determine where to save logs
-# Vercel provides a read-only filesystem except for /tmp
-if os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
-    # In Vercel/Lambda, use /tmp
-    logs_path = os.path.join("/tmp", "logs")
-else:
-    # Locally, use the current directory
-    logs_path = os.path.join(os.getcwd(), "logs")
-
-os.makedirs(logs_path, exist_ok=True)
-
-LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
-
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
-
-# Also print to console (Standard Output) so Vercel logs capture it
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter("[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s"))
-logging.getLogger().addHandler(console_handler)
\ No newline at end of file
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from src.metrics import counter
+
+LOG_RECORDS_DROPPED = counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+# Fields carried by every record logged while they are bound (see log_context)
+CONTEXT_FIELDS = ("request_id", "job_id", "batch_id", "video_id", "stage")
+
+TEXT_FORMAT = "[ %(asctime)s ] %(name)s - %(levelname)s - %(context)s%(message)s"
+
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+def bind_log_context(**fields):
+    """Adds fields to the current log context; returns a token for unbind_log_context()."""
+    return _log_context.set({**_log_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+def unbind_log_context(token):
+    try:
+        _log_context.reset(token)
+    except ValueError:
+        # A streaming generator closed from another context
+        pass
+
+@contextmanager
+def log_context(**fields):
+    """Binds fields (request_id, job_id, stage...) to every record logged inside the block, threads included."""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        unbind_log_context(token)
+
+def current_log_context() -> dict:
+    return _log_context.get()
+
+class ContextFilter(logging.Filter):
+    """Copies the bound log context onto the record; runs on the caller's thread, before the queue."""
+
+    def filter(self, record):
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            setattr(record, field, context.get(field))
+        record.context = "".join(f"{field}={context[field]} " for field in CONTEXT_FIELDS if field in context)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, bound context and any exception."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never waits: when the listener falls behind and the
+    bounded queue is full, the record is dropped and counted instead.
+    """
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record):
+        # Render message and traceback here so the record pickles/crosses threads without live objects
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+_listener = None
+_queue_handler = None
+_configure_lock = threading.Lock()
+
+def get_log_dir() -> str:
+    # Vercel/Lambda only allow writes under /tmp
+    if os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        default = os.path.join("/tmp", "logs")
+    else:
+        default = os.path.join(os.getcwd(), "logs")
+    return os.environ.get("LOG_DIR") or default
+
+def _formatter(kind: str) -> logging.Formatter:
+    return JsonFormatter() if kind == "json" else logging.Formatter(TEXT_FORMAT)
+
+def configure_logging():
+    """
+    Installs the process's logging pipeline; call once at startup (repeat calls are no-ops).
+
+    Request threads only put records on a bounded in-memory queue; a listener
+    thread writes them to a size-rotated file (LOG_FILE under LOG_DIR, default
+    app-{pid}.log so worker processes never rotate the same file; rotated
+    at LOG_MAX_BYTES, LOG_BACKUP_COUNT kept; LOG_FILE=off disables it) and to
+    the console. LOG_FORMAT / LOG_CONSOLE_FORMAT pick json or text.
+    """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        from src.utils import env_int
+
+        handlers = []
+        log_file = os.environ.get("LOG_FILE", "app-{pid}.log")
+        if log_file.lower() not in ("off", "0", "false"):
+            log_dir = get_log_dir()
+            os.makedirs(log_dir, exist_ok=True)
+            # {pid} gives each worker sharing LOG_DIR its own file to rotate
+            file_handler = RotatingFileHandler(
+                os.path.join(log_dir, log_file.format(pid=os.getpid())),
+                maxBytes=env_int("LOG_MAX_BYTES", 10 * 1024 * 1024),
+                backupCount=env_int("LOG_BACKUP_COUNT", 5),
+                encoding="utf-8",
+                delay=True
+            )
+            file_handler.setFormatter(_formatter(os.environ.get("LOG_FORMAT", "json")))
+            handlers.append(file_handler)
+
+        if os.environ.get("LOG_CONSOLE", "on").lower() not in ("off", "0", "false"):
+            # Also print to console (Standard Output) so Vercel logs capture it
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(_formatter(os.environ.get("LOG_CONSOLE_FORMAT", "text")))
+            handlers.append(console_handler)
+
+        log_queue = queue.Queue(maxsize=env_int("LOG_QUEUE_SIZE", 10000))
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+
+        root = logging.getLogger()
+        root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+        root.addHandler(queue_handler)
+        _queue_handler = queue_handler
+        # One line per HTTP request from httpx is noise at INFO
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
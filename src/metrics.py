@@ -0,0 +1,209 @@
+import threading
+from bisect import bisect_left
+
+# Latency buckets in seconds, tuned for a pipeline where single stages range
+# from sub-millisecond cache hits to multi-second LLM calls.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Buckets for token counts per call / per run
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+class _Labeled:
+    """
+    Label support shared by Histogram and Counter: a metric created with
+    `labelnames` is a family, and labels(...) returns the child for one set of
+    values (created on first use). Unlabeled metrics are used directly.
+    """
+
+    def _init_labels(self, labelnames):
+        self.labelnames = tuple(labelnames)
+        self.labelvalues = ()
+        self._children = {}
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    child.labelvalues = values
+                    self._children[values] = child
+        return child
+
+    def series(self) -> list:
+        """(label dict, metric) pairs for every concrete series of this metric."""
+        if not self.labelnames:
+            return [({}, self)]
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self.labelnames, values)), child) for values, child in children]
+
+class Histogram(_Labeled):
+    """Thread-safe cumulative histogram with fixed upper-bound buckets."""
+
+    def __init__(self, name: str, description: str, buckets=DEFAULT_BUCKETS, labelnames=()):
+
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._init_labels(labelnames)
+
+    def _new_child(self):
+        return Histogram(self.name, self.description, self.buckets)
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation inside the matching bucket."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+
+        if total == 0:
+            return 0.0
+
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * ((rank - seen) / count)
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf, plus the sum, as Prometheus exposes them."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        pairs, running = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs, total
+
+    def snapshot(self) -> dict:
+        if self.labelnames:
+            return {",".join(child.labelvalues): child.snapshot() for _, child in self.series()}
+
+        with self._lock:
+            count, total = self._count, self._sum
+        return {
+            "count": count,
+            "sum": total,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+class Counter(_Labeled):
+    """Thread-safe monotonically increasing counter."""
+
+    def __init__(self, name: str, description: str, labelnames=()):
+
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._init_labels(labelnames)
+
+    def _new_child(self):
+        return Counter(self.name, self.description)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        if self.labelnames:
+            return {",".join(child.labelvalues): child.snapshot() for _, child in self.series()}
+        return {"value": self._value}
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def counter(name: str, description: str = "", labelnames=()) -> Counter:
+    """Returns the process-wide counter registered under `name`, creating it once."""
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = Counter(name, description, labelnames)
+            _metrics[name] = metric
+        return metric
+
+def histogram(name: str, description: str = "", buckets=DEFAULT_BUCKETS, labelnames=()) -> Histogram:
+    """Returns the process-wide histogram registered under `name`, creating it once."""
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = Histogram(name, description, buckets, labelnames)
+            _metrics[name] = metric
+        return metric
+
+def snapshot() -> dict:
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _metrics_lock:
+        metrics = sorted(_metrics.values(), key=lambda metric: metric.name)
+
+    lines = []
+    for metric in metrics:
+        kind = "histogram" if isinstance(metric, Histogram) else "counter"
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+
+        for labels, series in metric.series():
+            if kind == "counter":
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(series.value)}")
+                continue
+
+            pairs, total = series.cumulative()
+            for bound, count in pairs:
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{metric.name}_bucket{_format_labels({**labels, 'le': le})} {count}")
+            lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{metric.name}_count{_format_labels(labels)} {pairs[-1][1]}")
+
+    return "\n".join(lines) + "\n"
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
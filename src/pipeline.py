@@ -0,0 +1,577 @@
+import sys
+import time
+import asyncio
+import logging
+from contextlib import nullcontext
+from src.admission import AdmissionRejected
+from src.agents.blog_pipeline import NODE_AGENTS, PIPELINE_VERSION, label_error
+from src.cache.memory import bypass_reads
+from src.compaction import diff_research, is_material_change, render_summary
+from src.errors import PipelineError, capture, classify, error_message, log_failure
+from src.exception import CustomException
+from src.logger import log_context
+from src.registry import registry
+from src.store import RESULT_REQUESTS, SingleFlight, get_result_store
+from src.telemetry import stage_span, trace
+from src.utils import env_float, extract_video_id
+
+logger = logging.getLogger(__name__)
+
+# LangGraph nodes of the composed pipeline, in topological order
+STAGES = list(NODE_AGENTS)
+AGENTS = ["analyzer", "researcher", "blogger"]
+
+_flights = SingleFlight()
+
+def run_pipeline(video_url: str, on_agent=None, limits=None, include_trace: bool = False) -> dict:
+    """
+    Runs the composed graph:
+    1. Analyzer: Video -> Transcript -> Chunk notes -> Analysis
+    2. Researcher: Chunk notes -> Web Queries -> Research Summary (parallel to the reduce + outline)
+    3. Blogger: Analysis -> Outline, then Outline + Research -> Blog Post
+    Returns the outputs plus per-node timings (ms), or a dict with an `error`.
+
+    `on_agent(name)` is called as each agent's nodes start; `limits` optionally
+    maps an agent name to a context manager (e.g. a semaphore) held around them.
+    The result carries the run's LLM token usage and, with `include_trace`, its spans.
+    """
+    try:
+
+        with trace() as current, log_context(video_id=extract_video_id(video_url)):
+            timings = {}
+            start = time.perf_counter()
+            pipeline = registry.acquire_pipeline()
+            timings["setup"] = _elapsed_ms(start)
+
+            state = pipeline.run(video_url, on_agent=on_agent, limits=limits, timings=timings)
+
+        return _result(state, timings, current, include_trace)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+async def arun_pipeline(video_url: str, include_trace: bool = False) -> dict:
+    """
+    Async run_pipeline: the graph's async nodes run on the caller's event loop,
+    so one worker can hold many pipelines that are waiting on I/O.
+    """
+    try:
+
+        with trace() as current, log_context(video_id=extract_video_id(video_url)):
+            timings = {}
+            start = time.perf_counter()
+            pipeline = await asyncio.to_thread(registry.acquire_pipeline)
+            timings["setup"] = _elapsed_ms(start)
+
+            state = await pipeline.arun(video_url, timings=timings)
+
+        return _result(state, timings, current, include_trace)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def generate_blog(video_url: str, force_refresh: bool = False, on_agent=None, limits=None,
+                  include_trace: bool = False, admission=None) -> dict:
+    """
+    run_pipeline behind the result store: a blog already stored for this video
+    and PIPELINE_VERSION is returned as is, concurrent requests for the same
+    video share one run, and successful runs are stored. `force_refresh`
+    regenerates, bypassing the stored blog and the LLM / search caches.
+    result["source"] says which happened: "store", "pipeline" or "shared".
+
+    `admission` is a context manager (AdmissionController.slot) held around
+    the run only, so stored and shared answers never wait for a slot; a
+    rejection comes back as an error result like a failed run.
+    """
+    try:
+
+        run = _StoredRun(video_url, force_refresh)
+        stored = run.lookup()
+        if stored is not None:
+            return run.stored_result(stored, include_trace)
+
+        if run.key is None:
+            with admission or nullcontext():
+                return {**run_pipeline(video_url, on_agent, limits, include_trace), "source": "pipeline"}
+
+        def compute():
+            with admission or nullcontext(), run.caches():
+                result = run_pipeline(video_url, on_agent, limits, include_trace)
+            run.save(result)
+            return result
+
+        result, shared = _share(run.key, compute)
+        return run.outcome(result, shared)
+
+    except AdmissionRejected as e:
+        return _error_result(e.to_dict())
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+async def agenerate_blog(video_url: str, force_refresh: bool = False, include_trace: bool = False,
+                         admission=None) -> dict:
+    """
+    Async generate_blog; joins in-flight runs started by sync callers too.
+    `admission` is an async context manager (AdmissionController.aslot).
+    """
+    try:
+
+        run = _StoredRun(video_url, force_refresh)
+        stored = await asyncio.to_thread(run.lookup)
+        if stored is not None:
+            return run.stored_result(stored, include_trace)
+
+        if run.key is None:
+            async with admission or nullcontext():
+                return {**await arun_pipeline(video_url, include_trace), "source": "pipeline"}
+
+        async def compute():
+            async with admission or nullcontext():
+                with run.caches():
+                    result = await arun_pipeline(video_url, include_trace)
+            await asyncio.to_thread(run.save, result)
+            return result
+
+        result, shared = await _ashare(run.key, compute)
+        return run.outcome(result, shared)
+
+    except AdmissionRejected as e:
+        return _error_result(e.to_dict())
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def refresh_blog(video_url: str, include_trace: bool = False, admission=None) -> dict:
+    """
+    Incremental refresh of a stored blog, for news-style videos that go stale.
+    The stored video_analysis is reused (no transcript fetch, no analysis); only
+    query generation and the web searches run again, past the search cache.
+    The findings compaction keeps are diffed against the stored research and,
+    when at least REFRESH_CHANGE_THRESHOLD of them are new, the blogger edits
+    just the sections they affect and the result is stored.
+
+    result["source"] is "revised", "unchanged" (research didn't materially
+    change; the stored post is returned), "shared" (joined an in-flight run)
+    or "pipeline" (nothing stored yet, so a full generation ran);
+    result["research_changes"] counts the added / kept / removed findings.
+    `admission` is held around the refresh as in generate_blog.
+    """
+    try:
+
+        run = _StoredRun(video_url, force_refresh=False)
+        stored = run.store.get(*run.key) if run.store is not None and run.key is not None else None
+        if stored is None or not stored.get("video_analysis"):
+            return generate_blog(video_url, include_trace=include_trace, admission=admission)
+
+        def compute():
+            with admission or nullcontext(), trace() as current, log_context(video_id=run.video_id):
+                result = _refresh(stored, current, include_trace)
+            if result.get("source") == "revised":
+                run.save(result)
+            return result
+
+        result, shared = _share(run.key, compute)
+        if shared:
+            return run.outcome(result, shared=True)
+
+        if not result.get("error"):
+            RESULT_REQUESTS.labels(result["source"]).inc()
+        return result
+
+    except AdmissionRejected as e:
+        return _error_result(e.to_dict())
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def _refresh(stored: dict, current, include_trace: bool) -> dict:
+    researcher = registry.researcher()
+    timings = {}
+    analysis = stored["video_analysis"]
+
+    state = {"video_analysis": analysis}
+    state.update(_refresh_step("generate_queries", lambda s: researcher.plan_queries(s["video_analysis"]), state, timings))
+    if not state.get("error"):
+        # Fresh results are the point of a refresh; they still refill the search cache
+        with bypass_reads():
+            state.update(_refresh_step("perform_research", lambda s: researcher.search(s["search_queries"]), state, timings))
+    if state.get("error"):
+        return _error_result(label_error(state["error"]))
+
+    findings = researcher.select_findings(state["search_results"], analysis)
+    diff = diff_research(stored.get("research_summary"), findings)
+    changes = {"added": len(diff["added"]), "kept": diff["kept"], "removed": diff["removed"]}
+
+    if not is_material_change(diff, env_float("REFRESH_CHANGE_THRESHOLD", 0.25)):
+        result = {**_stored_outputs(stored), "timings": timings, "source": "unchanged"}
+    else:
+        research_summary = render_summary(findings)
+        update = _refresh_step(
+            "revise_blog", lambda _: _revise(stored, research_summary, diff["added"]), state, timings
+        )
+        if update.get("error"):
+            return _error_result(label_error(update["error"]))
+
+        changes["edited_sections"] = update.get("edited_sections")
+        result = {
+            "blog_post": update["blog_post"],
+            "video_analysis": analysis,
+            "research_summary": research_summary,
+            "timings": timings,
+            "source": "revised"
+        }
+
+    result["research_changes"] = changes
+    result["usage"] = dict(current.usage)
+    if include_trace:
+        result["trace"] = current.to_dict()["spans"]
+    return result
+
+def _revise(stored: dict, research_summary: str, added: list) -> dict:
+    """Section-level edits with the new findings; a full rewrite if the model's edits don't apply."""
+    blogger = registry.blogger()
+    try:
+        return blogger.revise(stored["blog_post"], render_summary(added))
+    except ValueError as e:
+        logger.warning("Section edits could not be applied (%s); rewriting the post", e)
+        update = blogger.write_blog(stored["video_analysis"], research_summary)
+        return {**update, "edited_sections": None}
+
+def _refresh_step(name: str, func, state: dict, timings: dict) -> dict:
+    with stage_span(name), log_context(stage=name):
+        start = time.perf_counter()
+        update = capture(name, func, state)
+        timings[name] = _elapsed_ms(start)
+    return update
+
+def stream_pipeline(video_url: str, include_trace: bool = False, force_refresh: bool = False, admission=None):
+    """
+    Same orchestration as generate_blog, as a generator of (event, data) pairs:
+    - ("agent", {...})  when an agent's first node starts
+    - ("stage", {...})  when a LangGraph node completes
+    - ("token", {...})  blog text as the LLM produces it
+    - ("result", {...}) or ("error", {...}) exactly once at the end
+    Stored blogs and runs joined in flight produce only the final event; a run
+    `admission` turns away ends with an error event (code overloaded / client_limit).
+    """
+    pipeline_start = time.perf_counter()
+    run = None
+    try:
+
+        run = _StoredRun(video_url, force_refresh)
+        stored = run.lookup()
+        if stored is not None:
+            yield _outcome_event(run.stored_result(stored, include_trace), pipeline_start, include_trace)
+            return
+
+        joined = run.wait_shared()
+        if joined is not None:
+            yield _outcome_event(run.outcome(joined, shared=True), pipeline_start, include_trace)
+            return
+
+        pipeline = registry.acquire_pipeline()
+        translator = _PipelineEvents(pipeline_start, token_node="write_blog")
+
+        with admission or nullcontext(), trace() as current, run.caches(), log_context(video_id=run.video_id):
+            for event in pipeline.stream(video_url, stream_mode=["tasks", "updates", "messages"]):
+                yield from translator.feed(event)
+
+        result = _result(translator.state, {}, current, include_trace)
+        run.save(result)
+        run.finish(result)
+        yield _outcome_event(run.outcome(result, shared=False), pipeline_start, include_trace)
+
+    except Exception as e:
+        if run is not None:
+            run.abandon(e)
+        # Headers are already sent once streaming starts, so failures become an event.
+        yield _outcome_event(_failed_result(e), pipeline_start)
+
+    finally:
+        # Client went away mid-stream: don't leave joined requests waiting
+        if run is not None:
+            run.abandon(RuntimeError("Generation was cancelled"))
+
+async def astream_pipeline(video_url: str, include_trace: bool = False, force_refresh: bool = False, admission=None):
+    """Async generator with the same (event, data) contract as stream_pipeline."""
+    pipeline_start = time.perf_counter()
+    run = None
+    try:
+
+        run = _StoredRun(video_url, force_refresh)
+        stored = await asyncio.to_thread(run.lookup)
+        if stored is not None:
+            yield _outcome_event(run.stored_result(stored, include_trace), pipeline_start, include_trace)
+            return
+
+        joined = await run.await_shared()
+        if joined is not None:
+            yield _outcome_event(run.outcome(joined, shared=True), pipeline_start, include_trace)
+            return
+
+        pipeline = await asyncio.to_thread(registry.acquire_pipeline)
+        translator = _PipelineEvents(pipeline_start, token_node="write_blog")
+
+        async with admission or nullcontext():
+            with trace() as current, run.caches(), log_context(video_id=run.video_id):
+                async for event in pipeline.astream(video_url, stream_mode=["tasks", "updates", "messages"]):
+                    for item in translator.feed(event):
+                        yield item
+
+        result = _result(translator.state, {}, current, include_trace)
+        await asyncio.to_thread(run.save, result)
+        run.finish(result)
+        yield _outcome_event(run.outcome(result, shared=False), pipeline_start, include_trace)
+
+    except Exception as e:
+        if run is not None:
+            run.abandon(e)
+        yield _outcome_event(_failed_result(e), pipeline_start)
+
+    finally:
+        if run is not None:
+            run.abandon(RuntimeError("Generation was cancelled"))
+
+def _share(key, compute):
+    """
+    _flights.do, except that requests which joined a run whose leader was
+    turned away by admission control retry (leading under their own client
+    if need be) instead of failing with the leader's rejection.
+    """
+    leading = False
+
+    def lead():
+        nonlocal leading
+        leading = True
+        return compute()
+
+    while True:
+        try:
+            return _flights.do(key, lead)
+        except AdmissionRejected:
+            if leading:
+                raise
+
+async def _ashare(key, acompute):
+    leading = False
+
+    async def lead():
+        nonlocal leading
+        leading = True
+        return await acompute()
+
+    while True:
+        try:
+            return await _flights.ado(key, lead)
+        except AdmissionRejected:
+            if leading:
+                raise
+
+class _StoredRun:
+    """Result-store lookup, single-flight membership and write-back for one generation request."""
+
+    def __init__(self, video_url: str, force_refresh: bool):
+
+        self.video_url = video_url
+        self.force_refresh = force_refresh
+        self.store = get_result_store()
+        self.video_id = extract_video_id(video_url)
+        self.key = (self.video_id, PIPELINE_VERSION) if self.video_id else None
+        self.future = None
+
+    def lookup(self):
+        if self.force_refresh or self.store is None or self.key is None:
+            return None
+
+        stored = self.store.get(*self.key)
+        if stored is not None:
+            RESULT_REQUESTS.labels("store").inc()
+        return stored
+
+    def join(self):
+        """Claims the key; returns the in-flight future to wait on, or None when this request leads."""
+        if self.key is None:
+            return None
+
+        future, leader = _flights.claim(self.key)
+        if leader:
+            self.future = future
+            return None
+        return future
+
+    def wait_shared(self):
+        """
+        The result of the in-flight run this request joins, or None once it leads
+        (join() claimed the key). A leader turned away by admission control is
+        not this request's verdict, so it joins again or leads itself.
+        """
+        while True:
+            future = self.join()
+            if future is None:
+                return None
+            try:
+                return future.result()
+            except AdmissionRejected:
+                continue
+
+    async def await_shared(self):
+        while True:
+            future = self.join()
+            if future is None:
+                return None
+            try:
+                return await asyncio.wrap_future(future)
+            except AdmissionRejected:
+                continue
+
+    def caches(self):
+        return bypass_reads() if self.force_refresh else nullcontext()
+
+    def save(self, result: dict):
+        if self.store is None or self.key is None or result.get("error"):
+            return
+        try:
+            self.store.put(self.key[0], self.key[1], self.video_url, result)
+        except Exception as e:
+            # The blog was generated; failing to keep it shouldn't fail the request
+            logger.warning("Could not store the blog for %s: %r", self.key[0], e)
+
+    def finish(self, result: dict):
+        if self.future is not None and not self.future.done():
+            _flights.finish(self.key, self.future, result)
+
+    def abandon(self, error: BaseException):
+        if self.future is not None and not self.future.done():
+            _flights.finish(self.key, self.future, error=error)
+
+    def outcome(self, result: dict, shared: bool) -> dict:
+        if shared:
+            RESULT_REQUESTS.labels("shared").inc()
+            # This request spent nothing; the run's usage and spans belong to its leader
+            result = {key: value for key, value in result.items() if key != "trace"}
+            result["usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+            return {**result, "source": "shared"}
+
+        RESULT_REQUESTS.labels("refresh" if self.force_refresh else "pipeline").inc()
+        return {**result, "source": "pipeline"}
+
+    def stored_result(self, stored: dict, include_trace: bool) -> dict:
+        result = {
+            **_stored_outputs(stored),
+            "timings": {},
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0},
+            "source": "store",
+            "created_at": stored["created_at"]
+        }
+        if include_trace:
+            result["trace"] = []
+        return result
+
+def _stored_outputs(stored: dict) -> dict:
+    return {
+        "blog_post": stored["blog_post"],
+        "video_analysis": stored["video_analysis"],
+        "research_summary": stored["research_summary"]
+    }
+
+def _result(state: dict, timings: dict, current=None, include_trace: bool = False) -> dict:
+    """
+    The outputs of a finished run, or {"error": message, "error_info": {...}}
+    where error_info is the typed error (code, kind, stage, cause) from the state.
+    """
+    if state.get("error"):
+        return _error_result(state["error"])
+
+    if not state.get("video_analysis"):
+        return _error_result(PipelineError("Failed to generate video analysis", "internal").to_dict())
+
+    result = {
+        "blog_post": state.get("blog_post"),
+        "video_analysis": state["video_analysis"],
+        "research_summary": state.get("research_summary"),
+        "timings": timings
+    }
+    if current is not None:
+        result["usage"] = dict(current.usage)
+        if include_trace:
+            result["trace"] = current.to_dict()["spans"]
+    return result
+
+def _error_result(info) -> dict:
+    if not isinstance(info, dict):
+        info = PipelineError(str(info)).to_dict()
+    return {"error": error_message(info), "error_info": info}
+
+def _failed_result(error: Exception) -> dict:
+    """An error result for an exception raised outside the graph (setup, store, a shared run)."""
+    return _error_result(log_failure(classify(error), error).to_dict())
+
+class _PipelineEvents:
+    """Turns LangGraph stream events from the composed graph into pipeline events, accumulating its state."""
+
+    def __init__(self, pipeline_start: float, token_node: str = None):
+
+        self.pipeline_start = pipeline_start
+        self.token_node = token_node
+        self.state = {}
+        self.started_agents = set()
+        self.streamed_tokens = False
+
+    def feed(self, event) -> list:
+        mode, payload = event if isinstance(event, tuple) else ("updates", event)
+
+        if mode == "tasks":
+            # Task-start payloads carry the input; completions carry the result
+            agent = NODE_AGENTS.get(payload.get("name"))
+            if "input" in payload and agent and agent not in self.started_agents and not self.state.get("error"):
+                self.started_agents.add(agent)
+                return [("agent", {"agent": agent, "step": AGENTS.index(agent) + 1, "status": "started"})]
+            return []
+
+        if mode == "messages":
+            chunk, metadata = payload
+            if self.token_node and metadata.get("langgraph_node") == self.token_node and chunk.content:
+                self.streamed_tokens = True
+                return [("token", {"text": chunk.content})]
+            return []
+
+        items = []
+        for node, update in payload.items():
+            update = update or {}
+            self.state.update(update)
+
+            # Cached LLM responses arrive whole; surface them as one chunk.
+            if node == self.token_node and not self.streamed_tokens and update.get("blog_post"):
+                items.append(("token", {"text": update["blog_post"]}))
+
+            items.append(("stage", {
+                "stage": node,
+                "status": "completed",
+                "step": STAGES.index(node) + 1 if node in STAGES else None,
+                "total_steps": len(STAGES),
+                "elapsed_ms": _elapsed_ms(self.pipeline_start)
+            }))
+        return items
+
+def _outcome_event(result: dict, pipeline_start: float, include_trace: bool = False):
+    """The final ("result" | "error", data) stream event for a pipeline result."""
+    if result.get("error"):
+        return "error", {"error": result["error"], "error_info": result.get("error_info")}
+
+    payload = {
+        "status": "success",
+        "blog_post": result["blog_post"],
+        "debug_analysis": result["video_analysis"],
+        "debug_research": result["research_summary"],
+        "elapsed_ms": _elapsed_ms(pipeline_start),
+        "usage": result.get("usage")
+    }
+    if "source" in result:
+        payload["source"] = result["source"]
+    if include_trace:
+        payload["trace"] = result.get("trace")
+    return "result", payload
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
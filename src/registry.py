@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import threading
+from src.exception import CustomException
+from src.metrics import histogram
+from src.utils import get_llm, is_serverless
+
+SETUP_SECONDS = histogram(
+    "pipeline_setup_seconds",
+    "Time spent acquiring agents, compiled graphs and clients for one request."
+)
+
+def startup_mode() -> str:
+    """
+    STARTUP_MODE: "eager" builds every agent at startup so the first request is
+    warm; "lazy" defers that (and the heavy imports) to the first generation,
+    which keeps cold starts short. Lazy is the default on Vercel/Lambda.
+    """
+    mode = os.environ.get("STARTUP_MODE", "").lower()
+    if mode in ("eager", "lazy"):
+        return mode
+    return "lazy" if is_serverless() else "eager"
+
+class AgentRegistry:
+    """
+    Process-wide pool of warm agents.
+    Each agent (and the compiled graph, LLM client and search tool it owns) is
+    built once per worker and then shared by every request handled by it.
+    Agent modules (yt-dlp, LangGraph, LangChain, the Groq and search clients)
+    are only imported when an agent is first built, so a worker that hasn't
+    generated anything yet starts and serves pages without them.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self._llms = {}
+        self._agents = {}
+        self._shutdown_hooks = []
+
+    def start(self):
+        """Lifecycle hook: eagerly builds every agent so the first request is warm."""
+        try:
+            self.pipeline()
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def shutdown(self):
+        """Lifecycle hook: runs registered cleanup callbacks and drops all cached clients."""
+        with self._lock:
+            hooks = list(reversed(self._shutdown_hooks))
+            agents = list(self._agents.values())
+            self._shutdown_hooks.clear()
+            self._agents.clear()
+            self._llms.clear()
+
+        for agent in agents:
+            if hasattr(agent, "close"):
+                agent.close()
+
+        for hook in hooks:
+            hook()
+
+    def add_shutdown_hook(self, hook):
+        with self._lock:
+            self._shutdown_hooks.append(hook)
+
+    def llm(self, stage: str = "blog"):
+        """The routed model client for a pipeline stage, shared by every agent that uses it."""
+        with self._lock:
+            if stage not in self._llms:
+                self._llms[stage] = get_llm(stage)
+            return self._llms[stage]
+
+    def analyzer(self):
+        def build():
+            from src.agents.video_analyzer import YoutubeAnalyzeAgent
+            return YoutubeAnalyzeAgent(llm=self.llm("analysis"))
+        return self._get("analyzer", build)
+
+    def researcher(self):
+        def build():
+            from src.agents.researcher import ResearchAgent
+            return ResearchAgent(llm=self.llm("queries"))
+        return self._get("researcher", build)
+
+    def blogger(self):
+        def build():
+            from src.agents.blogger import BloggerAgent
+            return BloggerAgent(llm=self.llm("blog"), outline_llm=self.llm("outline"), revise_llm=self.llm("revise"))
+        return self._get("blogger", build)
+
+    def pipeline(self):
+        """The composed graph over the three agents' nodes (built on the shared agents)."""
+        def build():
+            from src.agents.blog_pipeline import BlogPipelineAgent
+            return BlogPipelineAgent(self.analyzer(), self.researcher(), self.blogger())
+        return self._get("pipeline", build)
+
+    def acquire(self):
+        """Returns (analyzer, researcher, blogger) and records how long that took."""
+        start = time.perf_counter()
+        agents = (self.analyzer(), self.researcher(), self.blogger())
+        SETUP_SECONDS.observe(time.perf_counter() - start)
+        return agents
+
+    def acquire_pipeline(self):
+        """Returns the composed graph and records how long that took, like acquire()."""
+        start = time.perf_counter()
+        pipeline = self.pipeline()
+        SETUP_SECONDS.observe(time.perf_counter() - start)
+        return pipeline
+
+    def _get(self, name, factory):
+
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+
+        # Build outside the lock (graph compilation is slow), then publish the
+        # first instance that lands so concurrent cold requests share it.
+        built = factory()
+        with self._lock:
+            return self._agents.setdefault(name, built)
+
+registry = AgentRegistry()
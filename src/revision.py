@@ -0,0 +1,93 @@
+import re
+import json
+from typing import Dict, List, Tuple
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_HEADING = re.compile(r"^#{1,6}\s+\S")
+# One fence around the whole reply; fences inside section content are Markdown and stay
+_OUTER_FENCE = re.compile(r"\A\s*```[a-zA-Z]*[ \t]*\n(.*)\n[ \t]*```\s*\Z", re.DOTALL)
+
+def split_sections(post: str) -> List[str]:
+    """
+    Splits a Markdown post into sections, each starting at a heading (text
+    before the first heading is its own section). Headings inside code
+    fences don't split.
+    """
+    sections, current, fenced = [], [], False
+    for line in (post or "").splitlines():
+        if _FENCE.match(line):
+            fenced = not fenced
+        if not fenced and _HEADING.match(line) and current:
+            sections.append(current)
+            current = []
+        current.append(line)
+    if current:
+        sections.append(current)
+
+    return [text for text in ("\n".join(lines).strip() for lines in sections) if text]
+
+def join_sections(sections: List[str]) -> str:
+    return "\n\n".join(section.strip() for section in sections if section.strip()) + "\n"
+
+def number_sections(sections: List[str]) -> str:
+    """Sections as the revise prompt shows them: `[n]` markers the model refers back to."""
+    return "\n\n".join(f"[{index}]\n{section}" for index, section in enumerate(sections, start=1))
+
+def parse_section_edits(content: str, section_count: int) -> Tuple[Dict[int, str], List[Tuple[int, str]]]:
+    """
+    Parses the model's edit list:
+    {"edits": [{"section": n, "content": "..."}], "new_sections": [{"after": n, "content": "..."}]}
+    into ({index: replacement}, [(after_index, content)]), 0-based. Raises ValueError
+    on anything malformed, so the caller can fall back to a full rewrite.
+    """
+    try:
+        parsed = json.loads(_strip_outer_fence(content))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Section edits are not valid JSON: {e}") from e
+
+    if not isinstance(parsed, dict):
+        raise ValueError("Section edits must be a JSON object")
+
+    edits = {}
+    for edit in parsed.get("edits") or []:
+        index = _section_index(edit, "section", section_count)
+        edits[index - 1] = _edit_content(edit)
+
+    inserts = []
+    for insert in parsed.get("new_sections") or []:
+        index = _section_index(insert, "after", section_count, allow_zero=True)
+        inserts.append((index - 1, _edit_content(insert)))
+
+    return edits, inserts
+
+def apply_section_edits(sections: List[str], edits: Dict[int, str], inserts: List[Tuple[int, str]]) -> str:
+    """Replaces edited sections and adds new ones after the section they follow (-1: at the top)."""
+    revised = [edits.get(index, section) for index, section in enumerate(sections)]
+    after = {}
+    for index, content in inserts:
+        after.setdefault(index, []).append(content)
+
+    ordered = list(after.get(-1, []))
+    for index, section in enumerate(revised):
+        ordered.append(section)
+        ordered.extend(after.get(index, []))
+    return join_sections(ordered)
+
+def _strip_outer_fence(content: str) -> str:
+    match = _OUTER_FENCE.match(content)
+    return (match.group(1) if match else content).strip()
+
+def _section_index(edit, field: str, section_count: int, allow_zero: bool = False) -> int:
+    if not isinstance(edit, dict):
+        raise ValueError(f"Section edit must be an object, got {edit!r}")
+    index = edit.get(field)
+    low = 0 if allow_zero else 1
+    if not isinstance(index, int) or not low <= index <= section_count:
+        raise ValueError(f"Section edit refers to section {index!r}; the post has {section_count}")
+    return index
+
+def _edit_content(edit: dict) -> str:
+    content = edit.get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("Section edit has no content")
+    return content.strip()
@@ -0,0 +1,234 @@
+import os
+import re
+import sys
+import json
+import time
+import base64
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+from src.exception import CustomException
+from src.metrics import counter
+from src.utils import get_data_dir
+
+RESULT_REQUESTS = counter(
+    "result_store_requests_total",
+    "Blog requests by how they were answered: store, pipeline, shared (joined an in-flight run), refresh "
+    "(forced regeneration), revised or unchanged (incremental research refresh).",
+    labelnames=("source",)
+)
+
+_HEADING = re.compile(r"^\s*#+\s*(.+?)\s*#*\s*$", re.MULTILINE)
+
+def blog_title(blog_post: str) -> Optional[str]:
+    """First markdown heading of a post, used as its title in listings."""
+    match = _HEADING.search(blog_post or "")
+    return match.group(1)[:200] if match else None
+
+def encode_cursor(created_at: float, video_id: str, version: str) -> str:
+    raw = json.dumps([created_at, video_id, version]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[float, str, str]:
+    """Raises ValueError on a cursor this store did not issue."""
+    try:
+        created_at, video_id, version = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), str(video_id), str(version)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+class SQLiteResultStore:
+    """
+    Finished blogs keyed by (video_id, pipeline version), shared by every
+    worker on the host. Listing pages newest-first with a keyset cursor, so a
+    page costs one index range scan however deep the client has paged.
+    """
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blogs (
+                video_id TEXT NOT NULL,
+                version TEXT NOT NULL,
+                video_url TEXT NOT NULL,
+                title TEXT,
+                blog_post TEXT NOT NULL,
+                video_analysis TEXT,
+                research_summary TEXT,
+                usage TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (video_id, version)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_blogs_page ON blogs (version, created_at, video_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_blogs_created ON blogs (created_at, video_id, version)")
+        self._conn.commit()
+
+    def get(self, video_id: str, version: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id, version, video_url, title, blog_post, video_analysis, research_summary, usage, created_at "
+                "FROM blogs WHERE video_id = ? AND version = ?",
+                (video_id, version)
+            ).fetchone()
+        if row is None:
+            return None
+
+        return {
+            "video_id": row[0],
+            "version": row[1],
+            "video_url": row[2],
+            "title": row[3],
+            "blog_post": row[4],
+            "video_analysis": row[5],
+            "research_summary": row[6],
+            "usage": json.loads(row[7]) if row[7] else None,
+            "created_at": row[8]
+        }
+
+    def put(self, video_id: str, version: str, video_url: str, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blogs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    video_id, version, video_url,
+                    blog_title(result["blog_post"]),
+                    result["blog_post"],
+                    result.get("video_analysis"),
+                    result.get("research_summary"),
+                    json.dumps(result.get("usage")) if result.get("usage") else None,
+                    time.time()
+                )
+            )
+            self._conn.commit()
+
+    def list(self, limit: int, cursor: Optional[str] = None, version: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of blog summaries (no bodies), newest first, optionally for a
+        single pipeline version. Returns (items, next_cursor); next_cursor is None on the last page.
+        """
+        clauses, params = [], []
+        if version:
+            clauses.append("version = ?")
+            params.append(version)
+        if cursor:
+            created_at, video_id, cursor_version = decode_cursor(cursor)
+            clauses.append("(created_at, video_id, version) < (?, ?, ?)")
+            params.extend([created_at, video_id, cursor_version])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, version, video_url, title, LENGTH(blog_post), created_at FROM blogs "
+                f"{where} ORDER BY created_at DESC, video_id DESC, version DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+
+        items = [
+            {"video_id": row[0], "version": row[1], "video_url": row[2], "title": row[3],
+             "length": row[4], "created_at": row[5]}
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last["created_at"], last["video_id"], last["version"])
+        return items, next_cursor
+
+    def delete(self, video_id: str, version: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM blogs WHERE video_id = ? AND version = ?", (video_id, version))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class SingleFlight:
+    """
+    Collapses concurrent computations of the same key onto one in-flight run.
+    Futures are thread-safe, so sync (Flask, job workers) and async (ASGI)
+    callers in one process join each other's runs.
+    """
+
+    def __init__(self):
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key) -> Tuple[Future, bool]:
+        """Returns (future, leader). The leader must settle the future through finish()."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def finish(self, key, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if error is not None:
+            if not isinstance(error, Exception):
+                # The leader was cancelled or interrupted; its waiters just see a failed run
+                error = RuntimeError(f"In-flight computation was interrupted ({type(error).__name__})")
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, func) -> Tuple[object, bool]:
+        """Runs func() unless the key is already in flight; returns (result, shared)."""
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result, False
+
+    async def ado(self, key, afunc) -> Tuple[object, bool]:
+        future, leader = self.claim(key)
+        if not leader:
+            return await asyncio.wrap_future(future), True
+
+        try:
+            result = await afunc()
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result, False
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+def get_result_store() -> Optional[SQLiteResultStore]:
+    """Process-wide blog store; None when RESULT_STORE=off."""
+    global _result_store
+    if os.environ.get("RESULT_STORE", "sqlite").lower() in ("off", "0", "false"):
+        return None
+
+    with _result_store_lock:
+        if _result_store is None:
+            try:
+                path = os.environ.get("RESULT_STORE_PATH") or os.path.join(get_data_dir("store"), "blogs.sqlite3")
+                _result_store = SQLiteResultStore(path)
+            except Exception as e:
+                raise CustomException(e, sys)
+        return _result_store
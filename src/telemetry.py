@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Optional
+from src.errors import capture, acapture
+from src.metrics import counter, histogram, TOKEN_BUCKETS
+
+STAGE_SECONDS = histogram(
+    "pipeline_stage_seconds", "Wall time of each LangGraph node.", labelnames=("stage",)
+)
+EXTERNAL_CALL_SECONDS = histogram(
+    "external_call_seconds",
+    "Latency of calls leaving the process: ytdlp_extract, subtitle_download, llm, search.",
+    labelnames=("call",)
+)
+LLM_TTFT_SECONDS = histogram(
+    "llm_time_to_first_token_seconds", "Time to the first streamed token of an LLM call.", labelnames=("model",)
+)
+LLM_TOKENS = counter("llm_tokens_total", "Tokens billed by the provider.", labelnames=("model", "kind"))
+LLM_TOKENS_PER_CALL = histogram(
+    "llm_tokens_per_call", "Prompt / completion tokens of one LLM call.", TOKEN_BUCKETS, labelnames=("kind",)
+)
+LLM_COST = counter("llm_cost_usd_total", "Estimated provider spend in USD.", labelnames=("model",))
+RUN_TOKENS = histogram("pipeline_tokens_per_run", "Tokens billed for one generated blog.", TOKEN_BUCKETS)
+
+# USD per million (prompt, completion) tokens; override with LLM_PRICES="model=in/out,..."
+DEFAULT_PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+class Trace:
+    """Spans and LLM usage collected for one request, across the threads and tasks it fans out to."""
+
+    def __init__(self):
+
+        self.started = time.perf_counter()
+        self.spans = []
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        self._lock = threading.Lock()
+
+    def add_span(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def add_usage(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        with self._lock:
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["completion_tokens"] += completion_tokens
+            self.usage["cost_usd"] = round(self.usage["cost_usd"] + cost, 6)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+            return {"usage": dict(self.usage), "spans": spans}
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+@contextmanager
+def trace():
+    """Collects spans and token usage for everything run inside the block (threads included, via contextvars)."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming generator closed from another context (client went away)
+            _current_trace.set(None)
+        RUN_TOKENS.observe(current.usage["prompt_tokens"] + current.usage["completion_tokens"])
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, metric=None, **attrs):
+    """
+    Times the block into `metric` (a histogram series) and, if a trace is
+    active, records it as a span. Yields the attrs dict so callers can add
+    attributes discovered while the block runs.
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if metric is not None:
+            metric.observe(elapsed)
+
+        current = _current_trace.get()
+        if current is not None:
+            current.add_span({
+                "name": name,
+                "start_ms": round((start - current.started) * 1000, 2),
+                "duration_ms": round(elapsed * 1000, 2),
+                "attrs": attrs,
+                "error": error
+            })
+
+def with_current_context(func):
+    """
+    Binds `func` to the caller's contextvars (current trace, LangChain callbacks)
+    for use in a plain ThreadPoolExecutor; each call runs in its own copy.
+    """
+    context = copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+def stage_span(stage: str):
+    return span(stage, STAGE_SECONDS.labels(stage), kind="stage")
+
+def call_span(call: str, **attrs):
+    return span(call, EXTERNAL_CALL_SECONDS.labels(call), kind="call", **attrs)
+
+def traced_node(name: str, func, afunc):
+    """
+    A LangGraph node (sync + async implementation) timed as stage `name`.
+    An exception it raises becomes a typed `error` in the state (see src.errors).
+    """
+    def run(state):
+        with stage_span(name):
+            return capture(name, func, state)
+
+    async def arun(state):
+        with stage_span(name):
+            return await acapture(name, afunc, state)
+
+    from langchain_core.runnables import RunnableLambda
+    return RunnableLambda(run, afunc=arun, name=name)
+
+def record_llm_usage(model: str, response, attrs: dict = None):
+    """Counts the provider-reported token usage of one response and its estimated cost."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    if not prompt_tokens and not completion_tokens:
+        return
+
+    LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+    LLM_TOKENS_PER_CALL.labels("prompt").observe(prompt_tokens)
+    LLM_TOKENS_PER_CALL.labels("completion").observe(completion_tokens)
+
+    prompt_price, completion_price = get_prices().get(model, (0.0, 0.0))
+    cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    LLM_COST.labels(model).inc(cost)
+
+    if attrs is not None:
+        attrs.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    current = _current_trace.get()
+    if current is not None:
+        current.add_usage(prompt_tokens, completion_tokens, cost)
+
+_prices = None
+
+def get_prices() -> dict:
+    global _prices
+    if _prices is None:
+        prices = dict(DEFAULT_PRICES)
+        for item in os.environ.get("LLM_PRICES", "").split(","):
+            if "=" in item and "/" in item:
+                model, pair = item.split("=", 1)
+                prompt_price, completion_price = pair.split("/", 1)
+                prices[model.strip()] = (float(prompt_price), float(completion_price))
+        _prices = prices
+    return _prices
@@ -0,0 +1,266 @@
+import re
+import json
+import codecs
+from array import array
+from bisect import bisect_left, bisect_right
+from io import StringIO
+from typing import Iterable, Iterator, List, Optional
+
+# Rough chars-per-token ratio for Llama-family tokenizers on English text.
+# Good enough for budgeting prompts; no tokenizer dependency needed.
+CHARS_PER_TOKEN = 4
+
+# Words per pseudo-segment when a transcript only exists as plain text
+_WORDS_PER_TEXT_SEGMENT = 12
+
+_EVENTS_START = re.compile(r'"events"\s*:\s*\[')
+_SKIPPED = " \t\r\n,"
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class Json3EventParser:
+    """
+    Push parser for the `events` array of a json3 caption body.
+    feed() takes raw bytes as they arrive and returns the events completed so
+    far; only the event currently being decoded is buffered, never the whole
+    document, so long auto-captions aren't materialized twice.
+    """
+
+    __slots__ = ("done", "_decoder", "_text_decoder", "_buffer", "_in_events")
+
+    def __init__(self):
+
+        self.done = False
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._in_events = False
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        if self.done:
+            return []
+
+        buffer = self._buffer + self._text_decoder.decode(chunk)
+
+        if not self._in_events:
+            match = _EVENTS_START.search(buffer)
+            if not match:
+                self._buffer = buffer[-32:] # enough to catch a key split across chunks
+                return []
+            buffer = buffer[match.end():]
+            self._in_events = True
+
+        events = []
+        pos = 0
+        length = len(buffer)
+        while True:
+            while pos < length and buffer[pos] in _SKIPPED:
+                pos += 1
+            if pos >= length:
+                break
+            if buffer[pos] == "]":
+                self.done = True
+                break
+            try:
+                event, pos = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break # event continues in the next chunk
+            events.append(event)
+
+        self._buffer = "" if self.done else buffer[pos:]
+        return events
+
+def iter_json3_events(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Lazily yields json3 events from an iterable of body chunks."""
+    parser = Json3EventParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+
+class Transcript:
+    """
+    Compact, timestamp-preserving transcript.
+
+    Caption segments are stored as parallel int arrays (start ms, duration ms,
+    char offset into one shared text buffer) instead of per-segment objects.
+    Slices (`time_range`, `chunks`, `[i:j]`) are views over the same arrays and
+    buffer, so chunking a long transcript copies nothing until the text of a
+    chunk is actually read.
+    """
+
+    __slots__ = ("lang", "_starts", "_durations", "_offsets", "_text", "_lo", "_hi")
+
+    def __init__(self, starts: array, durations: array, offsets: array, text: str,
+                 lang: Optional[str] = None, lo: int = 0, hi: Optional[int] = None):
+
+        # offsets has one extra trailing entry: the end of the last segment + 1 separator
+        self.lang = lang
+        self._starts = starts
+        self._durations = durations
+        self._offsets = offsets
+        self._text = text
+        self._lo = lo
+        self._hi = len(starts) if hi is None else hi
+
+    @classmethod
+    def from_json3(cls, events: Iterable[dict], lang: Optional[str] = None) -> "Transcript":
+        """Builds a transcript from json3 caption events, consuming them one at a time."""
+        builder = TranscriptBuilder(lang)
+        for event in events:
+            builder.append_json3_event(event)
+        return builder.build()
+
+    @classmethod
+    def from_text(cls, text: str, lang: Optional[str] = None) -> "Transcript":
+        """Wraps untimed text (e.g. legacy cache entries) in fixed-size word segments."""
+        builder = TranscriptBuilder(lang)
+        words = text.split()
+        for index in range(0, len(words), _WORDS_PER_TEXT_SEGMENT):
+            builder.append(0, 0, " ".join(words[index:index + _WORDS_PER_TEXT_SEGMENT]))
+        return builder.build()
+
+    @classmethod
+    def from_dict(cls, data) -> "Transcript":
+        if isinstance(data, str):
+            return cls.from_text(data)
+
+        offsets = array("q", [0])
+        position = 0
+        for length in data["lengths"]:
+            position += length + 1
+            offsets.append(position)
+
+        return cls(array("q", data["starts"]), array("q", data["durations"]), offsets, data["text"], data.get("lang"))
+
+    def to_dict(self) -> dict:
+        """Compact JSON-friendly form used by the transcript cache."""
+        offsets = self._offsets[self._lo:self._hi + 1]
+        return {
+            "lang": self.lang,
+            "starts": self._starts[self._lo:self._hi].tolist(),
+            "durations": self._durations[self._lo:self._hi].tolist(),
+            "lengths": [offsets[i + 1] - offsets[i] - 1 for i in range(len(offsets) - 1)],
+            "text": self.text
+        }
+
+    @property
+    def text(self) -> str:
+        if self._lo >= self._hi:
+            return ""
+        return self._text[self._offsets[self._lo]:self._offsets[self._hi] - 1]
+
+    @property
+    def start_ms(self) -> int:
+        return self._starts[self._lo] if self._lo < self._hi else 0
+
+    @property
+    def end_ms(self) -> int:
+        if self._lo >= self._hi:
+            return 0
+        return self._starts[self._hi - 1] + self._durations[self._hi - 1]
+
+    def segment(self, index: int):
+        """Returns (start_ms, duration_ms, text) of the index-th segment in this view."""
+        i = self._lo + index
+        if not self._lo <= i < self._hi:
+            raise IndexError(index)
+        return self._starts[i], self._durations[i], self._text[self._offsets[i]:self._offsets[i + 1] - 1]
+
+    def index_at(self, ms: int) -> int:
+        """Index (within this view) of the segment playing at `ms`, in O(log n)."""
+        i = bisect_right(self._starts, ms, self._lo, self._hi) - 1
+        return max(i, self._lo) - self._lo
+
+    def time_range(self, start_ms: int, end_ms: int) -> "Transcript":
+        """View of the segments starting in [start_ms, end_ms), in O(log n)."""
+        lo = bisect_left(self._starts, start_ms, self._lo, self._hi)
+        hi = bisect_left(self._starts, end_ms, lo, self._hi)
+        return self._view(lo, hi)
+
+    def estimate_tokens(self) -> int:
+        if self._lo >= self._hi:
+            return 0
+        return (self._offsets[self._hi] - self._offsets[self._lo] - 1 + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def chunks(self, max_tokens: int, overlap_tokens: int = 0) -> List["Transcript"]:
+        """
+        Splits into views of at most ~`max_tokens`, always on segment boundaries.
+        Consecutive chunks share roughly `overlap_tokens` of trailing segments.
+        """
+        max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+        overlap_chars = max(0, min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 2))
+        offsets = self._offsets
+
+        chunks = []
+        lo = self._lo
+        while lo < self._hi:
+            # Last segment whose end still fits the window (at least one segment per chunk)
+            hi = bisect_right(offsets, offsets[lo] + max_chars, lo + 1, self._hi + 1) - 1
+            hi = max(hi, lo + 1)
+            chunks.append(self._view(lo, hi))
+            if hi >= self._hi:
+                break
+
+            next_lo = bisect_left(offsets, offsets[hi] - overlap_chars, lo + 1, hi) if overlap_chars else hi
+            lo = max(next_lo, lo + 1)
+
+        return chunks
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self.segment(item)
+        lo, hi, _ = item.indices(len(self))
+        return self._view(self._lo + lo, self._lo + max(lo, hi))
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Transcript(segments={len(self)}, start_ms={self.start_ms}, end_ms={self.end_ms}, lang={self.lang!r})"
+
+    def _view(self, lo: int, hi: int) -> "Transcript":
+        return Transcript(self._starts, self._durations, self._offsets, self._text, self.lang, lo, hi)
+
+class TranscriptBuilder:
+    """Accumulates segments straight into the packed arrays and text buffer."""
+
+    __slots__ = ("lang", "_starts", "_durations", "_offsets", "_buffer", "_position")
+
+    def __init__(self, lang: Optional[str] = None):
+
+        self.lang = lang
+        self._starts = array("q")
+        self._durations = array("q")
+        self._offsets = array("q", [0])
+        self._buffer = StringIO()
+        self._position = 0
+
+    def append(self, start_ms: int, duration_ms: int, text: str):
+        if not text:
+            return
+        self._starts.append(int(start_ms))
+        self._durations.append(int(duration_ms))
+        self._buffer.write(text)
+        self._buffer.write(" ")
+        self._position += len(text) + 1
+        self._offsets.append(self._position)
+
+    def append_json3_event(self, event: dict):
+        segs = event.get("segs")
+        if segs:
+            text = " ".join(txt for txt in (seg.get("utf8", "").strip() for seg in segs) if txt)
+            self.append(event.get("tStartMs", 0), event.get("dDurationMs", 0), text)
+
+    def build(self) -> Transcript:
+        return Transcript(self._starts, self._durations, self._offsets, self._buffer.getvalue(), self.lang)
+
+def format_timestamp(ms: int) -> str:
+    seconds = ms // 1000
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
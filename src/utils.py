@@ -1,22 +1,169 @@
-from langchain_groq.chat_models import ChatGroq
+from src.cache.memory import LRUCache
+from src.cache.search import SearchCache
 from src.exception import CustomException
+from src.llm_routing import MODEL_RATE_LIMITS, model_route
 import os
+import re
 import sys
+import threading
+from typing import Optional, TYPE_CHECKING
+from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from src.llm_gateway import LLMGateway, RateLimits
+
+# The LLM stack (langchain_groq, langchain_core) is imported by the functions
+# that build clients, so importing this module stays cheap on a cold start.
+
 load_dotenv()
 
-def get_llm():
-    
+_response_cache = None
+_response_cache_lock = threading.Lock()
+_rate_limits = {}
+_rate_limits_lock = threading.Lock()
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_response_cache() -> LRUCache:
+    """Process-wide LLM response cache shared by every wrapped model."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = LRUCache(
+                max_entries=env_int("LLM_CACHE_MAX_ENTRIES", 1024),
+                max_bytes=env_int("LLM_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+                ttl=env_float("LLM_CACHE_TTL", 24 * 3600)
+            )
+        return _response_cache
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Process-wide web search cache; None when SEARCH_CACHE=off."""
+    global _search_cache
+    if os.environ.get("SEARCH_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache(LRUCache(
+                max_entries=env_int("SEARCH_CACHE_MAX_ENTRIES", 2048),
+                max_bytes=env_int("SEARCH_CACHE_MAX_BYTES", 16 * 1024 * 1024),
+                ttl=env_float("SEARCH_CACHE_TTL", 6 * 3600)
+            ))
+        return _search_cache
+
+def get_rate_limits(model: str) -> "RateLimits":
+    """Process-wide Groq budgets for one model (defaults match its free tier)."""
+    from src.llm_gateway import RateLimits
+
+    with _rate_limits_lock:
+        if model not in _rate_limits:
+            requests_per_minute, tokens_per_minute = MODEL_RATE_LIMITS.get(model, (30, 6000))
+            _rate_limits[model] = RateLimits(
+                requests_per_minute=env_float("LLM_REQUESTS_PER_MINUTE", requests_per_minute),
+                tokens_per_minute=env_float("LLM_TOKENS_PER_MINUTE", tokens_per_minute)
+            )
+        return _rate_limits[model]
+
+def get_gateway(model: str, route: dict, fallback: Optional["LLMGateway"] = None) -> "LLMGateway":
+    """A rate-limited, retrying ChatGroq client for `model` with a route's call parameters."""
+    from langchain_groq.chat_models import ChatGroq
+    from src.llm_gateway import LLMGateway
+
+    llm = ChatGroq(
+        model_name = model,
+        temperature = route["temperature"],
+        max_tokens = route["max_tokens"],
+        # Groq's JSON mode: the reply is guaranteed to parse as a JSON object
+        model_kwargs = {"response_format": {"type": "json_object"}} if route["json_mode"] else {},
+        max_retries = 0 # retries are scheduled by the gateway
+    )
+
+    return LLMGateway(
+        llm,
+        get_rate_limits(model),
+        max_retries=env_int("LLM_MAX_RETRIES", 4),
+        base_delay=env_float("LLM_RETRY_BASE_DELAY", 1.0),
+        max_delay=env_float("LLM_RETRY_MAX_DELAY", 30.0),
+        completion_tokens=route["max_tokens"] or env_int("LLM_COMPLETION_TOKENS_ESTIMATE", 512),
+        fallback=fallback,
+        fallback_after=env_float("LLM_FALLBACK_AFTER", 5.0)
+    )
+
+def get_llm(stage: str = "blog"):
+    """
+    The model routed to a pipeline stage ("analysis", "queries", "outline", "blog"),
+    with its fallback model for when the primary is rate limited.
+    """
     try:
 
-        llm = ChatGroq(
-            model_name = "llama-3.3-70b-versatile",
-            temperature = 0.2
-        )
+        route = model_route(stage)
+        fallback = get_gateway(route["fallback"], route) if route["fallback"] else None
+        llm = get_gateway(route["model"], route, fallback)
 
-        return llm
+        if os.environ.get("LLM_CACHE", "on").lower() in ("off", "0", "false"):
+            return llm
+
+        from src.cache.llm import CachedLLM
+        return CachedLLM(llm, get_response_cache())
     
     except Exception as e:
 
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+def is_serverless() -> bool:
+    """Running on Vercel or AWS Lambda: /tmp is the only writable path and cold starts are frequent."""
+    return bool(os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+def get_data_dir(name: str) -> str:
+    """Returns a writable directory for on-disk state (caches, stores)."""
+    # Vercel/Lambda only allow writes under /tmp
+    if is_serverless():
+        base_path = os.path.join("/tmp", "data")
+    else:
+        base_path = os.environ.get("DATA_DIR") or os.path.join(os.getcwd(), "data")
+
+    path = os.path.join(base_path, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+_VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+def extract_video_id(video_url: str) -> Optional[str]:
+    """Normalizes any common YouTube URL form (watch, youtu.be, shorts, embed, live) to its 11-char video ID."""
+    if not video_url:
+        return None
+
+    candidate = video_url.strip()
+    if _VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+
+    parsed = urlparse(candidate if "://" in candidate else f"https://{candidate}")
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www.") or host.startswith("m."):
+        host = host.split(".", 1)[1]
+
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host in ("youtube.com", "music.youtube.com", "youtube-nocookie.com"):
+        query_id = parse_qs(parsed.query).get("v", [None])[0]
+        if query_id:
+            candidate = query_id
+        else:
+            parts = [part for part in parsed.path.split("/") if part]
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                candidate = parts[1]
+            else:
+                return None
+    else:
+        return None
+
+    return candidate if _VIDEO_ID_PATTERN.match(candidate) else None
@@ -0,0 +1,119 @@
+import os
+import sys
+import logging
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from src.exception import CustomException
+from src.http_client import USER_AGENT
+from src.telemetry import call_span
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Subtitle languages in order of preference
+SUBTITLE_LANGS = ["en", "hi", "ja", "es"]
+
+_ydl_local = threading.local()
+
+@lru_cache(maxsize=1)
+def base_ydl_opts() -> dict:
+    """
+    yt-dlp options shared by every extraction, resolved once per process.
+    YOUTUBE_COOKIES is written to /tmp only the first time, not per request.
+    """
+    try:
+
+        is_vercel = os.environ.get('VERCEL') or os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        cookies_arg = None
+
+        env_cookies = os.environ.get("YOUTUBE_COOKIES")
+        if env_cookies:
+            temp_cookies_path = "/tmp/cookies.txt"
+            with open(temp_cookies_path, "w") as f:
+                f.write(env_cookies)
+            cookies_arg = temp_cookies_path
+
+        elif os.path.exists("cookies.txt"):
+            cookies_arg = "cookies.txt"
+
+        return {
+            'skip_download': True,
+            'writesubtitles': True,
+            'writeautomaticsub': True,
+            'subtitleslangs': SUBTITLE_LANGS,
+            'cookiefile': cookies_arg,
+            'quiet': True,
+            'no_warnings': True,
+            'cache_dir': '/tmp/yt-dlp-cache' if is_vercel else None,
+            'nocheckcertificate': True,
+            'ignoreerrors': False,
+            'no_call_home': True,
+            'user_agent': USER_AGENT
+        }
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def fast_ydl_opts() -> dict:
+    # DASH/HLS manifests are separate round trips that only matter for formats
+    return {
+        **base_ydl_opts(),
+        'extractor_args': {'youtube': {'skip': ['dash', 'hls']}},
+    }
+
+def full_ydl_opts() -> dict:
+    return {**base_ydl_opts(), 'format': 'best'}
+
+def _get_ydl(kind: str) -> "yt_dlp.YoutubeDL":
+    """One YoutubeDL per thread and mode, reused across requests (instances aren't thread-safe)."""
+    ydl = getattr(_ydl_local, kind, None)
+    if ydl is None:
+        # yt-dlp takes a few hundred ms to import; only pay for it on the first extraction
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(fast_ydl_opts() if kind == "fast" else full_ydl_opts())
+        setattr(_ydl_local, kind, ydl)
+    return ydl
+
+def extract_caption_info(video_url: str) -> dict:
+    """
+    Returns yt-dlp metadata containing `subtitles` / `automatic_captions`.
+
+    Fast path: raw extractor output (process=False), which skips format
+    resolution, sorting and selection, and doesn't fetch DASH/HLS manifests.
+    Falls back to the full extraction if that fails or finds no captions.
+    """
+    try:
+        with call_span("ytdlp_extract", path="fast"):
+            info = _get_ydl("fast").extract_info(video_url, download=False, process=False)
+        if info and (info.get("subtitles") or info.get("automatic_captions")):
+            return info
+    except Exception as e:
+        logger.warning("Fast caption extraction failed for %s, falling back: %r", video_url, e)
+
+    # yt-dlp's own error is raised as is: src.errors.classify reads its message
+    with call_span("ytdlp_extract", path="full"):
+        return _get_ydl("full").extract_info(video_url, download=False)
+
+def select_subtitle_track(info: dict):
+    """Picks (lang, url) of the preferred caption track, favouring json3. Returns (None, None) if none."""
+    subtitles = info.get("subtitles") or {}
+    auto_captions = info.get("automatic_captions") or {}
+    all_subs = {**auto_captions, **subtitles}
+
+    if not all_subs:
+        return None, None
+
+    chosen_lang = next((lang for lang in SUBTITLE_LANGS if lang in all_subs), None)
+    if not chosen_lang:
+        chosen_lang = list(all_subs.keys())[0]
+
+    subs_list = all_subs.get(chosen_lang) or [{}]
+    json3_url = next((sub.get('url') for sub in subs_list if sub.get('ext') == 'json3'), None)
+
+    if not json3_url:
+        json3_url = subs_list[0].get("url")
+
+    return chosen_lang, json3_url
@@ -9,6 +9,22 @@ document.addEventListener('DOMContentLoaded', () => {
     const btnText = document.getElementById('btnText');
     const btnLoader = document.getElementById('btnLoader');
 
+    const AGENT_STATUS = {
+        analyzer: "Agent 1/3: Analyzing Video Transcript...",
+        researcher: "Agent 2/3: Researching Web Context...",
+        blogger: "Agent 3/3: Drafting Blog Post..."
+    };
+    const STAGE_LABELS = {
+        fetch_transcript: "Transcript fetched",
+        analyze_transcript: "Transcript analyzed",
+        reduce_analysis: "Analysis merged",
+        generate_queries: "Search queries planned",
+        perform_research: "Web research",
+        draft_outline: "Outline drafted",
+        compact_research: "Research condensed",
+        write_blog: "Blog post written"
+    };
+
     generateBtn.addEventListener('click', async () => {
         const url = videoInput.value.trim();
         
@@ -24,10 +40,10 @@ document.addEventListener('DOMContentLoaded', () => {
         resultContent.classList.add('hidden');
         
         try {
-            // 2. Start the Agent Pipeline
+            // 2. Start the Agent Pipeline (streamed as Server-Sent Events)
             updateStatus("Agent 1/3: Analyzing Video Transcript...");
             
-            const response = await fetch('/analyze', {
+            const response = await fetch('/analyze/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -35,16 +51,41 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ video_url: url })
             });
 
-            const data = await response.json();
-
             if (!response.ok) {
+                const data = await response.json();
                 throw new Error(data.error || "Failed to generate blog");
             }
 
-            // 3. Render Output
+            let blogMarkdown = "";
+            let renderScheduled = false;
+
+            await readEvents(response, (event, data) => {
+                if (event === "agent") {
+                    updateStatus(AGENT_STATUS[data.agent] || "Working...");
+                } else if (event === "stage") {
+                    updateStatus(`Step ${data.step}/${data.total_steps}: ${STAGE_LABELS[data.stage] || data.stage} done`);
+                } else if (event === "token") {
+                    // 3. Render the blog incrementally, at most once per frame
+                    blogMarkdown += data.text;
+                    if (!renderScheduled) {
+                        renderScheduled = true;
+                        requestAnimationFrame(() => {
+                            renderScheduled = false;
+                            resultContent.innerHTML = marked.parse(blogMarkdown);
+                            resultContent.classList.remove('hidden');
+                        });
+                    }
+                } else if (event === "result") {
+                    blogMarkdown = data.blog_post;
+                } else if (event === "error") {
+                    throw new Error(data.error || "Failed to generate blog");
+                }
+            });
+
+            // 4. Final Render
             updateStatus("Agents Finished!");
             // Use marked.js to parse the markdown string into HTML
-            resultContent.innerHTML = marked.parse(data.blog_post);
+            resultContent.innerHTML = marked.parse(blogMarkdown);
             resultContent.classList.remove('hidden');
 
         } catch (error) {
@@ -70,15 +111,32 @@ document.addEventListener('DOMContentLoaded', () => {
 
     function updateStatus(text) {
         statusText.textContent = text;
-        
-        // Simulating progress updates for better UX since backend is blocking
-        if (text.includes("Analyzing")) {
-            setTimeout(() => {
-                if(generateBtn.disabled) statusText.textContent = "Agent 2/3: Researching Web Context...";
-            }, 8000); // Guessing time for step 1
-            setTimeout(() => {
-                if(generateBtn.disabled) statusText.textContent = "Agent 3/3: Drafting Blog Post...";
-            }, 18000); // Guessing time for step 2
+    }
+
+    // Reads a text/event-stream body and calls onEvent(eventName, parsedData) per event
+    async function readEvents(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = "message";
+                let data = "";
+                for (const line of rawEvent.split("\n")) {
+                    if (line.startsWith("event:")) event = line.slice(6).trim();
+                    else if (line.startsWith("data:")) data += line.slice(5).trim();
+                }
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
         }
     }
 });
\ No newline at end of file